@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Compare the latency of committing BGP neighbors to FRR through a new vtysh
+process per call and through the persistent vty sessions of bgpcfgd.
+
+By default the benchmark runs against a fake bgpd which serves the vty socket
+protocol and a fake vtysh, a shell script which only reads its input file. The
+subprocess numbers are a lower bound, a real vtysh additionally connects to
+every daemon. Use --socket-dir /var/run/frr on a switch to run against FRR.
+
+Usage: python3 benchmarks/bench_frr_session.py [-p PEERS [PEERS ...]] [-r ROUNDS] [--socket-dir DIR]
+"""
+
+import argparse
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import bgpcfgd.frr
+
+FAKE_VTYSH = """#!/bin/sh
+while [ $# -gt 0 ]; do
+    [ "$1" = "-f" ] && cat "$2" > /dev/null
+    shift
+done
+"""
+
+
+def serve_vty(server):
+    """ Reply with an empty successful output to every command, like bgpd for configuration commands """
+    while True:
+        conn, _ = server.accept()
+        threading.Thread(target=serve_connection, args=(conn,), daemon=True).start()
+
+
+def serve_connection(conn):
+    buf = b''
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        buf += chunk
+        count = buf.count(b'\0')
+        if count:
+            buf = buf[buf.rfind(b'\0') + 1:]
+            conn.sendall(b'\0\0\0\0' * count)
+    conn.close()
+
+
+def make_peers_config(asn, peers):
+    cmds = ["router bgp %d" % asn]
+    for i in range(peers):
+        neighbor = "10.%d.%d.%d" % (i // 65536, i // 256 % 256, i % 256)
+        cmds += [
+            "  neighbor %s remote-as %d" % (neighbor, 64000 + i),
+            "  neighbor %s description ARISTA%02dT0" % (neighbor, i),
+            "  address-family ipv4",
+            "    neighbor %s peer-group PEER_V4" % neighbor,
+            "    neighbor %s route-map FROM_BGP_PEER_V4 in" % neighbor,
+            "    neighbor %s activate" % neighbor,
+            "  exit-address-family",
+        ]
+    return "\n".join(cmds)
+
+
+def commit(frr, config_text):
+    start = time.time()
+    res = frr.write(config_text)
+    res = frr.restart_peer_groups(["PEER_V4"]) and res
+    if not res:
+        print("Commit failed", file=sys.stderr)
+        sys.exit(1)
+    return time.time() - start
+
+
+def measure(frr, peers, rounds):
+    """ Best latency of one commit with all peers and of one commit per peer """
+    config_text = make_peers_config(65100, peers)
+    peer_texts = [make_peers_config(65100 + i, 1) for i in range(peers)]
+    single = min(commit(frr, config_text) for _ in range(rounds))
+    per_peer = min(sum(commit(frr, text) for text in peer_texts) for _ in range(rounds))
+    return single, per_peer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-p', '--peers', type=int, nargs='+', default=[1, 100, 1000])
+    parser.add_argument('-r', '--rounds', type=int, default=3)
+    parser.add_argument('--socket-dir', help="directory with FRR vty sockets, a fake bgpd is used if not set")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        socket_dir = args.socket_dir
+        if socket_dir is None:
+            socket_dir = tmp_dir
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(os.path.join(socket_dir, "bgpd.vty"))
+            server.listen(16)
+            threading.Thread(target=serve_vty, args=(server,), daemon=True).start()
+            vtysh = os.path.join(tmp_dir, "vtysh")
+            with open(vtysh, 'w') as fp:
+                fp.write(FAKE_VTYSH)
+            os.chmod(vtysh, 0o755)
+            os.environ['PATH'] = tmp_dir + os.pathsep + os.environ['PATH']
+        bgpcfgd.frr.log_debug = bgpcfgd.frr.log_info = lambda msg: None
+
+        subprocess_frr = bgpcfgd.frr.FRR(["bgpd"])
+        vty_frr = bgpcfgd.frr.FRR(["bgpd"], socket_dir)
+        vty_frr.wait_for_daemons(5)
+
+        print('latency (ms) of one commit with all peers and of a separate commit per peer')
+        print('{:>6} {:>14} {:>14} {:>16} {:>16}'.format(
+            'peers', 'one vtysh', 'one vty', 'per peer vtysh', 'per peer vty'))
+        for peers in args.peers:
+            vtysh_single, vtysh_per_peer = measure(subprocess_frr, peers, args.rounds)
+            vty_single, vty_per_peer = measure(vty_frr, peers, args.rounds)
+            print('{:>6} {:>14.2f} {:>14.2f} {:>16.2f} {:>16.2f}'.format(
+                peers, 1000 * vtysh_single, 1000 * vty_single, 1000 * vtysh_per_peer, 1000 * vty_per_peer))
+        print('vtysh processes: {}, vty commands: {}'.format(subprocess_frr.vtysh_invocations, vty_frr.vty_commands))
+        vty_frr.close()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Compare the running-config lookups of the allow-list manager done by scanning
+the config text, as before, and through the indexed RunningConfig model.
+
+The config has PEERS neighbors and ROUTE_MAPS route-maps. Every "policy
+update" runs the lookups of one BGP_ALLOWED_PREFIXES change:
+- prefix-list checks;
+- the community-list check;
+- route-map entry parsing;
+- the peer-group to deployment-id resolution.
+The text path also pays the config update which re-read FRR before every
+lookup. The model is parsed once, like after a commit.
+
+Usage: python3 benchmarks/bench_running_config.py [-p PEERS] [-m ROUTE_MAPS] [-u UPDATES]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from bgpcfgd.running_config import RunningConfig
+
+
+def make_config(peers, route_maps):
+    lines = ["router bgp 65100"]
+    peer_groups = ["PEER_V4_%d" % i for i in range(route_maps // 5)]
+    for pg in peer_groups:
+        lines.append(" neighbor %s peer-group" % pg)
+    for i in range(peers):
+        neighbor = "10.%d.%d.%d" % (i // 65536, i // 256 % 256, i % 256)
+        lines += [
+            " neighbor %s remote-as %d" % (neighbor, 64000 + i),
+            " neighbor %s peer-group %s" % (neighbor, peer_groups[i % len(peer_groups)]),
+            " neighbor %s description ARISTA%02dT0" % (neighbor, i),
+        ]
+    lines.append(" address-family ipv4 unicast")
+    for i, pg in enumerate(peer_groups):
+        lines += [
+            "  neighbor %s soft-reconfiguration inbound" % pg,
+            "  neighbor %s route-map FROM_%s in" % (pg, pg),
+            "  neighbor %s route-map TO_%s out" % (pg, pg),
+        ]
+    lines.append(" exit-address-family")
+    for i in range(route_maps // 5):
+        pl = "PL_ALLOW_LIST_DEPLOYMENT_ID_%d_COMMUNITY_empty_V4" % i
+        lines += [
+            "ip prefix-list %s seq 10 deny 0.0.0.0/0 le 17" % pl,
+            "ip prefix-list %s seq 20 permit 10.%d.0.0/16 le 32" % (pl, i % 256),
+            "bgp community-list standard COMMUNITY_ALLOW_LIST_DEPLOYMENT_ID_%d_COMMUNITY_1:%d permit 1:%d" % (i, i, i),
+        ]
+    for i in range(route_maps // 5):
+        pg = peer_groups[i]
+        lines += [
+            "route-map ALLOW_LIST_DEPLOYMENT_ID_%d_V4 permit 30000" % i,
+            " match ip address prefix-list PL_ALLOW_LIST_DEPLOYMENT_ID_%d_COMMUNITY_empty_V4" % i,
+            "route-map ALLOW_LIST_DEPLOYMENT_ID_%d_V4 permit 65535" % i,
+            " set community 5060:12345 additive",
+            "route-map FROM_%s permit 2" % pg,
+            " call ALLOW_LIST_DEPLOYMENT_ID_%d_V4" % i,
+            " on-match next",
+            "route-map FROM_%s permit 100" % pg,
+            "route-map TO_%s permit 100" % pg,
+            "route-map EXTRA_%d permit 10" % i,
+            " set local-preference 100",
+        ]
+    return "\n".join(lines)
+
+
+def to_lines(text):
+    """ The update step of ConfigMgr: drop comments """
+    return [line for line in text.split('\n') if not line.lstrip().startswith('!')] + ["     "]
+
+
+def text_lookups(text, deployment_id):
+    """ The lookups of the allow-list manager implemented as text scans """
+    conf = to_lines(text)
+    pl_name = "PL_ALLOW_LIST_DEPLOYMENT_ID_%d_COMMUNITY_empty_V4" % deployment_id
+    match_string = 'ip prefix-list %s seq ' % pl_name
+    rules = [" ".join(line[len(match_string):].strip().split(' ')[1:]) for line in conf if line.startswith(match_string)]
+    match_string = 'bgp community-list standard COMMUNITY_ALLOW_LIST_DEPLOYMENT_ID_%d_COMMUNITY_1:%d permit ' % (deployment_id, deployment_id)
+    community = [line.strip().replace(match_string, '') for line in conf if line.strip().startswith(match_string)]
+    rm_name = "ALLOW_LIST_DEPLOYMENT_ID_%d_V4" % deployment_id
+    match_string = 'route-map %s permit ' % rm_name
+    entries = {}
+    inside, seq, pl = False, None, None
+    for line in conf + [""]:
+        if inside:
+            if line.strip().startswith('match ip address prefix-list '):
+                pl = line.strip()[len('match ip address prefix-list '):]
+                continue
+            if pl is not None:
+                entries[seq] = pl
+            inside, pl = False, None
+        if line.startswith(match_string):
+            seq, inside = int(line[len(match_string):]), True
+    conf = to_lines(text)
+    re_peer_group = re.compile(r'^\s*neighbor (\S+) peer-group$')
+    peer_groups = [m.group(1) for m in (re_peer_group.match(line) for line in conf) if m]
+    pg_2_rm = {}
+    for pg in peer_groups:
+        re_peer_group_rm = re.compile(r'^\s*neighbor %s route-map (\S+) in$' % pg)
+        for line in conf:
+            result = re_peer_group_rm.match(line)
+            if result:
+                pg_2_rm[pg] = result.group(1)
+                break
+    rms = set(pg_2_rm.values())
+    rm_2_call = {}
+    re_rm = re.compile(r'^route-map (\S+) permit \d+$')
+    re_call = re.compile(r'^\s*call (\S+)$')
+    inside_name = None
+    for line in conf:
+        if inside_name:
+            inside_result = re_call.match(line)
+            if inside_result:
+                rm_2_call[inside_name] = inside_result.group(1)
+                inside_name = None
+                continue
+        result = re_rm.match(line)
+        if not result:
+            continue
+        inside_name = result.group(1) if result.group(1) in rms else None
+    target = 'ALLOW_LIST_DEPLOYMENT_ID_%d_V' % deployment_id
+    restart = sorted(pg for pg, rm in pg_2_rm.items() if rm_2_call.get(rm, '').startswith(target))
+    return rules, community[:1], entries, restart
+
+
+def model_lookups(model, deployment_id):
+    """ The same lookups through the RunningConfig indexes """
+    rules = model.get_prefix_list('ip', "PL_ALLOW_LIST_DEPLOYMENT_ID_%d_COMMUNITY_empty_V4" % deployment_id) or []
+    community = model.get_community_list("COMMUNITY_ALLOW_LIST_DEPLOYMENT_ID_%d_COMMUNITY_1:%d" % (deployment_id, deployment_id)) or []
+    entries = {}
+    for seq, entry in model.get_route_map("ALLOW_LIST_DEPLOYMENT_ID_%d_V4" % deployment_id).items():
+        for line in entry.lines:
+            if line.startswith('match ip address prefix-list '):
+                entries[seq] = line[len('match ip address prefix-list '):]
+            else:
+                break
+    pg_2_rm = {pg: model.neighbor_route_maps_in[pg] for pg in model.peer_groups if pg in model.neighbor_route_maps_in}
+    rm_2_call = {}
+    for rm in set(pg_2_rm.values()):
+        for entry in model.get_route_map(rm).values():
+            for line in entry.lines:
+                if line.startswith('call '):
+                    rm_2_call[rm] = line[len('call '):]
+                    break
+    target = 'ALLOW_LIST_DEPLOYMENT_ID_%d_V' % deployment_id
+    restart = sorted(pg for pg, rm in pg_2_rm.items() if rm_2_call.get(rm, '').startswith(target))
+    return rules, community[:1], entries, restart
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-p', '--peers', type=int, default=2000)
+    parser.add_argument('-m', '--route-maps', type=int, default=500)
+    parser.add_argument('-u', '--updates', type=int, default=20)
+    args = parser.parse_args()
+
+    text = make_config(args.peers, args.route_maps)
+    deployment_ids = [i % (args.route_maps // 5) for i in range(args.updates)]
+    print('{} lines, {} peers, {} route-maps'.format(len(text.split('\n')), args.peers, args.route_maps))
+
+    start = time.time()
+    text_results = [text_lookups(text, i) for i in deployment_ids]
+    text_time = time.time() - start
+
+    start = time.time()
+    model = RunningConfig(to_lines(text))
+    parse_time = time.time() - start
+    start = time.time()
+    model_results = [model_lookups(model, i) for i in deployment_ids]
+    model_time = time.time() - start
+
+    if text_results != model_results:
+        print('Lookup results mismatch', file=sys.stderr)
+        sys.exit(1)
+    print('{:<22} {:>12}'.format('', 'time (ms)'))
+    print('{:<22} {:>12.2f}'.format('text scan per update', 1000 * text_time / args.updates))
+    print('{:<22} {:>12.2f}'.format('model parse', 1000 * parse_time))
+    print('{:<22} {:>12.3f}'.format('model per update', 1000 * model_time / args.updates))
+    print('speedup for {} updates between commits x{:.1f}'.format(args.updates, text_time / (parse_time + model_time)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,20 @@
+from .log import log_err
+from .running_config import RunningConfig
+
+
 class ConfigMgr(object):
     """ The class represents frr configuration """
-    def __init__(self, frr):
+    def __init__(self, frr, snapshot=None):
+        """
+        Constructor
+        :param frr: FRR object
+        :param snapshot: Snapshot object which records the applied configuration. None to disable it
+        """
         self.frr = frr
+        self.snapshot = snapshot
         self.current_config = None
         self.current_config_raw = None
+        self.current_model = None
         self.changes = ""
         self.peer_groups_to_restart = []
 
@@ -11,13 +22,20 @@ class ConfigMgr(object):
         """ Reset stored config """
         self.current_config = None
         self.current_config_raw = None
+        self.current_model = None
         self.changes = ""
         self.peer_groups_to_restart = []
 
-    def update(self):
-        """ Read current config from FRR """
+    def update(self, force=False):
+        """
+        Read current config from FRR. The config is cached until bgpcfgd commits changes to FRR
+        :param force: read the config even if the cached config is up to date
+        """
+        if self.current_config_raw is not None and not force:
+            return
         self.current_config = None
         self.current_config_raw = None
+        self.current_model = None
         out = self.frr.get_config()
         text = []
         for line in out.split('\n'):
@@ -59,12 +77,49 @@ class ConfigMgr(object):
             return True
         rc_write = self.frr.write(self.changes)
         rc_restart = self.frr.restart_peer_groups(self.peer_groups_to_restart)
+        if self.snapshot is not None:
+            self.snapshot.commit(rc_write)
         self.reset()
         return rc_write and rc_restart
 
+    def checkpoint(self):
+        """ Save the committed changes which weren't saved into the snapshot yet """
+        if self.snapshot is not None:
+            self.snapshot.checkpoint()
+
+    def on_initial_sync(self):
+        """ Stop trusting the replayed snapshot once the initial contents of the tables have been handled """
+        if self.snapshot is not None:
+            self.snapshot.replayed.clear()
+
+    def replay_snapshot(self):
+        """
+        Write the configuration from the snapshot which FRR doesn't have yet, with one write
+        :return: True if the replay was successful or there was nothing to replay, False otherwise
+        """
+        self.update(force=True)
+        text = self.snapshot.get_replay_config(self.get_model())
+        if text == "":
+            return True
+        rc = self.frr.write(text)
+        if not rc:
+            log_err("Can't replay the snapshot. All peers will be configured from CONFIG_DB")
+            self.snapshot.replayed.clear()
+        self.reset()
+        return rc
+
     def get_text(self):
         return self.current_config_raw
 
+    def get_model(self):
+        """
+        Get the parsed running config. The config is parsed on the first call after update()
+        :return: RunningConfig object
+        """
+        if self.current_model is None:
+            self.current_model = RunningConfig(self.current_config_raw or [])
+        return self.current_model
+
     @staticmethod
     def to_canonical(raw_config):
         """
@@ -9,6 +9,15 @@ class Directory(object):
     def __init__(self):
         self.data = defaultdict(dict)  # storage. A key is a slot name, a value is a dictionary with data
         self.notify = defaultdict(lambda: defaultdict(list))  # registered callbacks: slot -> path -> handlers[]
+        self.paths_by_key = defaultdict(lambda: defaultdict(set))  # reverse index: slot -> top level key -> paths
+        self.ready = {}  # readiness of the subscribed paths: (slot, path) -> True if the path exists
+        self.watchers = defaultdict(lambda: defaultdict(list))  # one-shot callbacks: slot -> key or None -> handlers[]
+        self.counters = {
+            'puts': 0,
+            'paths_checked': 0,
+            'notifications': 0,
+            'watchers_fired': 0,
+        }
 
     @staticmethod
     def get_slot_name(db, table):
@@ -60,9 +69,16 @@ class Directory(object):
         slot = self.get_slot_name(db, table)
         return self.path_traverse(slot, path)[1]
 
+    @staticmethod
+    def get_path_key(path):
+        """ Return the top level key of the path. The whole slot is represented by '' """
+        return path.split("/", 1)[0]
+
     def put(self, db, table, key, value):
         """
-        Put information into the storage. Notify handlers which are dependant to the information
+        Put information into the storage. Notify handlers which are dependant to the information.
+        Only paths under the changed key are checked, and a subscribed handler is run only
+        when one of its paths has become available. Watchers of the key are run once
         :param db: db name
         :param table: table name
         :param key: key to change
@@ -71,11 +87,25 @@ class Directory(object):
         """
         slot = self.get_slot_name(db, table)
         self.data[slot][key] = value
-        if slot in self.notify:
-            for path in self.notify[slot].keys():
-                if self.path_exist(db, table, path):
-                    for handler in self.notify[slot][path]:
-                        handler()
+        self.counters['puts'] += 1
+        handlers = []
+        if slot in self.paths_by_key:
+            paths = self.paths_by_key[slot].get(key, set()) | self.paths_by_key[slot].get('', set())
+            for path in paths:
+                self.counters['paths_checked'] += 1
+                exists = self.path_traverse(slot, path)[0]
+                was_ready = self.ready.get((slot, path), False)
+                self.ready[(slot, path)] = exists
+                if exists and not was_ready:
+                    handlers.extend(h for h in self.notify[slot][path] if h not in handlers)
+        if slot in self.watchers:
+            for watch_key in (key, None):
+                if watch_key in self.watchers[slot]:
+                    handlers.extend(self.watchers[slot].pop(watch_key))
+                    self.counters['watchers_fired'] += 1
+        for handler in handlers:
+            self.counters['notifications'] += 1
+            handler()
 
     def get(self, db, table, key):
         """
@@ -109,6 +139,9 @@ class Directory(object):
         if slot in self.data:
             if key in self.data[slot]:
                 del self.data[slot][key]
+                if slot in self.paths_by_key:
+                    for path in self.paths_by_key[slot].get(key, ()):
+                        self.ready[(slot, path)] = self.path_traverse(slot, path)[0]
             else:
                 log_err("Directory: Can't remove key '%s' from slot '%s'. The key doesn't exist" % (key, slot))
         else:
@@ -123,6 +156,10 @@ class Directory(object):
         slot = self.get_slot_name(db, table)
         if slot in self.data:
             del self.data[slot]
+            if slot in self.paths_by_key:
+                for paths in self.paths_by_key[slot].values():
+                    for path in paths:
+                        self.ready[(slot, path)] = False
         else:
             log_err("Directory: Can't remove slot '%s'. The slot doesn't exist" % slot)
 
@@ -156,4 +193,17 @@ class Directory(object):
         """
         for db, table, path in deps:
             slot = self.get_slot_name(db, table)
-            self.notify[slot][path].append(handler)
\ No newline at end of file
+            self.notify[slot][path].append(handler)
+            self.paths_by_key[slot][self.get_path_key(path)].add(path)
+            self.ready[(slot, path)] = self.path_traverse(slot, path)[0]
+
+    def watch(self, db, table, key, handler):
+        """
+        Run the handler once, on the next put of the key into the table
+        :param db: db name
+        :param table: table name
+        :param key: key to watch. None to watch any key of the table
+        :param handler: callback without arguments
+        """
+        slot = self.get_slot_name(db, table)
+        self.watchers[slot][key].append(handler)
\ No newline at end of file
@@ -1,17 +1,149 @@
 import os
 import datetime
+import socket
 import time
 import tempfile
 
-from bgpcfgd.log import log_err, log_info, log_warn, log_crit
+from bgpcfgd.log import log_debug, log_err, log_info, log_warn, log_crit
 from .vars import g_debug
 from .utils import run_command
 
 
+class VtySession(object):
+    """
+    Persistent connection to the vty unix socket of one FRR daemon.
+    The socket speaks the same protocol as vtysh: a command is sent as a NUL terminated string,
+    the daemon replies with the command output followed by three NUL bytes and the command status
+    """
+    CMD_SUCCESS = 0
+    CMD_WARNING = 1
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self.sock = None
+
+    def connect(self):
+        """ Connect to the daemon and switch the session to the enable node """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except (OSError, socket.error):
+            sock.close()
+            raise
+        self.sock = sock
+        status, out = self.execute("enable")
+        if status != self.CMD_SUCCESS:
+            self.close()
+            raise EnvironmentError("Can't enter enable node on '%s': status=%d out='%s'" % (self.path, status, out))
+
+    def execute(self, command):
+        """
+        Execute one command in the daemon
+        :param command: command to execute. Type: String
+        :return: Tuple: integer status of the command, output as a string
+        """
+        self.sock.sendall(command.encode('utf-8') + b'\0')
+        buf = bytearray()
+        while True:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                self.close()
+                raise EnvironmentError("Connection to '%s' was closed" % self.path)
+            buf += chunk
+            if len(buf) >= 4 and buf[-4:-1] == b'\0\0\0':
+                return buf[-1], buf[:-4].decode('utf-8', 'replace')
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    @property
+    def connected(self):
+        return self.sock is not None
+
+
 class FRR(object):
     """Proxy object with FRR"""
-    def __init__(self, daemons):
+    VTY_SOCKET_DIR = "/var/run/frr"
+    # Top level commands which only bgpd implements. A configuration which consists of these commands only
+    # can be sent to the bgpd vty socket directly, anything else goes through vtysh which dispatches
+    # every command to the daemons implementing it
+    BGPD_ONLY_COMMANDS = ("router bgp ", "no router bgp ", "bgp community-list ", "no bgp community-list ",
+                          "bgp as-path ", "no bgp as-path ", "bgp extcommunity-list ", "no bgp extcommunity-list ",
+                          "bgp large-community-list ", "no bgp large-community-list ")
+
+    def __init__(self, daemons, vty_socket_dir=None):
+        """
+        Constructor
+        :param daemons: list of FRR daemons required to be running
+        :param vty_socket_dir: directory with the vty sockets of the FRR daemons. When set, commands are sent
+                               over persistent connections to the daemons instead of a new vtysh process per call
+        """
         self.daemons = daemons
+        self.vty_socket_dir = vty_socket_dir
+        self.sessions = {}
+        self.vtysh_invocations = 0
+        self.vty_commands = 0
+
+    def run_vtysh(self, command, **kwargs):
+        """
+        Run vtysh with arguments
+        :param command: vtysh arguments. Type: List of strings
+        :return: Tuple: integer exit code from the command, stdout as a string, stderr as a string
+        """
+        self.vtysh_invocations += 1
+        return run_command(["vtysh"] + command, **kwargs)
+
+    def get_session(self, daemon):
+        """
+        Get a connected session to the daemon vty socket, connect if required
+        :param daemon: name of the FRR daemon
+        :return: VtySession object or None if the session isn't enabled or the daemon isn't reachable
+        """
+        if self.vty_socket_dir is None:
+            return None
+        session = self.sessions.get(daemon)
+        if session is None:
+            session = VtySession(os.path.join(self.vty_socket_dir, "%s.vty" % daemon))
+            self.sessions[daemon] = session
+        if not session.connected:
+            try:
+                session.connect()
+            except (EnvironmentError, socket.error) as e:
+                log_debug("Can't connect to vty socket '%s': %s" % (session.path, str(e)))
+                return None
+        return session
+
+    def run_vty(self, daemon, commands):
+        """
+        Execute commands one by one in the daemon over its vty socket
+        :param daemon: name of the FRR daemon
+        :param commands: commands to execute. Type: List of strings
+        :return: list of tuples (command, status, output) or None, if the daemon isn't reachable.
+                 In this case the caller should fall back to vtysh
+        """
+        session = self.get_session(daemon)
+        if session is None:
+            return None
+        results = []
+        try:
+            for command in commands:
+                self.vty_commands += 1
+                status, out = session.execute(command)
+                results.append((command, status, out))
+        except (EnvironmentError, socket.error) as e:
+            session.close()
+            log_warn("Connection to vty socket '%s' was lost: %s. Falling back to vtysh" % (session.path, str(e)))
+            return None
+        return results
+
+    def close(self):
+        """ Close all vty sessions """
+        for session in self.sessions.values():
+            session.close()
 
     def wait_for_daemons(self, seconds):
         """
@@ -21,31 +153,37 @@ class FRR(object):
         stop_time = datetime.datetime.now() + datetime.timedelta(seconds=seconds)
         log_info("Start waiting for FRR daemons: %s" % str(datetime.datetime.now()))
         while datetime.datetime.now() < stop_time:
-            ret_code, out, err = run_command(["vtysh", "-c", "show daemons"], hide_errors=True)
-            if ret_code == 0 and all(daemon in out for daemon in self.daemons):
-                log_info("All required daemons have connected to vtysh: %s" % str(datetime.datetime.now()))
-                return
+            if self.vty_socket_dir is not None:
+                if all(self.get_session(daemon) is not None for daemon in self.daemons):
+                    log_info("All required daemons have opened vty sessions: %s" % str(datetime.datetime.now()))
+                    return
             else:
-                log_warn("Can't read daemon status from FRR: %s" % str(err))
+                ret_code, out, err = self.run_vtysh(["-c", "show daemons"], hide_errors=True)
+                if ret_code == 0 and all(daemon in out for daemon in self.daemons):
+                    log_info("All required daemons have connected to vtysh: %s" % str(datetime.datetime.now()))
+                    return
+                else:
+                    log_warn("Can't read daemon status from FRR: %s" % str(err))
             time.sleep(0.1)  # sleep 100 ms
         raise RuntimeError("FRR daemons hasn't been started in %d seconds" % seconds)
 
-    @staticmethod
-    def get_config():
-        ret_code, out, err = run_command(["vtysh", "-c", "show running-config"])
+    def get_config(self):
+        ret_code, out, err = self.run_vtysh(["-c", "show running-config"])
         if ret_code != 0:
             log_crit("can't update running config: rc=%d out='%s' err='%s'" % (ret_code, out, err))
             return ""
         return out
 
-    @staticmethod
-    def write(config_text):
+    def write(self, config_text):
+        if self.vty_socket_dir is not None and self.is_bgpd_only(config_text):
+            res = self.write_vty("bgpd", config_text)
+            if res is not None:
+                return res
         fd, tmp_filename = tempfile.mkstemp(dir='/tmp')
         os.close(fd)
         with open(tmp_filename, 'w') as fp:
             fp.write("%s\n" % config_text)
-        command = ["vtysh", "-f", tmp_filename]
-        ret_code, out, err = run_command(command)
+        ret_code, out, err = self.run_vtysh(["-f", tmp_filename])
         if ret_code != 0:
             err_tuple = tmp_filename, ret_code, out, err
             log_err("ConfigMgr::commit(): can't push configuration from file='%s', rc='%d', stdout='%s', stderr='%s'" % err_tuple)
@@ -54,15 +192,64 @@ class FRR(object):
                 os.remove(tmp_filename)
         return ret_code == 0
 
-    @staticmethod
-    def restart_peer_groups(peer_groups):
+    def write_vty(self, daemon, config_text):
+        """
+        Push configuration to the daemon over its vty socket. Like 'vtysh -f' every command is executed,
+        even when a previous one has failed
+        :param daemon: name of the FRR daemon
+        :param config_text: configuration to push
+        :return: True if all commands were successful, False otherwise. None if the daemon isn't reachable
+        """
+        commands = ["configure terminal"]
+        for line in config_text.split("\n"):
+            line = line.strip()
+            if line and not line.startswith("!"):
+                commands.append(line)
+        commands.append("end")
+        results = self.run_vty(daemon, commands)
+        if results is None:
+            return None
+        res = True
+        for command, status, out in results:
+            if status != VtySession.CMD_SUCCESS:
+                log_err("ConfigMgr::commit(): can't push command '%s' to %s, status='%d', out='%s'" % (command, daemon, status, out))
+                res = False
+        if g_debug:
+            log_debug("Configuration pushed to %s: '%s'" % (daemon, config_text))
+        return res
+
+    @classmethod
+    def is_bgpd_only(cls, config_text):
+        """
+        Check that all top level commands of the configuration are implemented by bgpd only
+        :param config_text: configuration to check
+        :return: True if the configuration can be sent to bgpd directly
+        """
+        for line in config_text.split("\n"):
+            if not line or line[0].isspace() or line.startswith("!"):
+                continue
+            if not line.startswith(cls.BGPD_ONLY_COMMANDS) and line not in ("exit", "end"):
+                return False
+        return True
+
+    def restart_peer_groups(self, peer_groups):
         """ Restart peer-groups which support BBR
         :param peer_groups: List of peer_groups to restart
         :return: True if restart of all peer-groups was successful, False otherwise
         """
+        peer_groups = sorted(peer_groups)
+        commands = ["clear bgp peer-group %s soft in" % peer_group for peer_group in peer_groups]
+        results = self.run_vty("bgpd", commands) if commands else None
+        if results is not None:
+            res = True
+            for (command, status, out), peer_group in zip(results, peer_groups):
+                if status != VtySession.CMD_SUCCESS:
+                    log_crit("Can't restart bgp peer-group '%s'. status='%d', out='%s'" % (peer_group, status, out))
+                    res = False
+            return res
         res = True
-        for peer_group in sorted(peer_groups):
-            rc, out, err = run_command(["vtysh", "-c", "clear bgp peer-group %s soft in" % peer_group])
+        for command, peer_group in zip(commands, peer_groups):
+            rc, out, err = self.run_vtysh(["-c", command])
             if rc != 0:
                 log_value = peer_group, rc, out, err
                 log_crit("Can't restart bgp peer-group '%s'. rc='%d', out='%s', err='%s'" % log_value)
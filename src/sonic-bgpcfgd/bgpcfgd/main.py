@@ -16,6 +16,7 @@ from .managers_db import BGPDataBaseMgr
 from .managers_intf import InterfaceMgr
 from .managers_setsrc import ZebraSetSrc
 from .runner import Runner, signal_handler
+from .snapshot import Snapshot
 from .template import TemplateFabric
 from .utils import read_constants
 from .frr import FRR
@@ -24,14 +25,29 @@ from .vars import g_debug
 
 def do_work():
     """ Main function """
-    frr = FRR(["bgpd", "zebra", "staticd"])
+    constants = read_constants()
+    vty_sessions = constants.get('bgp', {}).get('vty_sessions', {})
+    if vty_sessions.get('enabled', False):
+        frr = FRR(["bgpd", "zebra", "staticd"], vty_sessions.get('socket_dir', FRR.VTY_SOCKET_DIR))
+    else:
+        frr = FRR(["bgpd", "zebra", "staticd"])
     frr.wait_for_daemons(seconds=20)
     #
+    directory = Directory()
+    snapshot = None
+    warm_restart_snapshot = constants.get('bgp', {}).get('warm_restart_snapshot', {})
+    if warm_restart_snapshot.get('enabled', False):
+        snapshot = Snapshot(warm_restart_snapshot.get('path', '/var/lib/bgpcfgd/snapshot.json'), directory)
+        snapshot.load()
+    cfg_mgr = ConfigMgr(frr, snapshot)
+    if snapshot is not None:
+        cfg_mgr.replay_snapshot()
     common_objs = {
-        'directory': Directory(),
-        'cfg_mgr':   ConfigMgr(frr),
+        'directory': directory,
+        'cfg_mgr':   cfg_mgr,
         'tf':        TemplateFabric(),
-        'constants': read_constants(),
+        'constants': constants,
+        'snapshot':  snapshot,
     }
     managers = [
         # Config DB managers
@@ -54,10 +70,17 @@ def do_work():
         # BBR Manager
         BBRMgr(common_objs, "CONFIG_DB", "BGP_BBR"),
     ]
-    runner = Runner(common_objs['cfg_mgr'])
+    coalesce = common_objs['constants'].get('bgp', {}).get('coalesce', {})
+    if coalesce.get('enabled', False):
+        runner = Runner(common_objs['cfg_mgr'], coalesce.get('window_ms', 200), coalesce.get('max_events', 1000), common_objs['tf'])
+    else:
+        runner = Runner(common_objs['cfg_mgr'], tf=common_objs['tf'])
     for mgr in managers:
         runner.add_manager(mgr)
-    runner.run()
+    try:
+        runner.run()
+    finally:
+        frr.close()
 
 
 def main():
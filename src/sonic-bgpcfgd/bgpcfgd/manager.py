@@ -1,3 +1,5 @@
+from collections import OrderedDict
+
 from swsscommon import swsscommon
 
 from .log import log_debug, log_err
@@ -19,7 +21,13 @@ class Manager(object):
         self.deps = deps
         self.db_name = database
         self.table_name = table_name
-        self.set_queue = []
+        self.set_queue = OrderedDict()  # keys waiting for the dependencies of the manager: key -> data
+        self.waiting = {}  # keys which set_handler couldn't process yet: key -> (data, token)
+        self.waits = []    # Directory keys set_handler is waiting for: (db, table, key)
+        self.wait_token = 0
+        self.counters = {
+            'retries': 0,
+        }
         self.directory.subscribe(deps, self.on_deps_change)  # subscribe this class method on directory changes
 
     def get_database(self):
@@ -38,29 +46,79 @@ class Manager(object):
         :param data: associated data of the event. Empty for 'DEL' operation.
         """
         if op == swsscommon.SET_COMMAND:
+            self.set_queue.pop(key, None)  # the latest data for the key replaces the data waiting for processing
+            self.waiting.pop(key, None)
             if self.directory.available_deps(self.deps):  # all required dependencies are set in the Directory?
-                res = self.set_handler(key, data)
-                if not res:  # set handler returned False, which means it is not ready to process is. Save it for later.
-                    log_debug("'SET' handler returned NOT_READY for the Manager: %s" % self.__class__)
-                    self.set_queue.append((key, data))
+                self.process_set(key, data)
             else:
                 log_debug("Not all dependencies are met for the Manager: %s" % self.__class__)
-                self.set_queue.append((key, data))
+                self.set_queue[key] = data
         elif op == swsscommon.DEL_COMMAND:
+            self.set_queue.pop(key, None)
+            self.waiting.pop(key, None)
             self.del_handler(key)
         else:
             log_err("Invalid operation '%s' for key '%s'" % (op, key))
 
+    def process_set(self, key, data):
+        """
+        Run set_handler for the key. If it is not ready to process the key, keep the key until
+        the Directory keys set_handler is waiting for are changed
+        :param key: key of the table entry
+        :param data: associated data of the event
+        """
+        self.waits = []
+        res = self.set_handler(key, data)
+        if res:
+            return
+        # set handler returned False, which means it is not ready to process is. Save it for later.
+        log_debug("'SET' handler returned NOT_READY for the Manager: %s" % self.__class__)
+        waits = self.waits or [(db, table, None) for db, table, _ in self.deps]
+        self.wait_token += 1
+        token = self.wait_token
+        self.waiting[key] = (data, token)
+        for db, table, wait_key in waits:
+            self.directory.watch(db, table, wait_key, lambda: self.on_wait_done(key, token))
+
+    def wait_for(self, db, table, key=None):
+        """
+        Declare a Directory key the current set_handler call is waiting for, before it returns False.
+        The key is retried as soon as the Directory key is put. When nothing is declared, the key is
+        retried on any change in the tables of the manager dependencies
+        :param db: db name
+        :param table: table name
+        :param key: key in the table. None for any key
+        """
+        self.waits.append((db, table, key))
+
+    def on_wait_done(self, key, token):
+        """ Retry a key which was waiting for a Directory key """
+        if key not in self.waiting or self.waiting[key][1] != token:
+            return  # the key was processed, removed or is waiting for something else
+        data, _ = self.waiting.pop(key)
+        self.counters['retries'] += 1
+        if self.directory.available_deps(self.deps):
+            self.process_set(key, data)
+        else:
+            self.set_queue[key] = data
+
     def on_deps_change(self):
-        """ This method is being executed on every dependency change """
+        """ This method is being executed when a dependency becomes available """
         if not self.directory.available_deps(self.deps):
             return
-        new_queue = []
-        for key, data in self.set_queue:
-            res = self.set_handler(key, data)
-            if not res:
-                new_queue.append((key, data))
-        self.set_queue = new_queue
+        queue = self.set_queue
+        self.set_queue = OrderedDict()
+        for key, data in queue.items():
+            self.counters['retries'] += 1
+            self.process_set(key, data)
+
+    def on_initial_sync(self):
+        """ This method is being executed once, when the initial contents of all tables have been handled """
+        pass
+
+    def get_counters(self):
+        """ Return retry counter and sizes of the queues """
+        return dict(self.counters, set_queue=len(self.set_queue), waiting=len(self.waiting))
 
     def set_handler(self, key, data):
         """ Placeholder for 'SET' command """
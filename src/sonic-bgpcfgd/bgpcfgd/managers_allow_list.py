@@ -23,6 +23,8 @@ class BGPAllowListMgr(Manager):
     V4 = "v4"  # constant for af enum: V4
     V6 = "v6"  # constant for af enum: V6
 
+    MATCH_DEFAULT_ACTION_COMMUNITY = re.compile(r'^set community (\S+) additive$')
+
     def __init__(self, common_objs, db, table):
         """
         Initialize the object
@@ -270,23 +272,19 @@ class BGPAllowListMgr(Manager):
         """
         assert af == self.V4 or af == self.V6
         family = self.__af_to_family(af)
-        match_string = '%s prefix-list %s seq ' % (family, pl_name)
-        conf = self.cfg_mgr.get_text()
-        if not any(line.strip().startswith(match_string) for line in conf):
+        rules = self.cfg_mgr.get_model().get_prefix_list(family, pl_name)
+        if not rules:
             return False, False  # if the prefix list is not exists, it is not correct
         constant_set = set(constant_list)
         allow_set = set(allow_list)
-        for line in conf:
-            if line.startswith(match_string):
-                found = line[len(match_string):].strip().split(' ')
-                rule = " ".join(found[1:])
-                if rule in constant_set:
-                    constant_set.discard(rule)
-                elif rule in allow_set:
-                    if constant_set:
-                        return True, False  # Not everything from constant set is presented
-                    else:
-                        allow_set.discard(rule)
+        for rule in rules:
+            if rule in constant_set:
+                constant_set.discard(rule)
+            elif rule in allow_set:
+                if constant_set:
+                    return True, False  # Not everything from constant set is presented
+                else:
+                    allow_set.discard(rule)
         return True, len(allow_set) == 0  # allow_set should be presented all
 
     def __update_community(self, community_name, community_value):
@@ -338,13 +336,10 @@ class BGPAllowListMgr(Manager):
                           Second element: community value if the first element is True no value otherwise
         """
         log_debug("BGPAllowListMgr::__is_community_presented. community='%s'" % community_name)
-        match_string = 'bgp community-list standard %s permit ' % community_name
-        conf = self.cfg_mgr.get_text()
-        found = [line.strip() for line in conf if line.strip().startswith(match_string)]
+        found = self.cfg_mgr.get_model().get_community_list(community_name)
         if not found:
             return False, None
-        community_value = found[0].replace(match_string, '')
-        return True, community_value
+        return True, found[0]
 
     def __update_allow_route_map_entry(self, af, allow_address_pl_name, community_name, route_map_name):
         """
@@ -398,23 +393,14 @@ class BGPAllowListMgr(Manager):
         :return: a community value used for default action
         """
         log_debug("BGPAllowListMgr::__parse_default_action_route_map_entries. rm='%s'" % route_map_name)
-        match_string = 'route-map %s permit 65535' % route_map_name
-        match_community = re.compile(r'^set community (\S+) additive$')
-        inside_route_map = False
         community_value = ""
-        conf = self.cfg_mgr.get_text()
-        for line in conf + [""]:
-            s_line = line.strip()
-            if inside_route_map:
-                matched = match_community.match(s_line)
-                if matched:
-                    community_value = matched.group(1)
-                    break
-                else:
-                    log_err("BGPAllowListMgr::Found incomplete route-map '%s' entry. seq_no=65535" % route_map_name)
-                inside_route_map = False
-            elif s_line == match_string:
-                inside_route_map = True
+        entry = self.cfg_mgr.get_model().get_route_map(route_map_name).get(65535)
+        if entry is not None and entry.action == 'permit':
+            matched = self.MATCH_DEFAULT_ACTION_COMMUNITY.match(entry.lines[0]) if entry.lines else None
+            if matched:
+                community_value = matched.group(1)
+            else:
+                log_err("BGPAllowListMgr::Found incomplete route-map '%s' entry. seq_no=65535" % route_map_name)
         if community_value == "":
             log_err("BGPAllowListMgr::Default action community value is not found. route-map '%s' entry. seq_no=65535" % route_map_name)
         return community_value
@@ -464,44 +450,31 @@ class BGPAllowListMgr(Manager):
         """
         assert af == self.V4 or af == self.V6
         log_debug("BGPAllowListMgr::__parse_allow_route_map_entries. af='%s', rm='%s'" % (af, route_map_name))
-        match_string = 'route-map %s permit ' % route_map_name
         entries = {}
-        inside_route_map = False
-        route_map_seq_number = None
-        pl_allow_list_name = None
-        community_name = self.EMPTY_COMMUNITY
         if af == self.V4:
             match_pl_allow_list = 'match ip address prefix-list '
         else:  # self.V6
             match_pl_allow_list = 'match ipv6 address prefix-list '
         match_community = 'match community '
-        conf = self.cfg_mgr.get_text()
-        for line in conf + [""]:
-            if inside_route_map:
-                if line.strip().startswith(match_pl_allow_list):
-                    pl_allow_list_name = line.strip()[len(match_pl_allow_list):]
-                    continue
-                elif line.strip().startswith(match_community):
-                    community_name = line.strip()[len(match_community):]
-                    continue
+        for route_map_seq_number, entry in self.cfg_mgr.get_model().get_route_map(route_map_name).items():
+            if entry.action != 'permit':
+                continue
+            pl_allow_list_name = None
+            community_name = self.EMPTY_COMMUNITY
+            for line in entry.lines:
+                if line.startswith(match_pl_allow_list):
+                    pl_allow_list_name = line[len(match_pl_allow_list):]
+                elif line.startswith(match_community):
+                    community_name = line[len(match_community):]
                 else:
-                    if pl_allow_list_name is not None:
-                        entries[route_map_seq_number] = {
-                            'pl_allow_list': pl_allow_list_name,
-                            'community': community_name,
-                        }
-                    else:
-                        if route_map_seq_number != 65535:
-                            log_warn("BGPAllowListMgr::Found incomplete route-map '%s' entry. seq_no=%d" % (route_map_name, route_map_seq_number))
-                    inside_route_map = False
-                    pl_allow_list_name = None
-                    community_name = self.EMPTY_COMMUNITY
-                    route_map_seq_number = None
-            if line.startswith(match_string):
-                found = line[len(match_string):]
-                assert found.isdigit()
-                route_map_seq_number = int(found)
-                inside_route_map = True
+                    break
+            if pl_allow_list_name is not None:
+                entries[route_map_seq_number] = {
+                    'pl_allow_list': pl_allow_list_name,
+                    'community': community_name,
+                }
+            elif route_map_seq_number != 65535:
+                log_warn("BGPAllowListMgr::Found incomplete route-map '%s' entry. seq_no=%d" % (route_map_name, route_map_seq_number))
         return entries
 
     @staticmethod
@@ -535,14 +508,7 @@ class BGPAllowListMgr(Manager):
         Extract names of all peer-groups defined in the config
         :return: list of peer-group names
         """
-        # Find all peer-groups entries
-        re_peer_group = re.compile(r'^\s*neighbor (\S+) peer-group$')
-        peer_groups = []
-        for line in self.cfg_mgr.get_text():
-            result = re_peer_group.match(line)
-            if result:
-                peer_groups.append(result.group(1))
-        return peer_groups
+        return list(self.cfg_mgr.get_model().peer_groups)
 
     def __get_peer_group_to_route_map(self, peer_groups):
         """
@@ -551,15 +517,8 @@ class BGPAllowListMgr(Manager):
         :return: dictionary where key is a peer-group, value is a route-map name which is defined as route-map in
                  for the peer_group.
         """
-        pg_2_rm = {}
-        for pg in peer_groups:
-            re_peer_group_rm = re.compile(r'^\s*neighbor %s route-map (\S+) in$' % pg)
-            for line in self.cfg_mgr.get_text():
-                result = re_peer_group_rm.match(line)
-                if result:
-                    pg_2_rm[pg] = result.group(1)
-                    break
-        return pg_2_rm
+        neighbor_route_maps_in = self.cfg_mgr.get_model().neighbor_route_maps_in
+        return {pg: neighbor_route_maps_in[pg] for pg in peer_groups if pg in neighbor_route_maps_in}
 
     def __get_route_map_calls(self, rms):
         """
@@ -568,23 +527,15 @@ class BGPAllowListMgr(Manager):
         :return: a dictionary: key - name of a route-map, value - name of a route-map call defined for the route-map
         """
         rm_2_call = {}
-        re_rm = re.compile(r'^route-map (\S+) permit \d+$')
-        re_call = re.compile(r'^\s*call (\S+)$')
-        inside_name = None
-        for line in self.cfg_mgr.get_text():
-            if inside_name:
-                inside_result = re_call.match(line)
-                if inside_result:
-                    rm_2_call[inside_name] = inside_result.group(1)
-                    inside_name = None
+        model = self.cfg_mgr.get_model()
+        for rm in rms:
+            for entry in model.get_route_map(rm).values():
+                if entry.action != 'permit':
                     continue
-            result = re_rm.match(line)
-            if not result:
-                continue
-            inside_name = None
-            if result.group(1) not in rms:
-                continue
-            inside_name = result.group(1)
+                for line in entry.lines:
+                    if line.startswith('call '):
+                        rm_2_call[rm] = line[len('call '):]
+                        break
         return rm_2_call
 
     @staticmethod
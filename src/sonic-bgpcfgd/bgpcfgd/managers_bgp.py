@@ -20,9 +20,11 @@ class BGPPeerGroupMgr(object):
         """
         self.cfg_mgr = common_objs['cfg_mgr']
         self.constants = common_objs['constants']
-        tf = common_objs['tf']
-        self.policy_template = tf.from_file(base_template + "policies.conf.j2")
-        self.peergroup_template = tf.from_file(base_template + "peer-group.conf.j2")
+        self.snapshot = common_objs.get('snapshot')
+        self.tf = common_objs['tf']
+        self.base_template = base_template
+        self.policy_template = self.tf.from_file(base_template + "policies.conf.j2")
+        self.peergroup_template = self.tf.from_file(base_template + "peer-group.conf.j2")
 
     def update(self, name, **kwargs):
         """
@@ -41,11 +43,11 @@ class BGPPeerGroupMgr(object):
         :param kwargs: dictionary with parameters for rendering
         """
         try:
-            policy = self.policy_template.render(**kwargs)
+            policy = self.tf.render(self.policy_template, **kwargs)
         except jinja2.TemplateError as e:
             log_err("Can't render policy template name: '%s': %s" % (name, str(e)))
             return False
-        self.update_entity(policy, "Routing policy for peer '%s'" % name)
+        self.update_entity(policy, "Routing policy for peer '%s'" % name, 'policy')
         return True
 
     def update_pg(self, name, **kwargs):
@@ -55,7 +57,7 @@ class BGPPeerGroupMgr(object):
         :param kwargs: dictionary with parameters for rendering
         """
         try:
-            pg = self.peergroup_template.render(**kwargs)
+            pg = self.tf.render(self.peergroup_template, **kwargs)
         except jinja2.TemplateError as e:
             log_err("Can't render peer-group template: '%s': %s" % (name, str(e)))
             return False
@@ -64,20 +66,35 @@ class BGPPeerGroupMgr(object):
             cmd = ('router bgp %s\n' % kwargs['bgp_asn']) + pg
         else:
             cmd = ('router bgp %s vrf %s\n' % (kwargs['bgp_asn'], kwargs['vrf'])) + pg
-        self.update_entity(cmd, "Peer-group for peer '%s'" % name)
+        self.update_entity(cmd, "Peer-group for peer '%s'" % name, ('peer-group', kwargs['vrf']))
         return True
 
-    def update_entity(self, cmd, txt):
+    def update_entity(self, cmd, txt, kind=None):
         """
         Send commands to FRR
         :param cmd: commands to send in a raw form
         :param txt: text for the syslog output
+        :param kind: kind of the configuration: 'policy' or ('peer-group', vrf). It keys the configuration in the snapshot
         :return:
         """
+        if self.snapshot is not None:
+            entity_key = self.get_snapshot_key(kind, cmd)
+            if self.snapshot.is_entity_applied(entity_key, cmd):
+                log_debug("%s is already applied from the snapshot" % txt)
+                return True
+            self.snapshot.stage_entity(entity_key, cmd)
         self.cfg_mgr.push(cmd)
         log_info("%s has been scheduled to be updated" % txt)
         return True
 
+    def get_snapshot_key(self, kind, cmd):
+        """ Key of the configuration of the kind in the snapshot. The configuration without a kind is keyed by its hash """
+        if kind is None:
+            return self.snapshot.get_entity_key(self.base_template, self.snapshot.get_hash(cmd))
+        if isinstance(kind, tuple):
+            return self.snapshot.get_entity_key(self.base_template, *kind)
+        return self.snapshot.get_entity_key(self.base_template, kind)
+
 
 class BGPPeerMgrBase(Manager):
     """ Manager of BGP peers """
@@ -134,6 +151,13 @@ class BGPPeerMgrBase(Manager):
 
         self.peers = self.load_peers()
         self.peer_group_mgr = BGPPeerGroupMgr(self.common_objs, base_template)
+        self.snapshot = common_objs.get('snapshot')
+        self.replayed = set()  # peers of the table which were in the snapshot on start and weren't received yet
+        if self.snapshot is not None:
+            prefix = table_name + "|"
+            for key in self.snapshot.replayed:
+                if key.startswith(prefix):
+                    self.replayed.add(tuple(key[len(prefix):].split('|', 1)))
         return
 
     def set_handler(self, key, data):
@@ -144,7 +168,7 @@ class BGPPeerMgrBase(Manager):
         """
         vrf, nbr = self.split_key(key)
         peer_key = (vrf, nbr)
-        if peer_key not in self.peers:
+        if peer_key not in self.peers or peer_key in self.replayed:
             return self.add_peer(vrf, nbr, data)
         else:
             return self.update_peer(vrf, nbr, data)
@@ -163,6 +187,7 @@ class BGPPeerMgrBase(Manager):
         lo0_ipv4 = self.get_lo0_ipv4()
         if lo0_ipv4 is None:
             log_warn("Loopback0 ipv4 address is not presented yet")
+            self.wait_for("CONFIG_DB", swsscommon.CFG_LOOPBACK_INTERFACE_TABLE_NAME)
             return False
         #
         if "local_addr" not in data:
@@ -175,6 +200,11 @@ class BGPPeerMgrBase(Manager):
             if not interface:
                 print_data = nbr, data["local_addr"]
                 log_debug("Peer '%s' with local address '%s' wait for the corresponding interface to be set" % print_data)
+                local_address = self.directory.get_slot("LOCAL", "local_addresses").get(data["local_addr"], {})
+                if "interface" in local_address:
+                    self.wait_for("LOCAL", "interfaces", local_address["interface"])
+                else:
+                    self.wait_for("LOCAL", "local_addresses", data["local_addr"])
                 return False
             vnet = self.get_vnet(interface)
             if vnet:
@@ -198,6 +228,7 @@ class BGPPeerMgrBase(Manager):
             neigmeta = self.directory.get_slot("CONFIG_DB", swsscommon.CFG_DEVICE_NEIGHBOR_METADATA_TABLE_NAME)
             if 'name' in data and data["name"] not in neigmeta:
                 log_info("DEVICE_NEIGHBOR_METADATA is not ready for neighbor '%s' - '%s'" % (nbr, data['name']))
+                self.wait_for("CONFIG_DB", swsscommon.CFG_DEVICE_NEIGHBOR_METADATA_TABLE_NAME, data["name"])
                 return False
             kwargs['CONFIG_DB__DEVICE_NEIGHBOR_METADATA'] = neigmeta
 
@@ -211,9 +242,19 @@ class BGPPeerMgrBase(Manager):
             log_err("%s: %s" % (msg, str(e)))
             return True
         if cmd is not None:
-            self.apply_op(cmd, vrf)
             key = (vrf, nbr)
+            if key in self.replayed:
+                self.replayed.discard(key)
+                if self.snapshot.is_applied(self.get_snapshot_key(vrf, nbr), self.get_bgp_cmd(cmd, vrf)):
+                    self.peers.add(key)
+                    log_info("Peer '(%s|%s)' has been applied from the snapshot" % (vrf, nbr))
+                    return True
+                # The snapshot configuration is outdated. Recreate the peer
+                self.apply_op(self.templates["delete"].render(neighbor_addr=nbr), vrf)
+            self.apply_op(cmd, vrf)
             self.peers.add(key)
+            if self.snapshot is not None:
+                self.snapshot.stage_peer(self.get_snapshot_key(vrf, nbr), self.get_bgp_cmd(cmd, vrf))
             log_info("Peer '(%s|%s)' has been scheduled to be added with attributes '%s'" % print_data)
 
         return True
@@ -229,6 +270,9 @@ class BGPPeerMgrBase(Manager):
         """
         if "admin_status" in data:
             self.change_admin_status(vrf, nbr, data)
+            if self.snapshot is not None:
+                # The rendered configuration doesn't describe the peer anymore. Don't replay it on the next start
+                self.snapshot.stage_peer(self.get_snapshot_key(vrf, nbr), None)
         else:
             log_err("Peer '(%s|%s)': Can't update the peer. Only 'admin_status' attribute is supported" % (vrf, nbr))
 
@@ -281,22 +325,48 @@ class BGPPeerMgrBase(Manager):
         if ret_code:
             log_info("Peer '(%s|%s)' has been removed" % (vrf, nbr))
             self.peers.remove(peer_key)
+            self.replayed.discard(peer_key)
+            if self.snapshot is not None:
+                self.snapshot.stage_peer(self.get_snapshot_key(vrf, nbr), None)
         else:
             log_err("Peer '(%s|%s)' hasn't been removed" % (vrf, nbr))
 
-    def apply_op(self, cmd, vrf):
+    def on_initial_sync(self):
+        """ Remove peers which were replayed from the snapshot, but were removed from CONFIG_DB """
+        pending = set(self.split_key(key) for key in list(self.set_queue.keys()) + list(self.waiting.keys()))
+        for vrf, nbr in sorted(self.replayed - pending):
+            self.apply_op(self.templates["delete"].render(neighbor_addr=nbr), vrf)
+            self.peers.discard((vrf, nbr))
+            self.snapshot.stage_peer(self.get_snapshot_key(vrf, nbr), None)
+            log_info("Peer '(%s|%s)' from the snapshot isn't in CONFIG_DB. It has been scheduled to be removed" % (vrf, nbr))
+        # The peers still waiting are added when their SET is handled, which corrects the snapshot configuration
+        self.replayed &= pending
+
+    def get_snapshot_key(self, vrf, nbr):
+        """ Key of the peer in the snapshot """
+        return self.snapshot.get_peer_key(self.table_name, vrf, nbr)
+
+    def get_bgp_cmd(self, cmd, vrf):
         """
-        Push commands cmd into FRR
+        Put commands cmd into the 'router bgp' section of the vrf
         :param cmd: commands in raw format
         :param vrf: vrf where the commands should be applied
-        :return: True if no errors, False if there are errors
+        :return: commands with the 'router bgp' section
         """
         bgp_asn = self.directory.get_slot("CONFIG_DB", swsscommon.CFG_DEVICE_METADATA_TABLE_NAME)["localhost"]["bgp_asn"]
         if vrf == 'default':
-            cmd = ('router bgp %s\n' % bgp_asn) + cmd
+            return ('router bgp %s\n' % bgp_asn) + cmd
         else:
-            cmd = ('router bgp %s vrf %s\n' % (bgp_asn, vrf)) + cmd
-        self.cfg_mgr.push(cmd)
+            return ('router bgp %s vrf %s\n' % (bgp_asn, vrf)) + cmd
+
+    def apply_op(self, cmd, vrf):
+        """
+        Push commands cmd into FRR
+        :param cmd: commands in raw format
+        :param vrf: vrf where the commands should be applied
+        :return: True if no errors, False if there are errors
+        """
+        self.cfg_mgr.push(self.get_bgp_cmd(cmd, vrf))
         return True
 
     def get_lo0_ipv4(self):
@@ -1,7 +1,9 @@
-from collections import defaultdict
+import time
+
+from collections import defaultdict, OrderedDict
 from swsscommon import swsscommon
 
-from .log import log_debug, log_crit
+from .log import log_debug, log_crit, log_notice
 
 
 g_run = True
@@ -19,14 +21,33 @@ class Runner(object):
         when corresponding db/table is updated
     """
     SELECT_TIMEOUT = 1000
+    COUNTERS_INTERVAL = 300
 
-    def __init__(self, cfg_manager):
-        """ Constructor """
+    def __init__(self, cfg_manager, coalesce_window=0, coalesce_max_events=1000, tf=None):
+        """
+        Constructor
+        :param cfg_manager: ConfigMgr object, committed once per batch of events
+        :param coalesce_window: time in milliseconds to keep collecting events after the first one
+                                before they are handled and committed together. 0 disables coalescing
+        :param coalesce_max_events: maximum number of events collected in one coalescing window
+        :param tf: TemplateFabric object which render cache statistics are reported with the counters
+        """
         self.cfg_manager = cfg_manager
+        self.tf = tf
+        self.counters_logged = time.time()
+        self.coalesce_window = coalesce_window
+        self.coalesce_max_events = coalesce_max_events
         self.db_connectors = {}
         self.selector = swsscommon.Select()
         self.callbacks = defaultdict(lambda: defaultdict(list))  # db -> table -> handlers[]
         self.subscribers = set()
+        self.managers = []
+        self.initial_sync_done = False
+        self.counters = {
+            'events_received': 0,
+            'events_coalesced': 0,
+            'commits': 0,
+        }
 
     def add_manager(self, manager):
         """
@@ -47,24 +68,124 @@ class Runner(object):
             self.subscribers.add(subscriber)
             self.selector.addSelectable(subscriber)
         self.callbacks[db][table_name].append(manager.handler)
+        self.managers.append(manager)
 
     def run(self):
         """ Main loop """
         while g_run:
             state, _ = self.selector.select(Runner.SELECT_TIMEOUT)
+            if time.time() - self.counters_logged >= Runner.COUNTERS_INTERVAL:
+                self.log_counters()
             if state == self.selector.TIMEOUT:
+                if not self.initial_sync_done:
+                    self.on_initial_sync()
+                self.cfg_manager.checkpoint()
                 continue
             elif state == self.selector.ERROR:
                 raise Exception("Received error from select")
 
-            for subscriber in self.subscribers:
-                while True:
-                    key, op, fvs = subscriber.pop()
-                    if not key:
-                        break
-                    log_debug("Received message : '%s'" % str((key, op, fvs)))
-                    for callback in self.callbacks[subscriber.getDbConnector().getDbId()][subscriber.getTableName()]:
-                        callback(key, op, dict(fvs))
+            if self.coalesce_window > 0:
+                self.handle_events(self.coalesce(self.collect_events()))
+            else:
+                self.handle_events(self.pop_events())
+            self.counters['commits'] += 1
             rc = self.cfg_manager.commit()
             if not rc:
                 log_crit("Runner::commit was unsuccessful")
+        self.cfg_manager.checkpoint()
+        self.log_counters()
+
+    def on_initial_sync(self):
+        """ Notify the managers that the initial contents of the tables have been handled """
+        self.initial_sync_done = True
+        for manager in self.managers:
+            manager.on_initial_sync()
+        if not self.cfg_manager.commit():
+            log_crit("Runner::commit was unsuccessful")
+        self.cfg_manager.on_initial_sync()
+
+    def pop_events(self):
+        """
+        Pop all pending events from all subscribers
+        :return: list of events: (db, table, key, op, data)
+        """
+        events = []
+        for subscriber in self.subscribers:
+            while True:
+                key, op, fvs = subscriber.pop()
+                if not key:
+                    break
+                log_debug("Received message : '%s'" % str((key, op, fvs)))
+                events.append((subscriber.getDbConnector().getDbId(), subscriber.getTableName(), key, op, dict(fvs)))
+        self.counters['events_received'] += len(events)
+        return events
+
+    def collect_events(self):
+        """
+        Pop events until the coalescing window expires, no more events arrive
+        within the window or coalesce_max_events events were collected
+        :return: list of events: (db, table, key, op, data)
+        """
+        deadline = time.time() + self.coalesce_window / 1000.0
+        events = self.pop_events()
+        while len(events) < self.coalesce_max_events:
+            timeout = int((deadline - time.time()) * 1000)
+            if timeout <= 0:
+                break
+            state, _ = self.selector.select(timeout)
+            if state == self.selector.TIMEOUT:
+                break
+            elif state == self.selector.ERROR:
+                raise Exception("Received error from select")
+            events += self.pop_events()
+        return events
+
+    def coalesce(self, events):
+        """
+        Collapse the events on the same key: consecutive 'SET' are replaced by the last one,
+        and a 'DEL' cancels the events before it. The ops left for a key are a 'DEL' followed by a 'SET' at most,
+        so a key deleted and created again is still recreated from scratch.
+        The keys are handled in the order of their first event
+        :param events: list of events: (db, table, key, op, data)
+        :return: list of coalesced events
+        """
+        ops = OrderedDict()  # (db, table, key) -> [ (op, data) ]
+        for db, table, key, op, data in events:
+            key_ops = ops.setdefault((db, table, key), [])
+            if op == swsscommon.DEL_COMMAND:
+                del key_ops[:]
+            elif key_ops and key_ops[-1][0] == swsscommon.SET_COMMAND:
+                key_ops.pop()
+            key_ops.append((op, data))
+        coalesced = [(db, table, key, op, data) for (db, table, key), key_ops in ops.items() for op, data in key_ops]
+        self.counters['events_coalesced'] += len(events) - len(coalesced)
+        log_debug("Runner: %d events coalesced into %d" % (len(events), len(coalesced)))
+        return coalesced
+
+    def handle_events(self, events):
+        """
+        Run the handlers of the events
+        :param events: list of events: (db, table, key, op, data)
+        """
+        for db, table, key, op, data in events:
+            for callback in self.callbacks[db][table]:
+                callback(key, op, data)
+
+    def log_counters(self):
+        """ Report the event and commit counters """
+        self.counters_logged = time.time()
+        frr = self.cfg_manager.frr
+        counters = dict(self.counters,
+                        vtysh_invocations=getattr(frr, 'vtysh_invocations', 0),
+                        vty_commands=getattr(frr, 'vty_commands', 0))
+        log_notice("Runner counters: %s" % ", ".join("%s=%s" % item for item in sorted(counters.items())))
+        for manager in self.managers:
+            manager_counters = manager.get_counters()
+            if any(manager_counters.values()):
+                log_notice("Manager %s(%s) counters: %s" % (manager.__class__.__name__, manager.get_table_name(),
+                           ", ".join("%s=%s" % item for item in sorted(manager_counters.items()))))
+        if self.managers:
+            directory = self.managers[0].directory
+            log_notice("Directory counters: %s" % ", ".join("%s=%s" % item for item in sorted(directory.counters.items())))
+        if self.tf is not None:
+            log_notice("Render cache counters: %s" % ", ".join("%s=%s" % item for item in sorted(self.tf.render_cache.stats.items())))
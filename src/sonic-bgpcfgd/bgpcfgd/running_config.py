@@ -0,0 +1,118 @@
+from collections import OrderedDict
+
+
+class ConfigNode(object):
+    """ A line of FRR configuration with the lines indented under it """
+    def __init__(self, line, indent):
+        self.line = line
+        self.indent = indent
+        self.children = []
+
+
+class RouteMapEntry(object):
+    """ One 'route-map NAME ACTION SEQ' entry """
+    def __init__(self, name, action, seq, lines):
+        self.name = name
+        self.action = action
+        self.seq = seq
+        self.lines = lines  # stripped lines of the entry body in the running config order
+
+
+class RunningConfig(object):
+    """
+    Parsed FRR running configuration.
+    The configuration is kept as a tree built from the lines indentation and as indexes by section type,
+    so managers can look up peer-groups, route-maps, prefix-lists and community-lists without scanning the text
+    """
+    def __init__(self, lines):
+        """
+        Constructor
+        :param lines: lines of the running configuration without comments. Type: List of strings
+        """
+        self.roots = []
+        self.peer_groups = []               # peer-group names in the configuration order
+        self.neighbor_route_maps_in = {}    # neighbor or peer-group -> the first inbound route-map
+        self.route_maps = {}                # route-map name -> OrderedDict: sequence number -> RouteMapEntry
+        self.prefix_lists = {}              # (family, name) -> list of rules in 'ACTION PREFIX [le|ge N]' format
+        self.community_lists = {}           # standard community-list name -> list of permitted values
+        self.bgp_asns = {}                  # vrf name -> asn of the 'router bgp' instance
+        self.bgp_neighbors = {}             # vrf name -> set of neighbors and peer-groups configured in the instance
+        self.__build_tree(lines)
+        for root in self.roots:
+            self.__index_top_level(root)
+            self.__index_neighbors(root)
+
+    def __build_tree(self, lines):
+        stack = []
+        for line in lines:
+            s_line = line.strip()
+            if s_line == '':
+                continue
+            node = ConfigNode(s_line, len(line) - len(line.lstrip()))
+            while stack and stack[-1].indent >= node.indent:
+                stack.pop()
+            if stack:
+                stack[-1].children.append(node)
+            else:
+                self.roots.append(node)
+            stack.append(node)
+
+    def __index_top_level(self, node):
+        tokens = node.line.split(' ')
+        if tokens[0] == 'route-map' and len(tokens) == 4 and tokens[3].isdigit():
+            name, action, seq = tokens[1], tokens[2], int(tokens[3])
+            lines = [line for child in node.children for line in self.__flatten(child)]
+            self.route_maps.setdefault(name, OrderedDict())[seq] = RouteMapEntry(name, action, seq, lines)
+        elif tokens[0] in ('ip', 'ipv6') and len(tokens) > 5 and tokens[1] == 'prefix-list' and tokens[3] == 'seq':
+            self.prefix_lists.setdefault((tokens[0], tokens[2]), []).append(" ".join(tokens[5:]))
+        elif tokens[0] == 'router' and len(tokens) in (3, 5) and tokens[1] == 'bgp':
+            vrf = tokens[4] if len(tokens) == 5 and tokens[3] == 'vrf' else 'default'
+            self.bgp_asns[vrf] = tokens[2]
+            neighbors = self.bgp_neighbors.setdefault(vrf, set())
+            for line in self.__flatten(node):
+                if line.startswith('neighbor '):
+                    neighbors.add(line.split(' ', 2)[1])
+        elif node.line.startswith('bgp community-list standard ') and len(tokens) > 5 and tokens[4] == 'permit':
+            self.community_lists.setdefault(tokens[3], []).append(" ".join(tokens[5:]))
+
+    def __index_neighbors(self, node):
+        tokens = node.line.split(' ')
+        if tokens[0] == 'neighbor':
+            if len(tokens) == 3 and tokens[2] == 'peer-group':
+                self.peer_groups.append(tokens[1])
+            elif len(tokens) == 5 and tokens[2] == 'route-map' and tokens[4] == 'in':
+                self.neighbor_route_maps_in.setdefault(tokens[1], tokens[3])
+        for child in node.children:
+            self.__index_neighbors(child)
+
+    @classmethod
+    def __flatten(cls, node):
+        yield node.line
+        for child in node.children:
+            for line in cls.__flatten(child):
+                yield line
+
+    def get_route_map(self, name):
+        """
+        Get entries of a route-map
+        :param name: route-map name
+        :return: OrderedDict: sequence number -> RouteMapEntry. Empty if the route-map doesn't exist
+        """
+        return self.route_maps.get(name, OrderedDict())
+
+    def get_prefix_list(self, family, name):
+        """
+        Get rules of a prefix-list
+        :param family: 'ip' or 'ipv6'
+        :param name: prefix-list name
+        :return: list of rules or None if the prefix-list doesn't exist
+        """
+        return self.prefix_lists.get((family, name))
+
+    def get_community_list(self, name):
+        """
+        Get values of a standard community-list
+        :param name: community-list name
+        :return: list of permitted community values or None if the community-list doesn't exist
+        """
+        return self.community_lists.get(name)
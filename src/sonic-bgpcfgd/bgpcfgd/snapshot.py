@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from collections import OrderedDict
+from swsscommon import swsscommon
+
+from .log import log_debug, log_err, log_info, log_warn
+
+
+class Snapshot(object):
+    """
+    Last state applied by bgpcfgd to FRR: per-peer rendered configuration with its hash,
+    the peer-group and policy configuration shared by peers, and the bgp asn it was made for.
+    The snapshot is saved at most every SAVE_INTERVAL seconds after a successful commit, and on
+    checkpoints: when bgpcfgd is idle and on exit. On the container restart it is replayed
+    into FRR with one write, then the peers received from CONFIG_DB are compared with it by hash
+    and only the differences are pushed. A snapshot which misses the last changes is still
+    consistent: the peers which differ from it are pushed again
+    """
+    VERSION = 2
+    SAVE_INTERVAL = 60
+
+    def __init__(self, path, directory):
+        """
+        Constructor
+        :param path: path to the snapshot file
+        :param directory: Directory object which provides the bgp asn saved with the snapshot
+        """
+        self.path = path
+        self.directory = directory
+        self.bgp_asn = None
+        self.entities = OrderedDict()  # entity key -> {'hash': hash of the configuration, 'config': configuration}
+        self.peers = {}                # peer key -> {'hash': hash of the peer configuration, 'config': configuration}
+        self.staged_entities = OrderedDict()
+        self.staged_peers = {}         # peer key -> new value or None, if the peer was removed
+        self.replayed = set()          # keys of the peers which were in the snapshot on start, until the initial sync
+        self.dirty = False             # True if there are committed changes which weren't saved yet
+        self.saved_at = time.time()
+
+    @staticmethod
+    def get_hash(config):
+        """ Hash of a configuration text """
+        return hashlib.sha1(config.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get_peer_key(table, vrf, nbr):
+        """ Key of a peer in the snapshot """
+        return "%s|%s|%s" % (table, vrf, nbr)
+
+    @staticmethod
+    def get_entity_key(*kind):
+        """ Key of a peer-group or policy configuration in the snapshot """
+        return "|".join(kind)
+
+    def load(self):
+        """
+        Load the snapshot from the file
+        :return: True if the snapshot was loaded, False otherwise
+        """
+        if not os.path.exists(self.path):
+            log_info("Snapshot '%s' doesn't exist" % self.path)
+            return False
+        try:
+            with open(self.path) as fp:
+                content = json.load(fp, object_pairs_hook=OrderedDict)
+        except (IOError, OSError, ValueError) as e:
+            log_err("Can't read snapshot '%s': %s" % (self.path, str(e)))
+            return False
+        if content.get('version') != self.VERSION:
+            log_warn("Snapshot '%s' has unsupported version '%s'" % (self.path, content.get('version')))
+            return False
+        self.entities = content.get('entities', OrderedDict())
+        self.peers = content.get('peers', {})
+        self.bgp_asn = content.get('bgp_asn')
+        self.replayed = set(self.peers.keys())
+        log_info("Snapshot '%s' has been loaded: %d peers" % (self.path, len(self.peers)))
+        return True
+
+    def save(self):
+        """ Save the snapshot into the file atomically """
+        self.saved_at = time.time()
+        content = OrderedDict([
+            ('version', self.VERSION),
+            ('bgp_asn', self.directory.get_path("CONFIG_DB", swsscommon.CFG_DEVICE_METADATA_TABLE_NAME, "localhost/bgp_asn")),
+            ('entities', self.entities),
+            ('peers', self.peers),
+        ])
+        dirname = os.path.dirname(self.path)
+        try:
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            fd, tmp_filename = tempfile.mkstemp(dir=dirname)
+            with os.fdopen(fd, 'w') as fp:
+                json.dump(content, fp, default=str)
+            os.rename(tmp_filename, self.path)
+        except (IOError, OSError) as e:
+            log_err("Can't save snapshot '%s': %s" % (self.path, str(e)))
+            return
+        self.dirty = False
+        log_debug("Snapshot has been saved: %d peers" % len(self.peers))
+
+    def checkpoint(self):
+        """ Save the snapshot if there are committed changes which weren't saved yet """
+        if self.dirty:
+            self.save()
+
+    def get_replay_config(self, running_config):
+        """
+        Get configuration to replay into FRR: the shared configuration and the peers which FRR doesn't have
+        :param running_config: RunningConfig object with the FRR running configuration
+        :return: configuration text, empty if there is nothing to replay
+        """
+        frr_asn = running_config.bgp_asns.get('default')
+        if frr_asn is not None and self.bgp_asn is not None and frr_asn != self.bgp_asn:
+            log_warn("FRR runs bgp asn '%s', the snapshot was made for asn '%s'. Skip the replay" % (frr_asn, self.bgp_asn))
+            self.entities = OrderedDict()
+            self.peers = {}
+            self.replayed = set()
+            return ""
+        peers = []
+        for key in sorted(self.peers.keys()):
+            _, vrf, nbr = key.split('|', 2)
+            if nbr not in running_config.bgp_neighbors.get(vrf, ()):
+                peers.append(self.peers[key]['config'])
+        if not peers:
+            return ""
+        log_info("Replay %d peers from the snapshot" % len(peers))
+        return "\n".join([entity['config'] for entity in self.entities.values()] + peers)
+
+    def is_applied(self, key, config):
+        """
+        Check that a peer was replayed from the snapshot with the same configuration
+        :param key: peer key
+        :param config: rendered configuration of the peer
+        :return: True if FRR already has the configuration
+        """
+        return key in self.replayed and key in self.peers and self.peers[key]['hash'] == self.get_hash(config)
+
+    def is_entity_applied(self, key, config):
+        """
+        Check that a peer-group or policy configuration was replayed from the snapshot
+        :param key: entity key
+        :param config: rendered configuration
+        :return: True if FRR already has the configuration
+        """
+        return bool(self.replayed) and key in self.entities and self.entities[key]['hash'] == self.get_hash(config)
+
+    def stage_entity(self, key, config):
+        """
+        Record a peer-group or policy configuration pushed to FRR. It replaces the previous configuration of the key
+        :param key: entity key
+        :param config: configuration
+        """
+        self.staged_entities[key] = {'hash': self.get_hash(config), 'config': config}
+
+    def stage_peer(self, key, config):
+        """
+        Record a peer configuration pushed to FRR
+        :param key: peer key
+        :param config: configuration of the peer. None if the peer was removed
+        """
+        if config is None:
+            self.staged_peers[key] = None
+        else:
+            self.staged_peers[key] = {'hash': self.get_hash(config), 'config': config}
+
+    def commit(self, success):
+        """
+        Apply staged changes after a commit to FRR. The snapshot is saved if it wasn't saved for SAVE_INTERVAL seconds
+        :param success: True if the commit was successful. Staged changes are dropped otherwise
+        """
+        if success and (self.staged_entities or self.staged_peers):
+            for key, value in self.staged_entities.items():
+                self.entities.pop(key, None)  # keep the entities in the order they were applied
+                self.entities[key] = value
+            for key, value in self.staged_peers.items():
+                if value is None:
+                    self.peers.pop(key, None)
+                else:
+                    self.peers[key] = value
+            self.dirty = True
+            if time.time() - self.saved_at >= self.SAVE_INTERVAL:
+                self.save()
+        self.staged_entities.clear()
+        self.staged_peers.clear()
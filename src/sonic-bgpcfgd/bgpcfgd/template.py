@@ -1,8 +1,11 @@
+import hashlib
 from collections import OrderedDict
-from functools import partial
 
+import ip_filters
 import jinja2
-import netaddr
+import jinja2.meta
+
+from j2_bundle import BundleLoader
 
 from .log import log_err
 
@@ -10,14 +13,16 @@ class TemplateFabric(object):
     """ Fabric for rendering jinja2 templates """
     def __init__(self, template_path = '/usr/share/sonic/templates'):
         j2_template_paths = [template_path]
-        j2_loader = jinja2.FileSystemLoader(j2_template_paths)
-        j2_env = jinja2.Environment(loader=j2_loader, trim_blocks=False)
-        j2_env.filters['ipv4'] = self.is_ipv4
-        j2_env.filters['ipv6'] = self.is_ipv6
-        j2_env.filters['pfx_filter'] = self.pfx_filter
-        for attr in ['ip', 'network', 'prefixlen', 'netmask']:
-            j2_env.filters[attr] = partial(self.prefix_attr, attr)
+        # Prefer the templates precompiled at image build time
+        j2_loader = BundleLoader(jinja2.FileSystemLoader(j2_template_paths))
+        j2_env = jinja2.Environment(loader=j2_loader, **ip_filters.BGPCFGD_ENV_OPTIONS)
+        ip_filters.set_filters(j2_env, ip_filters.BGPCFGD_FILTERS, {
+            'ipv4': self.is_ipv4,
+            'ipv6': self.is_ipv6,
+            'pfx_filter': self.pfx_filter,
+        }, self.prefix_attr)
         self.env = j2_env
+        self.render_cache = RenderCache(j2_env)
 
     def from_file(self, filename):
         """
@@ -35,33 +40,24 @@ class TemplateFabric(object):
         """
         return self.env.from_string(tmpl)
 
+    def render(self, template, **kwargs):
+        """
+        Render a template using the render cache
+        :param template: Jinja2 template object
+        :param kwargs: variables for rendering
+        :return: rendered text
+        """
+        return self.render_cache.render(template, **kwargs)
+
     @staticmethod
     def is_ipv4(value):
         """ Return True if the value is an ipv4 address """
-        if not value:
-            return False
-        if isinstance(value, netaddr.IPNetwork):
-            addr = value
-        else:
-            try:
-                addr = netaddr.IPNetwork(str(value))
-            except (netaddr.NotRegisteredError, netaddr.AddrFormatError, netaddr.AddrConversionError):
-                return False
-        return addr.version == 4
+        return ip_filters.is_ipv4(value)
 
     @staticmethod
     def is_ipv6(value):
         """ Return True if the value is an ipv6 address """
-        if not value:
-            return False
-        if isinstance(value, netaddr.IPNetwork):
-            addr = value
-        else:
-            try:
-                addr = netaddr.IPNetwork(str(value))
-            except (netaddr.NotRegisteredError, netaddr.AddrFormatError, netaddr.AddrConversionError):
-                return False
-        return addr.version == 6
+        return ip_filters.is_ipv6(value)
 
     @staticmethod
     def prefix_attr(attr, value):
@@ -71,14 +67,7 @@ class TemplateFabric(object):
         :param value: the string representation of ip prefix which will be converted to IPNetwork.
         :return: the value of the extracted attribute
         """
-        if not value:
-            return None
-        else:
-            try:
-                prefix = netaddr.IPNetwork(str(value))
-            except (netaddr.NotRegisteredError, netaddr.AddrFormatError, netaddr.AddrConversionError):
-                return None
-        return str(getattr(prefix, attr))
+        return ip_filters.prefix_attr(attr, value)
 
     @staticmethod
     def pfx_filter(value):
@@ -105,4 +94,78 @@ class TemplateFabric(object):
                     log_err("'%s' is invalid ip address" % ip_address)
             else:
                 table[key] = val
-        return table
\ No newline at end of file
+        return table
+
+class RenderCache(object):
+    """
+    Results of rendering templates, keyed by the template name and the hash of the variables the template uses.
+    Variables which the template doesn't reference don't change the key, so peers sharing a peer-group
+    get the rendered text from the cache
+    """
+    def __init__(self, env, max_entries=256):
+        """
+        Constructor
+        :param env: Jinja2 environment which loads the templates
+        :param max_entries: maximum number of rendered texts in the cache
+        """
+        self.env = env
+        self.max_entries = max_entries
+        self.results = OrderedDict()  # (template name, hash of the variables) -> rendered text
+        self.variables = {}           # template name -> sorted names of the used variables. None if it can't be cached
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'uncached': 0,
+        }
+
+    def render(self, template, **kwargs):
+        """
+        Render a template or get the result of the previous rendering with the same variables
+        :param template: Jinja2 template object
+        :param kwargs: variables for rendering
+        :return: rendered text
+        """
+        variables = self.get_variables(template.name)
+        if variables is None:
+            self.stats['uncached'] += 1
+            return template.render(**kwargs)
+        key = template.name, self.get_hash([(name, kwargs.get(name)) for name in variables])
+        if key in self.results:
+            self.stats['hits'] += 1
+            self.results.move_to_end(key)
+            return self.results[key]
+        self.stats['misses'] += 1
+        text = template.render(**kwargs)
+        self.results[key] = text
+        if len(self.results) > self.max_entries:
+            self.results.popitem(last=False)
+        return text
+
+    def get_variables(self, name):
+        """
+        Get the variables used by a template
+        :param name: name of the template
+        :return: sorted list of variable names. None if the template doesn't have a name or it imports other templates
+        """
+        if name not in self.variables:
+            variables = None
+            if name is not None:
+                source = self.env.loader.get_source(self.env, name)[0]
+                ast = self.env.parse(source)
+                if not list(jinja2.meta.find_referenced_templates(ast)):
+                    variables = sorted(jinja2.meta.find_undeclared_variables(ast))
+            self.variables[name] = variables
+        return self.variables[name]
+
+    @classmethod
+    def get_hash(cls, value):
+        """ Hash of the value which doesn't depend on the order of dictionary keys """
+        return hashlib.sha1(repr(cls.normalize(value)).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def normalize(cls, value):
+        if isinstance(value, dict):
+            return sorted((repr(k), cls.normalize(v)) for k, v in value.items())
+        if isinstance(value, (list, tuple)):
+            return [cls.normalize(v) for v in value]
+        return value
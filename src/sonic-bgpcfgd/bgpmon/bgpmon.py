@@ -22,15 +22,44 @@ Description: bgpmon.py -- populating bgp related information in stateDB.
     "previous" neighbor dictionary will be kept and used to determine if there
     is a need to perform update or the peer is stale to be removed from the
     state DB
+
+    With --mode event the FRR log file is followed instead (see log_tailer.py).
+    Every '%ADJCHANGE' message updates the state of that neighbor only: an 'Up'
+    neighbor is Established, the state of a 'Down' neighbor is requested from
+    vtysh for this neighbor. Only neighbors of the default VRF are updated
+    this way: a message for a neighbor of another VRF runs the full neighbor
+    state reconciliation described above, as any log activity does in the
+    polling mode. The reconciliation also runs every --reconcile-interval
+    seconds, to catch anything missed in the log (rotation races, lost messages).
 """
+import argparse
 import subprocess
 import json
 import os
+import re
 import syslog
 import swsssdk
 import time
 
+from .log_tailer import LogTailer
+
 PIPE_BATCH_MAX_COUNT = 50
+FRR_LOG_FILE = "/var/log/frr/frr.log"
+# Changing more neighbors than this in one batch triggers the full reconciliation
+EVENT_BATCH_MAX_PEERS = 32
+# '%ADJCHANGE: neighbor 10.0.0.1(ARISTA01T1) in vrf default Up' or '%ADJCHANGE: neighbor 10.0.0.1 Down ...'
+ADJCHANGE_RE = re.compile(r"%ADJCHANGE: neighbor (\S+?)(?:\([^)]*\))?(?: in vrf (\S+))? (Up|Down)\b")
+
+
+def parse_adjchange(line):
+    """Extract a neighbor state change from a FRR log line.
+    Returns:
+        (peer, vrf, is_up) tuple or None if the line doesn't report a state change
+    """
+    m = ADJCHANGE_RE.search(line)
+    if m is None:
+        return None
+    return m.group(1), m.group(2) or "default", m.group(3) == "Up"
 
 class BgpStateGet:
     def __init__(self):
@@ -87,6 +116,50 @@ class BgpStateGet:
             if key == "ipv4Unicast" or key == "ipv6Unicast":
                 self.update_new_peer_states(value)
 
+    # Get the current state of one neighbor. Returns (False, None) if vtysh failed,
+    # (True, None) if the neighbor doesn't exist and (True, state) otherwise
+    def get_neigh_state(self, peer):
+        cmd = "vtysh -c 'show bgp neighbors {} json'".format(peer)
+        rc, output = subprocess.getstatusoutput(cmd)
+        if rc:
+            syslog.syslog(syslog.LOG_ERR, "*ERROR* Failed with rc:{} when execute: {}".format(rc, cmd))
+            return False, None
+        try:
+            return True, json.loads(output)[peer]["bgpState"]
+        except (ValueError, KeyError, TypeError):
+            return True, None
+
+    # Update state DB for the neighbors reported by %ADJCHANGE messages only.
+    # changes{} maps the neighbor address to True if it went up, False if it went down
+    def update_changed_neigh_states(self, changes):
+        data = {}
+        for peer, is_up in changes.items():
+            if is_up:
+                state = "Established"
+            else:
+                ok, state = self.get_neigh_state(peer)
+                if not ok:
+                    # the next reconciliation will update this neighbor
+                    continue
+            key = "NEIGH_STATE_TABLE|%s" % peer
+            if state is None:
+                if peer in self.peer_l:
+                    data[key] = None
+                    self.peer_l.remove(peer)
+                    del self.peer_state[peer]
+            elif self.peer_state.get(peer) != state:
+                data[key] = {'state':state}
+                self.peer_state[peer] = state
+                self.peer_l.add(peer)
+            if len(data) > PIPE_BATCH_MAX_COUNT:
+                self.flush_pipe(data)
+        if len(data) > 0:
+            self.flush_pipe(data)
+
+    def reconcile(self):
+        self.get_all_neigh_states()
+        self.update_neigh_states()
+
     # This method will take the caller's dictionary which contains the peer state operation
     # That need to be updated in StateDB using Redis pipeline.
     # The data{} will be cleared at the end of this method before returning to caller.
@@ -148,9 +221,52 @@ class BgpStateGet:
         # Save the new set
         self.peer_l = self.new_peer_l.copy()
 
+def handle_log_lines(bgp_state_get, lines):
+    """Apply the neighbor state changes found in the log lines.
+    Returns:
+        False if the full reconciliation is required, because there are too
+        many changes or a neighbor of a non-default VRF changed
+    """
+    changes = {}
+    for line in lines:
+        change = parse_adjchange(line)
+        if change is None:
+            continue
+        if change[1] != "default":
+            # 'show bgp neighbors <peer>' only looks up the default VRF
+            return False
+        changes[change[0]] = change[2]
+    if len(changes) > EVENT_BATCH_MAX_PEERS:
+        return False
+    if changes:
+        bgp_state_get.update_changed_neigh_states(changes)
+    return True
+
+
+def run_event_mode(bgp_state_get, tailer, reconcile_interval):
+    bgp_state_get.reconcile()
+    last_reconcile = time.time()
+    while True:
+        timeout = last_reconcile + reconcile_interval - time.time()
+        reconcile_required = False
+        if tailer.wait(timeout):
+            reconcile_required = not handle_log_lines(bgp_state_get, tailer.read_lines())
+        if reconcile_required or time.time() - last_reconcile >= reconcile_interval:
+            bgp_state_get.reconcile()
+            last_reconcile = time.time()
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Populate BGP neighbor states in STATE_DB")
+    parser.add_argument("--mode", choices=["poll", "event"], default="poll",
+                        help="poll: check the FRR log timestamp periodically; event: follow the FRR log messages")
+    parser.add_argument("--poll-interval", type=int, default=15, help="poll mode check interval in seconds")
+    parser.add_argument("--reconcile-interval", type=int, default=300,
+                        help="event mode full reconciliation interval in seconds")
+    parser.add_argument("--log-file", default=FRR_LOG_FILE, help="FRR log file followed in event mode")
+    args = parser.parse_args()
 
-    syslog.syslog(syslog.LOG_INFO, "bgpmon service started")
+    syslog.syslog(syslog.LOG_INFO, "bgpmon service started in {} mode".format(args.mode))
     bgp_state_get = None
     try:
         bgp_state_get = BgpStateGet()
@@ -158,12 +274,14 @@ def main():
         syslog.syslog(syslog.LOG_ERR, "{}: error exit 1, reason {}".format("THIS_MODULE", str(e)))
         exit(1)
 
+    if args.mode == "event":
+        run_event_mode(bgp_state_get, LogTailer(args.log_file), args.reconcile_interval)
+
     # periodically obtain the new neighbor information and update if necessary
     while True:
-        time.sleep(15)
+        time.sleep(args.poll_interval)
         if bgp_state_get.bgp_activity_detected():
-            bgp_state_get.get_all_neigh_states()
-            bgp_state_get.update_neigh_states()
+            bgp_state_get.reconcile()
 
 if __name__ == '__main__':
     main()
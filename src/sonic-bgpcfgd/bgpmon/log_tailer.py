@@ -0,0 +1,144 @@
+"""
+Description: log_tailer.py -- follow lines appended to a log file.
+    The directory of the log file is watched with inotify, so the reader wakes
+    up as soon as the file is written, created or rotated. The read position and
+    the inode of the file are tracked: when the file is rotated or truncated it
+    is read again from the beginning. If inotify isn't available, the file size
+    and inode are polled every second instead.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+
+IN_MODIFY = 0x00000002
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+IN_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+POLL_INTERVAL = 1.0
+READ_MAX_BYTES = 1024 * 1024
+
+
+class Inotify:
+    """ Minimal inotify binding watching one directory """
+    def __init__(self, path, mask=IN_MODIFY | IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, path.encode(), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, "inotify_add_watch failed for '%s'" % path)
+
+    def fileno(self):
+        return self.fd
+
+    def read_names(self):
+        """ Return names of the directory entries which had events since the last call """
+        names = set()
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return names
+                raise
+            offset = 0
+            while offset + IN_EVENT_HEADER.size <= len(buf):
+                _, _, _, length = IN_EVENT_HEADER.unpack_from(buf, offset)
+                offset += IN_EVENT_HEADER.size
+                names.add(buf[offset:offset + length].rstrip(b"\0").decode(errors="replace"))
+                offset += length
+
+    def close(self):
+        os.close(self.fd)
+
+
+class LogTailer:
+    """ Return the lines appended to a log file since the previous read """
+    def __init__(self, path, from_start=False):
+        """
+        Constructor
+        :param path: path to the log file
+        :param from_start: read the existing content of the file. Otherwise only new lines are returned
+        """
+        self.path = path
+        self.name = os.path.basename(path)
+        self.inode = None
+        self.position = 0
+        self.partial = b""
+        self.changed = True
+        try:
+            self.inotify = Inotify(os.path.dirname(path) or ".")
+        except (OSError, AttributeError):
+            self.inotify = None
+        if not from_start:
+            self.inode, self.position = self.__get_stat()
+            self.changed = False
+
+    def wait(self, timeout):
+        """
+        Wait until the log file is changed
+        :param timeout: maximum time to wait in seconds
+        :return: True if the file could have new lines
+        """
+        if self.changed:
+            return True
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            if self.inotify is not None:
+                ready, _, _ = select.select([self.inotify], [], [], remaining)
+                if ready and self.name in self.inotify.read_names():
+                    self.changed = True
+            else:
+                time.sleep(min(POLL_INTERVAL, remaining))
+                self.changed = self.__get_stat() != (self.inode, self.position)
+            if self.changed:
+                return True
+
+    def read_lines(self):
+        """ Return complete lines appended to the file since the last call """
+        self.changed = False
+        inode, size = self.__get_stat()
+        if inode is None:
+            return []
+        if inode != self.inode or size < self.position:
+            # the file was rotated or truncated
+            self.inode = inode
+            self.position = 0
+            self.partial = b""
+        if size == self.position:
+            return []
+        with open(self.path, "rb") as fp:
+            fp.seek(self.position)
+            data = fp.read(READ_MAX_BYTES)
+        self.position += len(data)
+        if self.position < size:
+            self.changed = True
+        lines = (self.partial + data).split(b"\n")
+        self.partial = lines.pop()
+        return [line.decode(errors="replace") for line in lines]
+
+    def __get_stat(self):
+        try:
+            st = os.stat(self.path)
+        except (IOError, OSError):
+            return None, 0
+        return st.st_ino, st.st_size
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
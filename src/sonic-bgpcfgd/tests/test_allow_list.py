@@ -3,6 +3,7 @@ from unittest.mock import MagicMock, patch
 import bgpcfgd.frr
 from bgpcfgd.directory import Directory
 from bgpcfgd.template import TemplateFabric
+from bgpcfgd.running_config import RunningConfig
 import bgpcfgd
 from copy import deepcopy
 
@@ -41,6 +42,7 @@ def set_del_test(op, args, currect_config, expected_config, update_global_defaul
     cfg_mgr.update.return_value = None
     cfg_mgr.push_list = push_list
     cfg_mgr.get_text.return_value = currect_config
+    cfg_mgr.get_model.return_value = RunningConfig(currect_config)
     common_objs = {
         'directory': Directory(),
         'cfg_mgr':   cfg_mgr,
@@ -586,6 +588,7 @@ def test_set_handler_no_community_data_is_already_presented():
         ' set community 123:123 additive',
         ""
     ]
+    cfg_mgr.get_model.return_value = RunningConfig(cfg_mgr.get_text.return_value)
     common_objs = {
             'directory': Directory(),
             'cfg_mgr': cfg_mgr,
@@ -819,6 +822,7 @@ def test___find_peer_group_by_deployment_id():
         'route-map TO_BGP_PEER_V6 permit 100',
         'route-map TO_BGP_SPEAKER deny 1',
     ]
+    cfg_mgr.get_model.return_value = RunningConfig(cfg_mgr.get_text.return_value)
     common_objs = {
         'directory': Directory(),
         'cfg_mgr':   cfg_mgr,
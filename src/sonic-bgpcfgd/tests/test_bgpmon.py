@@ -0,0 +1,95 @@
+from unittest.mock import MagicMock, patch
+
+import json
+import os
+
+
+with patch.dict("sys.modules", swsssdk=MagicMock()):
+    import bgpmon.bgpmon
+    from bgpmon.bgpmon import BgpStateGet, parse_adjchange, handle_log_lines
+    from bgpmon.log_tailer import LogTailer
+
+
+def make_bgp_state_get():
+    with patch.object(bgpmon.bgpmon, 'swsssdk'):
+        bgp_state_get = BgpStateGet()
+    bgp_state_get.pipe = MagicMock()
+    bgp_state_get.peer_l = {"10.0.0.1", "10.0.0.3"}
+    bgp_state_get.peer_state = {"10.0.0.1": "Active", "10.0.0.3": "Established"}
+    return bgp_state_get
+
+
+def test_parse_adjchange():
+    assert parse_adjchange("bgpd[41]: %ADJCHANGE: neighbor 10.0.0.1(ARISTA01T1) in vrf default Up") == ("10.0.0.1", "default", True)
+    assert parse_adjchange("bgpd[41]: %ADJCHANGE: neighbor fc00::2 Down BGP Notification send") == ("fc00::2", "default", False)
+    assert parse_adjchange("bgpd[41]: %ADJCHANGE: neighbor 10.0.0.5(Unknown) in vrf Vrf1 Down Peer closed") == ("10.0.0.5", "Vrf1", False)
+    assert parse_adjchange("bgpd[41]: %NOTIFICATION: sent to neighbor 10.0.0.1 6/2 (Cease)") is None
+
+
+def test_update_changed_neigh_states():
+    bgp_state_get = make_bgp_state_get()
+    outputs = {
+        "vtysh -c 'show bgp neighbors 10.0.0.3 json'": (0, json.dumps({"10.0.0.3": {"bgpState": "Idle"}})),
+        "vtysh -c 'show bgp neighbors 10.0.0.9 json'": (0, json.dumps({"warning": "No such neighbor"})),
+    }
+    with patch.object(bgpmon.bgpmon.subprocess, 'getstatusoutput', side_effect=lambda cmd: outputs[cmd]):
+        lines = [
+            "%ADJCHANGE: neighbor 10.0.0.1(T1) in vrf default Up",
+            "%ADJCHANGE: neighbor 10.0.0.3(T1) in vrf default Down Hold Timer Expired",
+            "%ADJCHANGE: neighbor 10.0.0.9(T1) in vrf default Down Peer deleted",
+        ]
+        assert handle_log_lines(bgp_state_get, lines)
+    bgp_state_get.pipe.hmset.assert_any_call("NEIGH_STATE_TABLE|10.0.0.1", {'state': 'Established'})
+    bgp_state_get.pipe.hmset.assert_any_call("NEIGH_STATE_TABLE|10.0.0.3", {'state': 'Idle'})
+    assert bgp_state_get.pipe.hmset.call_count == 2
+    bgp_state_get.pipe.delete.assert_not_called()
+    assert bgp_state_get.peer_state == {"10.0.0.1": "Established", "10.0.0.3": "Idle"}
+
+
+def test_update_changed_neigh_states_deleted():
+    bgp_state_get = make_bgp_state_get()
+    with patch.object(bgpmon.bgpmon.subprocess, 'getstatusoutput', return_value=(0, "{}")):
+        bgp_state_get.update_changed_neigh_states({"10.0.0.3": False})
+    bgp_state_get.pipe.delete.assert_called_once_with("NEIGH_STATE_TABLE|10.0.0.3")
+    assert bgp_state_get.peer_l == {"10.0.0.1"}
+
+
+def test_handle_log_lines_vrf():
+    bgp_state_get = make_bgp_state_get()
+    lines = [
+        "%ADJCHANGE: neighbor 10.0.0.1(T1) in vrf default Up",
+        "%ADJCHANGE: neighbor 10.0.0.7(T1) in vrf Vrf1 Up",
+    ]
+    # Neighbors of non-default VRFs are updated by the full reconciliation
+    assert not handle_log_lines(bgp_state_get, lines)
+    bgp_state_get.pipe.hmset.assert_not_called()
+
+
+def test_handle_log_lines_too_many():
+    bgp_state_get = make_bgp_state_get()
+    lines = ["%%ADJCHANGE: neighbor 10.1.0.%d Up" % i for i in range(bgpmon.bgpmon.EVENT_BATCH_MAX_PEERS + 1)]
+    assert not handle_log_lines(bgp_state_get, lines)
+    bgp_state_get.pipe.hmset.assert_not_called()
+
+
+def test_log_tailer(tmpdir):
+    path = os.path.join(str(tmpdir), "frr.log")
+    with open(path, "w") as fp:
+        fp.write("old line\n")
+    tailer = LogTailer(path)
+    assert not tailer.wait(0.01)
+    with open(path, "a") as fp:
+        fp.write("line 1\nline")
+    assert tailer.wait(1)
+    assert tailer.read_lines() == ["line 1"]
+    with open(path, "a") as fp:
+        fp.write(" 2\n")
+    assert tailer.wait(1)
+    assert tailer.read_lines() == ["line 2"]
+    # rotation
+    os.rename(path, path + ".1")
+    with open(path, "w") as fp:
+        fp.write("new file\n")
+    assert tailer.wait(1)
+    assert tailer.read_lines() == ["new file"]
+    tailer.close()
@@ -55,3 +55,35 @@ def test_directory(mocked_log_err):
     # Test remove_slot() with nonexist table
     directory.remove_slot("db_name", "table_nonexist")
     mocked_log_err.assert_called_with("Directory: Can't remove slot 'db_name__table_nonexist'. The slot doesn't exist")
+
+def test_subscribe_notifies_on_transition():
+    directory = Directory()
+    handler = MagicMock()
+    directory.subscribe([("CONFIG_DB", "DEVICE_METADATA", "localhost/bgp_asn"), ("LOCAL", "interfaces", "")], handler)
+    directory.put("CONFIG_DB", "DEVICE_METADATA", "other", {"bgp_asn": "65100"})
+    assert handler.call_count == 0
+    directory.put("CONFIG_DB", "DEVICE_METADATA", "localhost", {"bgp_asn": "65100"})
+    assert handler.call_count == 1
+    directory.put("CONFIG_DB", "DEVICE_METADATA", "localhost", {"bgp_asn": "65200"})
+    assert handler.call_count == 1
+    directory.put("LOCAL", "interfaces", "Ethernet0", {})
+    directory.put("LOCAL", "interfaces", "Ethernet4", {})
+    assert handler.call_count == 2
+    directory.remove("CONFIG_DB", "DEVICE_METADATA", "localhost")
+    directory.put("CONFIG_DB", "DEVICE_METADATA", "localhost", {"bgp_asn": "65100"})
+    assert handler.call_count == 3
+    assert directory.counters["paths_checked"] == 5
+
+def test_watch():
+    directory = Directory()
+    key_handler = MagicMock()
+    table_handler = MagicMock()
+    directory.watch("LOCAL", "interfaces", "Ethernet0", key_handler)
+    directory.watch("LOCAL", "interfaces", None, table_handler)
+    directory.put("LOCAL", "interfaces", "Ethernet4", {})
+    assert key_handler.call_count == 0
+    assert table_handler.call_count == 1
+    directory.put("LOCAL", "interfaces", "Ethernet0", {})
+    directory.put("LOCAL", "interfaces", "Ethernet0", {})
+    assert key_handler.call_count == 1
+    assert table_handler.call_count == 1
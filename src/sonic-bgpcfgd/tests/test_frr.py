@@ -1,3 +1,8 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
 from unittest.mock import patch
 import bgpcfgd.frr
 import pytest
@@ -66,3 +71,102 @@ def test_restart_peer_groups_fail(mocked_log_crit):
     res = f.restart_peer_groups(["pg_1", "pg_2"])
     assert not res, "Expect False return value"
     mocked_log_crit.assert_called_with("Can't restart bgp peer-group 'pg_2'. rc='1', out='some output', err='some error'")
+
+
+class FakeVtyDaemon(object):
+    """ Serve the vty socket protocol of an FRR daemon, record received commands """
+    def __init__(self, path, status=None):
+        self.path = path
+        self.status = status or {}
+        self.commands = []
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(1)
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def serve(self):
+        conn, _ = self.server.accept()
+        buf = b''
+        while True:
+            chunk = conn.recv(4096)
+            if not chunk:
+                break
+            buf += chunk
+            while b'\0' in buf:
+                command, buf = buf.split(b'\0', 1)
+                command = command.decode()
+                self.commands.append(command)
+                conn.sendall(("out: %s" % command).encode() + b'\0\0\0' + bytes([self.status.get(command, 0)]))
+        conn.close()
+
+
+@pytest.fixture
+def vty_dir():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path)
+
+
+def test_is_bgpd_only():
+    assert bgpcfgd.frr.FRR.is_bgpd_only("router bgp 65100\n  neighbor 10.0.0.1 remote-as 65200\n!\nexit\n")
+    assert bgpcfgd.frr.FRR.is_bgpd_only("no router bgp 65100 vrf Vrf1\nbgp community-list standard C permit 1:1")
+    assert not bgpcfgd.frr.FRR.is_bgpd_only("router bgp 65100\n neighbor 10.0.0.1 remote-as 65200\nroute-map RM permit 10")
+    assert not bgpcfgd.frr.FRR.is_bgpd_only("ip prefix-list PL seq 10 permit 10.0.0.0/8")
+
+def test_vty_write_and_restart(vty_dir):
+    daemon = FakeVtyDaemon(os.path.join(vty_dir, "bgpd.vty"))
+    bgpcfgd.frr.run_command = lambda cmd, **kwargs: pytest.fail("Unexpected vtysh call: %s" % cmd)
+    f = bgpcfgd.frr.FRR(["bgpd"], vty_dir)
+    f.wait_for_daemons(5)
+    assert f.write("router bgp 65100\n  neighbor 10.0.0.1 remote-as 65200\n!\n  address-family ipv4\n    neighbor 10.0.0.1 activate\n  exit-address-family\n")
+    assert f.restart_peer_groups(["pg_2", "pg_1"])
+    f.close()
+    daemon.thread.join(5)
+    assert daemon.commands == [
+        "enable",
+        "configure terminal",
+        "router bgp 65100",
+        "neighbor 10.0.0.1 remote-as 65200",
+        "address-family ipv4",
+        "neighbor 10.0.0.1 activate",
+        "exit-address-family",
+        "end",
+        "clear bgp peer-group pg_1 soft in",
+        "clear bgp peer-group pg_2 soft in",
+    ]
+    assert f.vtysh_invocations == 0
+    assert f.vty_commands == 9
+
+@patch('bgpcfgd.frr.log_err')
+def test_vty_write_fail(mocked_log_err, vty_dir):
+    FakeVtyDaemon(os.path.join(vty_dir, "bgpd.vty"), {"neighbor 10.0.0.1 remote-as 65200": 2})
+    f = bgpcfgd.frr.FRR(["bgpd"], vty_dir)
+    assert not f.write("router bgp 65100\n neighbor 10.0.0.1 remote-as 65200\n neighbor 10.0.0.1 shutdown")
+    mocked_log_err.assert_called_with("ConfigMgr::commit(): can't push command 'neighbor 10.0.0.1 remote-as 65200' to bgpd, status='2', out='out: neighbor 10.0.0.1 remote-as 65200'")
+    f.close()
+
+def test_vty_fallback_to_vtysh(vty_dir):
+    commands = []
+    def run_command(cmd, **kwargs):
+        commands.append(cmd)
+        return 0, "", ""
+    bgpcfgd.frr.run_command = run_command
+    f = bgpcfgd.frr.FRR(["bgpd"], vty_dir)
+    assert f.write("router bgp 65100\n neighbor 10.0.0.1 remote-as 65200")
+    assert f.restart_peer_groups(["pg_1"])
+    assert [cmd[1] for cmd in commands] == ["-f", "-c"]
+    assert f.vtysh_invocations == 2
+
+def test_vty_mixed_config_uses_vtysh(vty_dir):
+    daemon = FakeVtyDaemon(os.path.join(vty_dir, "bgpd.vty"))
+    commands = []
+    def run_command(cmd, **kwargs):
+        commands.append(cmd)
+        return 0, "", ""
+    bgpcfgd.frr.run_command = run_command
+    f = bgpcfgd.frr.FRR(["bgpd"], vty_dir)
+    assert f.write("route-map RM_SET_SRC permit 10\n set src 10.1.0.32\n!\nip protocol bgp route-map RM_SET_SRC")
+    assert [cmd[1] for cmd in commands] == ["-f"]
+    assert daemon.commands == []
@@ -0,0 +1,62 @@
+from unittest.mock import MagicMock, patch
+
+from bgpcfgd.directory import Directory
+from bgpcfgd.manager import Manager
+
+
+class FakeMgr(Manager):
+    """ Accept a key when its neighbor is put into the LOCAL neighbors table """
+    def __init__(self, common_objs):
+        super(FakeMgr, self).__init__(common_objs, [("CONFIG_DB", "DEVICE_METADATA", "localhost/bgp_asn")], "CONFIG_DB", "BGP_NEIGHBOR")
+        self.done = []
+        self.calls = 0
+
+    def set_handler(self, key, data):
+        self.calls += 1
+        if data["name"] not in self.directory.get_slot("LOCAL", "neighbors"):
+            self.wait_for("LOCAL", "neighbors", data["name"])
+            return False
+        self.done.append(key)
+        return True
+
+    def del_handler(self, key):
+        pass
+
+
+def make_manager():
+    common_objs = {
+        'directory': Directory(),
+        'cfg_mgr':   MagicMock(),
+        'constants': {},
+    }
+    return FakeMgr(common_objs)
+
+
+@patch('bgpcfgd.manager.swsscommon', MagicMock(SET_COMMAND="SET", DEL_COMMAND="DEL"))
+def test_retry_only_blocked_keys():
+    m = make_manager()
+    for i in range(100):
+        m.handler("10.0.0.%d" % i, "SET", {"name": "T0_%d" % i})
+    assert m.get_counters() == {"retries": 0, "set_queue": 100, "waiting": 0}
+    m.directory.put("CONFIG_DB", "DEVICE_METADATA", "localhost", {"bgp_asn": "65100"})
+    assert m.calls == 100
+    assert m.get_counters() == {"retries": 100, "set_queue": 0, "waiting": 100}
+    m.directory.put("LOCAL", "neighbors", "T0_5", {})
+    m.directory.put("LOCAL", "neighbors", "unrelated", {})
+    assert m.done == ["10.0.0.5"]
+    assert m.calls == 101
+    assert m.get_counters() == {"retries": 101, "set_queue": 0, "waiting": 99}
+
+@patch('bgpcfgd.manager.swsscommon', MagicMock(SET_COMMAND="SET", DEL_COMMAND="DEL"))
+def test_latest_data_and_del():
+    m = make_manager()
+    m.handler("10.0.0.1", "SET", {"name": "T0_1"})
+    m.handler("10.0.0.1", "SET", {"name": "T0_2"})
+    m.handler("10.0.0.3", "SET", {"name": "T0_3"})
+    m.handler("10.0.0.3", "DEL", {})
+    assert list(m.set_queue.items()) == [("10.0.0.1", {"name": "T0_2"})]
+    m.directory.put("CONFIG_DB", "DEVICE_METADATA", "localhost", {"bgp_asn": "65100"})
+    m.directory.put("LOCAL", "neighbors", "T0_1", {})
+    assert m.done == []
+    m.directory.put("LOCAL", "neighbors", "T0_2", {})
+    assert m.done == ["10.0.0.1"]
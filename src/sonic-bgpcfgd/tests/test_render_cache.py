@@ -0,0 +1,72 @@
+from unittest.mock import MagicMock
+
+import os
+from bgpcfgd.managers_bgp import BGPPeerGroupMgr
+from bgpcfgd.template import TemplateFabric, RenderCache
+from .util import load_constants
+
+TEMPLATE_PATH = os.path.abspath('../../dockers/docker-fpm-frr/frr')
+
+
+def make_kwargs(nbr, device_type='ToRRouter'):
+    return {
+        'CONFIG_DB__DEVICE_METADATA': {'localhost': {'type': device_type, 'bgp_asn': '65100'}},
+        'CONFIG_DB__BGP_BBR': {},
+        'constants': load_constants()['constants'],
+        'bgp_asn': '65100',
+        'vrf': 'default',
+        'neighbor_addr': nbr,
+        'bgp_session': {'asn': '65200', 'name': nbr},
+    }
+
+
+def test_render_cache_hits():
+    tf = TemplateFabric(TEMPLATE_PATH)
+    template = tf.from_file('bgpd/templates/general/peer-group.conf.j2')
+    first = tf.render(template, **make_kwargs('10.0.0.1'))
+    assert tf.render(template, **make_kwargs('10.0.0.3')) == first
+    assert tf.render_cache.stats == {'hits': 1, 'misses': 1, 'uncached': 0}
+    changed = tf.render(template, **make_kwargs('10.0.0.1', 'LeafRouter'))
+    assert changed != first
+    assert changed == template.render(**make_kwargs('10.0.0.1', 'LeafRouter'))
+    assert tf.render_cache.stats['misses'] == 2
+
+
+def test_render_cache_uncached():
+    tf = TemplateFabric(TEMPLATE_PATH)
+    template = tf.from_file('bgpd/templates/internal/policies.conf.j2')
+    assert tf.render_cache.get_variables(template.name) is None
+    assert tf.render(tf.from_string('{{ a }}'), a=1) == '1'
+    assert tf.render_cache.stats['uncached'] == 1
+
+
+def test_render_cache_eviction():
+    tf = TemplateFabric(TEMPLATE_PATH)
+    tf.render_cache.max_entries = 1
+    template = tf.from_file('bgpd/templates/general/peer-group.conf.j2')
+    tf.render(template, **make_kwargs('10.0.0.1'))
+    tf.render(template, **make_kwargs('10.0.0.1', 'LeafRouter'))
+    tf.render(template, **make_kwargs('10.0.0.1'))
+    assert tf.render_cache.stats['misses'] == 3
+    assert len(tf.render_cache.results) == 1
+
+
+def test_get_hash():
+    assert RenderCache.get_hash({'a': 1, 'b': {('x', 'y'): [1, 2]}}) == RenderCache.get_hash({'b': {('x', 'y'): [1, 2]}, 'a': 1})
+    assert RenderCache.get_hash({'a': 1}) != RenderCache.get_hash({'a': '1'})
+
+
+def test_peer_group_mgr_renders_unchanged_once():
+    cfg_mgr = MagicMock()
+    common_objs = {
+        'cfg_mgr':   cfg_mgr,
+        'tf':        TemplateFabric(TEMPLATE_PATH),
+        'constants': load_constants()['constants'],
+    }
+    m = BGPPeerGroupMgr(common_objs, "bgpd/templates/general/")
+    assert m.update('10.0.0.1', **make_kwargs('10.0.0.1'))
+    assert m.update('10.0.0.3', **make_kwargs('10.0.0.3'))
+    # The renders are cached, the configuration is still pushed to FRR for every peer
+    assert common_objs['tf'].render_cache.stats['hits'] == 2
+    assert cfg_mgr.push.call_count == 4
+    assert cfg_mgr.push.call_args_list[:2] == cfg_mgr.push.call_args_list[2:]
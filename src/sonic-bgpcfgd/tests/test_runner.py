@@ -0,0 +1,147 @@
+from unittest.mock import MagicMock, patch
+
+import bgpcfgd.runner
+from bgpcfgd.runner import Runner
+
+
+swsscommon = MagicMock(SET_COMMAND="SET", DEL_COMMAND="DEL")
+
+
+class FakeSubscriber(object):
+    def __init__(self, db, table, events):
+        self.db = db
+        self.table = table
+        self.events = events
+
+    def pop(self):
+        if not self.events:
+            return "", "", ()
+        return self.events.pop(0)
+
+    def getDbConnector(self):
+        return MagicMock(getDbId=MagicMock(return_value=self.db))
+
+    def getTableName(self):
+        return self.table
+
+
+class FakeSelector(object):
+    """ Deliver one burst of events per select() call, then time out """
+    TIMEOUT = 1
+    ERROR = 2
+    OBJECT = 0
+
+    def __init__(self, subscriber, bursts):
+        self.subscriber = subscriber
+        self.bursts = bursts
+        self.timeouts = []
+
+    def select(self, timeout):
+        self.timeouts.append(timeout)
+        if not self.bursts:
+            return self.TIMEOUT, None
+        self.subscriber.events.extend(self.bursts.pop(0))
+        return self.OBJECT, self.subscriber
+
+
+def make_runner(bursts, **kwargs):
+    cfg_mgr = MagicMock()
+    cfg_mgr.frr.vtysh_invocations = 0
+
+    def commit():
+        cfg_mgr.frr.vtysh_invocations += 1
+        bgpcfgd.runner.g_run = False
+        return True
+    cfg_mgr.commit = MagicMock(side_effect=commit)
+    runner = Runner(cfg_mgr, **kwargs)
+    subscriber = FakeSubscriber(4, "BGP_NEIGHBOR", [])
+    runner.selector = FakeSelector(subscriber, bursts)
+    runner.subscribers = {subscriber}
+    handler = MagicMock()
+    runner.callbacks[4]["BGP_NEIGHBOR"].append(handler)
+    return runner, handler
+
+
+def run(runner):
+    bgpcfgd.runner.g_run = True
+    try:
+        runner.run()
+    finally:
+        bgpcfgd.runner.g_run = True
+
+
+@patch('bgpcfgd.runner.swsscommon', swsscommon)
+def test_coalesce():
+    runner, _ = make_runner([])
+    events = [
+        (4, "T", "10.0.0.1", "SET", {"asn": "1"}),
+        (4, "T", "10.0.0.2", "SET", {"asn": "2"}),
+        (4, "T", "10.0.0.1", "SET", {"asn": "3"}),
+        (4, "T", "10.0.0.3", "SET", {"asn": "4"}),
+        (4, "T", "10.0.0.3", "DEL", {}),
+        (4, "T", "10.0.0.2", "DEL", {}),
+        (4, "T", "10.0.0.2", "SET", {"asn": "5"}),
+        (4, "T", "10.0.0.2", "SET", {"asn": "6"}),
+        (6, "T", "10.0.0.1", "SET", {"asn": "7"}),
+    ]
+    assert runner.coalesce(events) == [
+        (4, "T", "10.0.0.1", "SET", {"asn": "3"}),
+        (4, "T", "10.0.0.2", "DEL", {}),
+        (4, "T", "10.0.0.2", "SET", {"asn": "6"}),
+        (4, "T", "10.0.0.3", "DEL", {}),
+        (6, "T", "10.0.0.1", "SET", {"asn": "7"}),
+    ]
+    assert runner.counters["events_coalesced"] == 4
+
+
+@patch('bgpcfgd.runner.swsscommon', swsscommon)
+def test_run_without_coalescing():
+    bursts = [[("10.0.0.1", "SET", (("asn", "1"),)), ("10.0.0.1", "SET", (("asn", "2"),))]]
+    runner, handler = make_runner(bursts)
+    run(runner)
+    assert [c[0] for c in handler.call_args_list] == [("10.0.0.1", "SET", {"asn": "1"}),
+                                                       ("10.0.0.1", "SET", {"asn": "2"})]
+    assert runner.cfg_manager.commit.call_count == 1
+
+
+@patch('bgpcfgd.runner.swsscommon', swsscommon)
+def test_run_coalescing():
+    bursts = [
+        [("10.0.0.%d" % i, "SET", (("asn", "65000"),)) for i in range(10)],
+        [("10.0.0.%d" % i, "SET", (("asn", "65001"),)) for i in range(5)],
+        [("10.0.0.9", "DEL", ())],
+    ]
+    runner, handler = make_runner(bursts, coalesce_window=10000)
+    run(runner)
+    calls = [c[0] for c in handler.call_args_list]
+    assert calls == [("10.0.0.%d" % i, "SET", {"asn": "65001"}) for i in range(5)] + \
+                    [("10.0.0.%d" % i, "SET", {"asn": "65000"}) for i in range(5, 9)] + \
+                    [("10.0.0.9", "DEL", {})]
+    assert runner.cfg_manager.commit.call_count == 1
+    assert runner.counters == {"events_received": 16, "events_coalesced": 6, "commits": 1}
+
+
+@patch('bgpcfgd.runner.swsscommon', swsscommon)
+def test_run_coalescing_max_events():
+    bursts = [
+        [("10.0.0.%d" % i, "SET", (("asn", "65000"),)) for i in range(10)],
+        [("10.0.0.%d" % i, "SET", (("asn", "65001"),)) for i in range(5)],
+    ]
+    runner, handler = make_runner(bursts, coalesce_window=10000, coalesce_max_events=10)
+    run(runner)
+    assert handler.call_count == 10
+    assert runner.counters["events_received"] == 10
+
+
+@patch('bgpcfgd.runner.swsscommon', swsscommon)
+def test_run_initial_sync():
+    runner, _ = make_runner([])
+    manager = MagicMock()
+    runner.managers.append(manager)
+    run(runner)
+    manager.on_initial_sync.assert_called_once_with()
+    assert runner.initial_sync_done
+    assert runner.cfg_manager.commit.call_count == 1
+    runner.cfg_manager.on_initial_sync.assert_called_once_with()
+    # The snapshot is saved when the runner is idle and on exit
+    assert runner.cfg_manager.checkpoint.call_count == 2
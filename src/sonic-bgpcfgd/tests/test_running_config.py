@@ -0,0 +1,70 @@
+from unittest.mock import MagicMock
+
+from bgpcfgd.config import ConfigMgr
+from bgpcfgd.running_config import RunningConfig
+
+
+CONFIG = [
+    'router bgp 64601',
+    ' neighbor PEER_V4 peer-group',
+    ' neighbor PEER_V6 peer-group',
+    ' neighbor 10.0.0.1 peer-group PEER_V4',
+    ' address-family ipv4 unicast',
+    '  neighbor PEER_V4 route-map FROM_BGP_PEER_V4 in',
+    '  neighbor PEER_V4 route-map OTHER in',
+    '  neighbor PEER_V4 route-map TO_BGP_PEER_V4 out',
+    ' exit-address-family',
+    'ip prefix-list PL_V4 seq 10 deny 0.0.0.0/0 le 17',
+    'ip prefix-list PL_V4 seq 20 permit 10.0.0.0/8 le 32',
+    'ipv6 prefix-list PL_V4 seq 10 deny 0::/0 le 59',
+    'bgp community-list standard COMMUNITY_1 permit 1010:2020',
+    'route-map FROM_BGP_PEER_V4 permit 100',
+    'route-map FROM_BGP_PEER_V4 permit 2',
+    ' call ALLOW_LIST_DEPLOYMENT_ID_0_V4',
+    ' on-match next',
+    'route-map FROM_BGP_PEER_V4 deny 65535',
+    '     ',
+]
+
+
+def test_peer_groups():
+    model = RunningConfig(CONFIG)
+    assert model.peer_groups == ['PEER_V4', 'PEER_V6']
+    assert model.neighbor_route_maps_in == {'PEER_V4': 'FROM_BGP_PEER_V4'}
+
+def test_lists():
+    model = RunningConfig(CONFIG)
+    assert model.get_prefix_list('ip', 'PL_V4') == ['deny 0.0.0.0/0 le 17', 'permit 10.0.0.0/8 le 32']
+    assert model.get_prefix_list('ipv6', 'PL_V4') == ['deny 0::/0 le 59']
+    assert model.get_prefix_list('ipv6', 'PL_V6') is None
+    assert model.get_community_list('COMMUNITY_1') == ['1010:2020']
+    assert model.get_community_list('COMMUNITY_2') is None
+
+def test_route_maps():
+    model = RunningConfig(CONFIG)
+    entries = model.get_route_map('FROM_BGP_PEER_V4')
+    assert list(entries.keys()) == [100, 2, 65535]
+    assert entries[2].lines == ['call ALLOW_LIST_DEPLOYMENT_ID_0_V4', 'on-match next']
+    assert entries[100].lines == []
+    assert entries[65535].action == 'deny'
+    assert model.get_route_map('NOT_EXISTS') == {}
+
+def test_config_mgr_caches_model():
+    frr = MagicMock()
+    frr.get_config = MagicMock(return_value="\n".join(CONFIG))
+    frr.write = MagicMock(return_value=True)
+    frr.restart_peer_groups = MagicMock(return_value=True)
+    c = ConfigMgr(frr)
+    c.update()
+    model = c.get_model()
+    assert model.peer_groups == ['PEER_V4', 'PEER_V6']
+    c.update()
+    assert c.get_model() is model
+    assert frr.get_config.call_count == 1
+    c.update(force=True)
+    assert frr.get_config.call_count == 2
+    c.push("router bgp 64601")
+    c.commit()
+    c.update()
+    assert frr.get_config.call_count == 3
+    assert c.get_model() is not model
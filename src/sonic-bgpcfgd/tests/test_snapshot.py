@@ -0,0 +1,216 @@
+from unittest.mock import MagicMock
+
+import os
+from bgpcfgd.config import ConfigMgr
+from bgpcfgd.directory import Directory
+from bgpcfgd.running_config import RunningConfig
+from bgpcfgd.snapshot import Snapshot
+from bgpcfgd.template import TemplateFabric
+from . import swsscommon_test
+from .util import load_constants
+from swsscommon import swsscommon
+import bgpcfgd.managers_bgp
+
+TEMPLATE_PATH = os.path.abspath('../../dockers/docker-fpm-frr/frr')
+
+PEER_1 = "router bgp 65100\n neighbor 10.0.0.1 remote-as 65200"
+PEER_2 = "router bgp 65100\n neighbor 10.0.0.3 remote-as 65201"
+ENTITY = "router bgp 65100\n neighbor PEER_V4 peer-group"
+ENTITY_2 = "router bgp 65100\n neighbor PEER_V4 peer-group\n neighbor PEER_V4 timers 3 10"
+ENTITY_KEY = "bgpd/templates/general/|peer-group|default"
+
+
+def make_snapshot(tmpdir, peers=None):
+    directory = Directory()
+    directory.put("CONFIG_DB", swsscommon.CFG_DEVICE_METADATA_TABLE_NAME, "localhost", {"bgp_asn": "65100"})
+    snapshot = Snapshot(os.path.join(str(tmpdir), "bgpcfgd", "snapshot.json"), directory)
+    snapshot.stage_entity(ENTITY_KEY, ENTITY)
+    for key, config in (peers or {}).items():
+        snapshot.stage_peer(key, config)
+    snapshot.commit(True)
+    snapshot.checkpoint()
+    loaded = Snapshot(snapshot.path, Directory())
+    assert loaded.load()
+    return loaded
+
+
+def test_save_load(tmpdir):
+    snapshot = make_snapshot(tmpdir, {"BGP_NEIGHBOR|default|10.0.0.1": PEER_1})
+    assert snapshot.bgp_asn == "65100"
+    assert list(snapshot.entities.keys()) == [ENTITY_KEY]
+    assert snapshot.replayed == {"BGP_NEIGHBOR|default|10.0.0.1"}
+    assert snapshot.is_applied("BGP_NEIGHBOR|default|10.0.0.1", PEER_1)
+    assert not snapshot.is_applied("BGP_NEIGHBOR|default|10.0.0.1", PEER_2)
+    assert snapshot.is_entity_applied(ENTITY_KEY, ENTITY)
+    assert not snapshot.is_entity_applied(ENTITY_KEY, ENTITY_2)
+
+
+def test_load_missing(tmpdir):
+    snapshot = Snapshot(os.path.join(str(tmpdir), "snapshot.json"), Directory())
+    assert not snapshot.load()
+    assert not snapshot.is_entity_applied(ENTITY_KEY, ENTITY)
+
+
+def test_commit_failed(tmpdir):
+    snapshot = make_snapshot(tmpdir, {"BGP_NEIGHBOR|default|10.0.0.1": PEER_1})
+    snapshot.stage_peer("BGP_NEIGHBOR|default|10.0.0.1", None)
+    snapshot.stage_peer("BGP_NEIGHBOR|default|10.0.0.3", PEER_2)
+    snapshot.commit(False)
+    assert list(snapshot.peers.keys()) == ["BGP_NEIGHBOR|default|10.0.0.1"]
+    snapshot.stage_peer("BGP_NEIGHBOR|default|10.0.0.1", None)
+    snapshot.stage_peer("BGP_NEIGHBOR|default|10.0.0.3", PEER_2)
+    snapshot.commit(True)
+    snapshot.checkpoint()
+    loaded = Snapshot(snapshot.path, Directory())
+    assert loaded.load()
+    assert list(loaded.peers.keys()) == ["BGP_NEIGHBOR|default|10.0.0.3"]
+
+
+def test_save_debounce(tmpdir):
+    snapshot = make_snapshot(tmpdir, {"BGP_NEIGHBOR|default|10.0.0.1": PEER_1})
+    snapshot.stage_peer("BGP_NEIGHBOR|default|10.0.0.3", PEER_2)
+    snapshot.commit(True)
+    # The change is saved on the next checkpoint, not on every commit
+    assert snapshot.dirty
+    loaded = Snapshot(snapshot.path, Directory())
+    loaded.load()
+    assert list(loaded.peers.keys()) == ["BGP_NEIGHBOR|default|10.0.0.1"]
+    # or once SAVE_INTERVAL has passed since the last save
+    snapshot.saved_at -= Snapshot.SAVE_INTERVAL
+    snapshot.stage_peer("BGP_NEIGHBOR|default|10.0.0.1", None)
+    snapshot.commit(True)
+    assert not snapshot.dirty
+    loaded = Snapshot(snapshot.path, Directory())
+    loaded.load()
+    assert list(loaded.peers.keys()) == ["BGP_NEIGHBOR|default|10.0.0.3"]
+
+
+def test_entity_replaced(tmpdir):
+    snapshot = make_snapshot(tmpdir)
+    snapshot.stage_entity(ENTITY_KEY, ENTITY_2)
+    snapshot.commit(True)
+    # The previous configuration of the peer-group isn't kept
+    assert [entity['config'] for entity in snapshot.entities.values()] == [ENTITY_2]
+
+
+def test_get_replay_config(tmpdir):
+    snapshot = make_snapshot(tmpdir, {"BGP_NEIGHBOR|default|10.0.0.1": PEER_1, "BGP_NEIGHBOR|default|10.0.0.3": PEER_2})
+    running_config = RunningConfig(["router bgp 65100", " neighbor 10.0.0.1 remote-as 65200"])
+    assert snapshot.get_replay_config(running_config) == ENTITY + "\n" + PEER_2
+    running_config = RunningConfig(["router bgp 65100", " neighbor 10.0.0.1 remote-as 65200", " neighbor 10.0.0.3 remote-as 65201"])
+    assert snapshot.get_replay_config(running_config) == ""
+
+
+def test_get_replay_config_asn_mismatch(tmpdir):
+    snapshot = make_snapshot(tmpdir, {"BGP_NEIGHBOR|default|10.0.0.1": PEER_1})
+    assert snapshot.get_replay_config(RunningConfig(["router bgp 65101"])) == ""
+    assert snapshot.replayed == set()
+    assert not snapshot.is_applied("BGP_NEIGHBOR|default|10.0.0.1", PEER_1)
+
+
+def test_config_mgr_replay(tmpdir):
+    snapshot = make_snapshot(tmpdir, {"BGP_NEIGHBOR|default|10.0.0.1": PEER_1})
+    frr = MagicMock()
+    frr.get_config.return_value = "router bgp 65100\n"
+    frr.write.return_value = False
+    cfg_mgr = ConfigMgr(frr, snapshot)
+    assert not cfg_mgr.replay_snapshot()
+    frr.write.assert_called_once_with(ENTITY + "\n" + PEER_1)
+    assert snapshot.replayed == set()
+
+
+def test_config_mgr_initial_sync(tmpdir):
+    snapshot = make_snapshot(tmpdir, {"BGP_NEIGHBOR|default|10.0.0.1": PEER_1})
+    cfg_mgr = ConfigMgr(MagicMock(), snapshot)
+    cfg_mgr.on_initial_sync()
+    # The snapshot isn't used to skip pushes after the initial sync
+    assert not snapshot.is_applied("BGP_NEIGHBOR|default|10.0.0.1", PEER_1)
+    assert not snapshot.is_entity_applied(ENTITY_KEY, ENTITY)
+
+
+def constructor(snapshot):
+    cfg_mgr = MagicMock()
+    common_objs = {
+        'directory': Directory(),
+        'cfg_mgr':   cfg_mgr,
+        'tf':        TemplateFabric(TEMPLATE_PATH),
+        'constants': load_constants()['constants'],
+        'snapshot':  snapshot,
+    }
+    return_value_map = {
+        "['vtysh', '-c', 'show bgp vrfs json']": (0, "{\"vrfs\": {\"default\": {}}}", ""),
+        "['vtysh', '-c', 'show bgp vrf default neighbors json']": (0, "{\"30.30.30.1\": {}, \"30.30.30.2\": {}}", "")
+    }
+    bgpcfgd.managers_bgp.run_command = lambda cmd: return_value_map[str(cmd)]
+    m = bgpcfgd.managers_bgp.BGPPeerMgrBase(common_objs, "CONFIG_DB", swsscommon.CFG_BGP_NEIGHBOR_TABLE_NAME, "general", True)
+    m.directory.put("CONFIG_DB", swsscommon.CFG_DEVICE_METADATA_TABLE_NAME, "localhost", {"bgp_asn": "65100"})
+    m.directory.put("CONFIG_DB", swsscommon.CFG_LOOPBACK_INTERFACE_TABLE_NAME, "Loopback0|11.11.11.11/32", {})
+    m.directory.put("LOCAL", "local_addresses", "30.30.30.30", {"interface": "Ethernet4|30.30.30.30/24"})
+    m.directory.put("LOCAL", "interfaces", "Ethernet4|30.30.30.30/24", {"anything": "anything"})
+    return m
+
+
+def test_peer_replay(tmpdir):
+    snapshot = Snapshot(os.path.join(str(tmpdir), "snapshot.json"), Directory())
+    m = constructor(snapshot)
+    data = {"local_addr": "30.30.30.30", "admin_status": "up", "asn": "65200"}
+    assert m.add_peer("default", "30.30.30.1", data)
+    assert m.add_peer("default", "30.30.30.2", data)
+    snapshot.commit(True)
+    snapshot.checkpoint()
+
+    snapshot = Snapshot(snapshot.path, Directory())
+    assert snapshot.load()
+    m = constructor(snapshot)
+    assert m.replayed == {("default", "30.30.30.1"), ("default", "30.30.30.2")}
+    # The same configuration: nothing is pushed
+    m.set_handler("30.30.30.1", data)
+    assert m.cfg_mgr.push.call_count == 0
+    # The configuration was changed: the peer is recreated
+    m.set_handler("30.30.30.2", dict(data, asn="65201"))
+    pushed = [c[0][0] for c in m.cfg_mgr.push.call_args_list]
+    assert pushed[0] == "router bgp 65100\nno neighbor 30.30.30.2"
+    assert "neighbor 30.30.30.2 remote-as 65201" in pushed[-1]
+    assert m.replayed == set()
+
+
+def test_peer_replay_removed(tmpdir):
+    snapshot = Snapshot(os.path.join(str(tmpdir), "snapshot.json"), Directory())
+    m = constructor(snapshot)
+    assert m.add_peer("default", "30.30.30.1", {"local_addr": "30.30.30.30", "admin_status": "up", "asn": "65200"})
+    snapshot.commit(True)
+    snapshot.checkpoint()
+
+    snapshot = Snapshot(snapshot.path, Directory())
+    assert snapshot.load()
+    m = constructor(snapshot)
+    m.on_initial_sync()
+    m.cfg_mgr.push.assert_called_once_with("router bgp 65100\nno neighbor 30.30.30.1")
+    assert ("default", "30.30.30.1") not in m.peers
+    snapshot.commit(True)
+    assert snapshot.peers == {}
+
+
+def test_peer_replay_pending_at_initial_sync(tmpdir):
+    snapshot = Snapshot(os.path.join(str(tmpdir), "snapshot.json"), Directory())
+    m = constructor(snapshot)
+    data = {"local_addr": "30.30.30.30", "admin_status": "up", "asn": "65200"}
+    assert m.add_peer("default", "30.30.30.1", data)
+    snapshot.commit(True)
+    snapshot.checkpoint()
+
+    snapshot = Snapshot(snapshot.path, Directory())
+    assert snapshot.load()
+    m = constructor(snapshot)
+    # The SET of the replayed peer is still waiting at the initial sync
+    m.set_queue["30.30.30.1"] = dict(data, asn="65201")
+    m.on_initial_sync()
+    snapshot.replayed.clear()
+    m.cfg_mgr.push.assert_not_called()
+    assert m.replayed == {("default", "30.30.30.1")}
+    # The outdated snapshot configuration is replaced when the SET is handled
+    m.set_handler("30.30.30.1", m.set_queue.pop("30.30.30.1"))
+    pushed = [c[0][0] for c in m.cfg_mgr.push.call_args_list]
+    assert "router bgp 65100\nno neighbor 30.30.30.1" in pushed
+    assert "neighbor 30.30.30.1 remote-as 65201" in pushed[-1]
+    assert m.replayed == set()
@@ -140,3 +140,31 @@ def test_monitors_pg():
 def test_monitors_instance():
     test_data = load_tests("monitors", "instance.conf")
     run_tests("monitors_instance", *test_data)
+
+def test_template_bundle(tmpdir):
+    import j2_bundle
+    bundle_dir = str(tmpdir.join("bundle"))
+    j2_bundle.compile_bundle([TEMPLATE_PATH], bundle_dir)
+    os.environ[j2_bundle.BUNDLE_DIR_ENV] = bundle_dir
+    try:
+        tf = TemplateFabric(TEMPLATE_PATH)
+    finally:
+        del os.environ[j2_bundle.BUNDLE_DIR_ENV]
+    for peer_type in ["general", "internal", "dynamic", "monitors"]:
+        for template_name in ["policies.conf", "peer-group.conf", "instance.conf"]:
+            template_fname, tests = load_tests(peer_type, template_name)
+            template = tf.from_file(template_fname)
+            source_template = TemplateFabric(TEMPLATE_PATH).env.from_string(tf.env.loader.get_source(tf.env, template_fname)[0])
+            for _, param_fname, _ in tests:
+                params = load_json(param_fname)
+                assert template.render(params) == source_template.render(params)
+    assert tf.env.loader.misses == 0
+    assert tf.env.loader.hits >= 12
+
+def test_bundle_environment():
+    # The bundle has to be compiled with the same filters TemplateFabric uses
+    import j2_bundle
+    import jinja2
+    tf = TemplateFabric(TEMPLATE_PATH)
+    custom_filters = set(tf.env.filters) - set(jinja2.Environment().filters)
+    assert custom_filters == set(j2_bundle.BUNDLE_ENVIRONMENTS[1][1])
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Compare rendering bgpd.conf.j2 and interfaces.j2 against a large synthetic
+CONFIG_DB with the memoized ip_filters and with the previous filters, which
+parsed a new netaddr.IPNetwork on every call.
+
+Usage: python3 benchmarks/bench_ip_filters.py [-n PREFIXES] [-r ROUNDS]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import netaddr
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ENGINE_DIR)
+
+import cfggen_server
+import ip_filters
+import j2_bundle
+
+REPO_DIR = os.path.join(ENGINE_DIR, '..', '..')
+FRR_DIR = os.path.join(REPO_DIR, 'dockers', 'docker-fpm-frr', 'frr')
+INTERFACES_DIR = os.path.join(REPO_DIR, 'files', 'image_config', 'interfaces')
+CONSTANTS = os.path.join(REPO_DIR, 'files', 'image_config', 'constants', 'constants.yml')
+
+
+def netaddr_version(value):
+    if not value:
+        return None
+    try:
+        return netaddr.IPNetwork(str(value)).version
+    except Exception:
+        return None
+
+
+def netaddr_prefix_attr(attr, value):
+    if not value:
+        return None
+    try:
+        prefix = netaddr.IPNetwork(str(value))
+    except Exception:
+        return None
+    return str(getattr(prefix, attr))
+
+
+def netaddr_ip_network(value):
+    try:
+        return netaddr.IPNetwork(value).network
+    except Exception:
+        return "Invalid ip address %s" % value
+
+
+def use_netaddr_filters(cfggen, env):
+    """ Replace the filters with the implementation parsing on every call """
+    cfggen.is_ipv4 = lambda value: netaddr_version(value) == 4
+    cfggen.is_ipv6 = lambda value: netaddr_version(value) == 6
+    env.filters['ipv4'] = cfggen.is_ipv4
+    env.filters['ipv6'] = cfggen.is_ipv6
+    env.filters['ip_network'] = netaddr_ip_network
+    for attr in ['ip', 'network', 'prefixlen', 'netmask', 'broadcast']:
+        env.filters[attr] = lambda value, attr=attr: netaddr_prefix_attr(attr, value)
+
+
+def make_config_db(prefixes):
+    vlan_interface = {}
+    mgmt_interface = {}
+    for i in range(prefixes):
+        vlan = 'Vlan%d' % (1000 + i)
+        vlan_interface[vlan] = {}
+        vlan_interface[(vlan, '192.%d.%d.1/24' % (168 + i // 65536 % 64, i // 256 % 256))] = {}
+        vlan_interface[(vlan, 'fc02:%x:%x::1/64' % (i // 65536, i % 65536))] = {}
+    for i in range(prefixes // 10):
+        mgmt_interface[('eth0', '10.%d.%d.%d/24' % (i // 65536, i // 256 % 256, i % 256))] = {'gwaddr': '10.0.0.1'}
+    return {
+        'DEVICE_METADATA': {'localhost': {'hostname': 'switch', 'bgp_asn': '65100', 'type': 'ToRRouter'}},
+        'LOOPBACK_INTERFACE': {('Loopback0', '10.1.0.32/32'): {}, ('Loopback0', 'fc00:1::32/128'): {}},
+        'VLAN_INTERFACE': vlan_interface,
+        'MGMT_INTERFACE': mgmt_interface,
+        'PORT': {},
+        'ZTP': {'mode': {}},
+    }
+
+
+def render(cfggen, data, filters, rounds):
+    os.environ[j2_bundle.BUNDLE_DIR_ENV] = ''
+    env = cfggen._get_jinja2_env([FRR_DIR, os.path.join(FRR_DIR, 'bgpd'), INTERFACES_DIR])
+    if filters == 'netaddr':
+        use_netaddr_filters(cfggen, env)
+    templates = [env.get_template('bgpd.conf.j2'), env.get_template('interfaces.j2')]
+    best = None
+    outputs = None
+    for _ in range(rounds):
+        ip_filters.clear_cache()
+        start = time.time()
+        outputs = [template.render(data) for template in templates]
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--prefixes', type=int, default=2000)
+    parser.add_argument('-r', '--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    import yaml
+    with open(CONSTANTS) as f:
+        data = yaml.safe_load(f)
+    data.update(make_config_db(args.prefixes))
+    print('{} VLAN interfaces, {} management addresses'.format(args.prefixes, args.prefixes // 10))
+
+    cfggen = cfggen_server.load_cfggen(os.path.join(ENGINE_DIR, 'sonic-cfggen'))
+    memoized_time, memoized_outputs = render(cfggen, data, 'memoized', args.rounds)
+    cache_info = ip_filters.cache_info()
+    cfggen = cfggen_server.load_cfggen(os.path.join(ENGINE_DIR, 'sonic-cfggen'))
+    netaddr_time, netaddr_outputs = render(cfggen, data, 'netaddr', args.rounds)
+    if memoized_outputs != netaddr_outputs:
+        print('Output mismatch', file=sys.stderr)
+        sys.exit(1)
+
+    print('{:<10} {:>10}'.format('filters', 'best (s)'))
+    print('{:<10} {:>10.3f}'.format('netaddr', netaddr_time))
+    print('{:<10} {:>10.3f}'.format('memoized', memoized_time))
+    print('speedup x{:.2f}, cache {}'.format(netaddr_time / memoized_time, cache_info))
+
+
+if __name__ == '__main__':
+    main()
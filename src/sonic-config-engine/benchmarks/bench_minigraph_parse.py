@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Compare minigraph.parse_xml in tree and streaming mode on a synthetic
+minigraph with many links, BGP sessions and neighbor devices.
+
+Every mode runs in its own process so that the reported peak RSS is not
+affected by the other mode.
+
+Usage: python3 benchmarks/bench_minigraph_parse.py [-l LINKS] [-r ROUNDS]
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from lxml import etree as ET
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ENGINE_DIR)
+
+import minigraph
+
+NS = '{%s}' % minigraph.ns
+TEMPLATE = os.path.join(ENGINE_DIR, 'tests', 'simple-sample-graph.xml')
+
+
+def sub(parent, tag, text=None, **attrib):
+    elem = ET.SubElement(parent, NS + tag, **attrib)
+    elem.text = text
+    return elem
+
+
+def generate(links, minigraph_file, port_config_file):
+    """ Generate a minigraph with one neighbor device and BGP session per link """
+    tree = ET.parse(TEMPLATE)
+    root = tree.getroot()
+    hostname = root.find(NS + 'Hostname').text
+    sessions = root.find('{0}CpgDec/{0}PeeringSessions'.format(NS))
+    link_base = root.find('{0}PngDec/{0}DeviceInterfaceLinks'.format(NS))
+    devices = root.find('{0}PngDec/{0}Devices'.format(NS))
+    xsi_type = '{http://www.w3.org/2001/XMLSchema-instance}type'
+
+    with open(port_config_file, 'w') as f:
+        f.write('# name lanes alias index speed\n')
+        for i in range(links):
+            port = 'Ethernet%d' % (i * 4)
+            f.write('%s %d,%d,%d,%d synth%d %d 100000\n' % (port, 4 * i, 4 * i + 1, 4 * i + 2, 4 * i + 3, i, i))
+
+            peer = 'SYNTH%05dT1' % i
+            local_addr = '10.%d.%d.%d' % (i // 8192, (i // 32) % 256, (i % 32) * 8)
+            peer_addr = '10.%d.%d.%d' % (i // 8192, (i // 32) % 256, (i % 32) * 8 + 1)
+
+            link = sub(link_base, 'DeviceLinkBase', **{xsi_type: 'DeviceInterfaceLink'})
+            sub(link, 'ElementType', 'DeviceInterfaceLink')
+            sub(link, 'Bandwidth', '100000')
+            sub(link, 'EndDevice', peer)
+            sub(link, 'EndPort', 'Ethernet1')
+            sub(link, 'StartDevice', hostname)
+            sub(link, 'StartPort', 'synth%d' % i)
+
+            device = sub(devices, 'Device', **{xsi_type: 'LeafRouter'})
+            sub(device, 'Hostname', peer)
+            sub(device, 'HwSku', 'Arista-VM')
+
+            session = sub(sessions, 'BGPSession')
+            sub(session, 'StartRouter', hostname)
+            sub(session, 'StartPeer', local_addr)
+            sub(session, 'EndRouter', peer)
+            sub(session, 'EndPeer', peer_addr)
+            sub(session, 'Multihop', '1')
+            sub(session, 'HoldTime', '180')
+            sub(session, 'KeepAliveTime', '60')
+
+    tree.write(minigraph_file)
+
+
+def run_mode(minigraph_file, port_config_file, streaming, rounds):
+    # Keep the parse cache out of the measurement
+    os.environ[minigraph.PARSE_CACHE_DIR_ENV] = ''
+    devnull = open(os.devnull, 'w')
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = devnull
+    best = None
+    try:
+        for _ in range(rounds):
+            start = time.time()
+            minigraph.parse_xml(minigraph_file, port_config_file=port_config_file, streaming=streaming)
+            elapsed = time.time() - start
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print('%s %f %d' % ('streaming' if streaming else 'tree', best, maxrss))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-l', '--links', type=int, default=10000)
+    parser.add_argument('-r', '--rounds', type=int, default=3)
+    parser.add_argument('--run', choices=['tree', 'streaming'], help=argparse.SUPPRESS)
+    parser.add_argument('--minigraph', help=argparse.SUPPRESS)
+    parser.add_argument('--port-config', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_mode(args.minigraph, args.port_config, args.run == 'streaming', args.rounds)
+        return
+
+    work_dir = tempfile.mkdtemp()
+    minigraph_file = os.path.join(work_dir, 'minigraph.xml')
+    port_config_file = os.path.join(work_dir, 'port_config.ini')
+    generate(args.links, minigraph_file, port_config_file)
+    print('%d links, minigraph %.1f MB' % (args.links, os.path.getsize(minigraph_file) / 1e6))
+    print('{:<10} {:>10} {:>14}'.format('mode', 'best (s)', 'peak RSS (MB)'))
+    for mode in ['tree', 'streaming']:
+        output = subprocess.check_output([sys.executable, __file__, '--run', mode, '-r', str(args.rounds),
+                                          '--minigraph', minigraph_file, '--port-config', port_config_file])
+        _, elapsed, maxrss = output.decode().split()
+        print('{:<10} {:>10.3f} {:>14.1f}'.format(mode, float(elapsed), int(maxrss) / 1024.0))
+    os.remove(minigraph_file)
+    os.remove(port_config_file)
+    os.rmdir(work_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Compare boot-time rendering of the dockers/*/*.j2 templates through the
+sonic-cfggen CLI and through sonic-cfggen-client + sonic-cfggen-server.
+
+Usage: python3 benchmarks/bench_render_server.py [-r ROUNDS]
+"""
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+REPO_DIR = os.path.join(ENGINE_DIR, '..', '..')
+TESTS_DIR = os.path.join(ENGINE_DIR, 'tests')
+
+MINIGRAPH = os.path.join(TESTS_DIR, 't0-sample-graph.xml')
+PORT_CONFIG = os.path.join(TESTS_DIR, 't0-sample-port-config.ini')
+
+
+def boot_templates():
+    """ Templates rendered at container start. Dockerfile.j2 are rendered at build time """
+    return sorted(t for t in glob.glob(os.path.join(REPO_DIR, 'dockers', '*', '*.j2'))
+                  if os.path.basename(t) != 'Dockerfile.j2')
+
+
+def run(command, template, env):
+    argv = command + ['-m', MINIGRAPH, '-p', PORT_CONFIG, '-t', template]
+    p = subprocess.Popen(argv, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, _ = p.communicate()
+    return p.returncode, stdout
+
+
+def render_all(command, templates, env):
+    results = {}
+    start = time.time()
+    for template in templates:
+        results[template] = run(command, template, env)
+    return time.time() - start, results
+
+
+def wait_for_socket(path, timeout=30):
+    deadline = time.time() + timeout
+    while not os.path.exists(path):
+        if time.time() > deadline:
+            raise RuntimeError('sonic-cfggen-server did not start')
+        time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-r', '--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    templates = boot_templates()
+    cli = [sys.executable, os.path.join(ENGINE_DIR, 'sonic-cfggen')]
+    client = [sys.executable, os.path.join(ENGINE_DIR, 'sonic-cfggen-client')]
+    socket_path = os.path.join(tempfile.mkdtemp(), 'sonic-cfggen.sock')
+    env = dict(os.environ, SONIC_CFGGEN_SOCKET=socket_path)
+
+    server = subprocess.Popen([sys.executable, os.path.join(ENGINE_DIR, 'sonic-cfggen-server'),
+                               '-s', socket_path, '-c', cli[1]], env=env)
+    try:
+        wait_for_socket(socket_path)
+        print('{} templates, {} rounds'.format(len(templates), args.rounds))
+        print('{:<8} {:>10} {:>14}'.format('mode', 'total (s)', 'per render (ms)'))
+        for round_id in range(args.rounds):
+            cli_time, cli_results = render_all(cli, templates, env)
+            server_time, server_results = render_all(client, templates, env)
+            if cli_results != server_results:
+                mismatched = [t for t in templates if cli_results[t] != server_results[t]]
+                print('Output mismatch: {}'.format(', '.join(mismatched)), file=sys.stderr)
+                sys.exit(1)
+            for mode, elapsed in [('cli', cli_time), ('server', server_time)]:
+                print('{:<8} {:>10.3f} {:>14.1f}'.format(mode, elapsed, 1000.0 * elapsed / len(templates)))
+            print('round {}: speedup x{:.1f}, {} of {} templates rendered successfully'.format(
+                round_id + 1, cli_time / server_time,
+                sum(1 for rc, _ in cli_results.values() if rc == 0), len(templates)))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
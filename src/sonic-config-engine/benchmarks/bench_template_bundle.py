@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Compare cold container-start rendering of the docker-fpm-frr templates with
+and without the precompiled template bundle.
+
+Every render is a new sonic-cfggen process, like at container start, and the
+jinja2 bytecode cache is disabled so that templates without the bundle are
+compiled from source.
+
+Usage: python3 benchmarks/bench_template_bundle.py [-r ROUNDS]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ENGINE_DIR)
+
+import j2_bundle
+import redis_bcc
+
+REPO_DIR = os.path.join(ENGINE_DIR, '..', '..')
+TESTS_DIR = os.path.join(ENGINE_DIR, 'tests')
+FRR_DIR = os.path.join(REPO_DIR, 'dockers', 'docker-fpm-frr', 'frr')
+
+MINIGRAPH = os.path.join(TESTS_DIR, 't0-sample-graph.xml')
+PORT_CONFIG = os.path.join(TESTS_DIR, 't0-sample-port-config.ini')
+CONSTANTS = os.path.join(REPO_DIR, 'files', 'image_config', 'constants', 'constants.yml')
+
+# Templates rendered by docker_init.sh and supervisord at container start
+TEMPLATES = [
+    'frr.conf.j2',
+    'bgpd/bgpd.conf.j2',
+    'zebra/zebra.conf.j2',
+    'staticd/staticd.conf.j2',
+    'supervisord/supervisord.conf.j2',
+]
+
+
+def render_all(env):
+    outputs = []
+    start = time.time()
+    for template in TEMPLATES:
+        argv = [sys.executable, os.path.join(ENGINE_DIR, 'sonic-cfggen'), '-m', MINIGRAPH, '-p', PORT_CONFIG,
+                '-y', CONSTANTS, '-T', FRR_DIR, '-t', os.path.join(FRR_DIR, template)]
+        p = subprocess.Popen(argv, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout, _ = p.communicate()
+        outputs.append((p.returncode, stdout))
+    return time.time() - start, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-r', '--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    bundle_dir = tempfile.mkdtemp()
+    try:
+        start = time.time()
+        count = j2_bundle.compile_bundle([FRR_DIR], bundle_dir)
+        print('{} bundle entries compiled in {:.3f} s'.format(count, time.time() - start))
+
+        env = dict(os.environ)
+        env[redis_bcc.FILE_CACHE_DIR_ENV] = ''
+        source_env = dict(env)
+        source_env[j2_bundle.BUNDLE_DIR_ENV] = ''
+        bundle_env = dict(env)
+        bundle_env[j2_bundle.BUNDLE_DIR_ENV] = bundle_dir
+
+        print('{:<8} {:>10} {:>15}'.format('mode', 'best (s)', 'per render (ms)'))
+        results = {}
+        for mode, mode_env in [('source', source_env), ('bundle', bundle_env)]:
+            best = None
+            for _ in range(args.rounds):
+                elapsed, outputs = render_all(mode_env)
+                best = elapsed if best is None else min(best, elapsed)
+            results[mode] = (best, outputs)
+            print('{:<8} {:>10.3f} {:>15.1f}'.format(mode, best, 1000.0 * best / len(TEMPLATES)))
+        if results['source'][1] != results['bundle'][1]:
+            print('Output mismatch', file=sys.stderr)
+            sys.exit(1)
+        print('speedup x{:.2f}'.format(results['source'][0] / results['bundle'][0]))
+    finally:
+        shutil.rmtree(bundle_dir)
+
+
+if __name__ == '__main__':
+    main()
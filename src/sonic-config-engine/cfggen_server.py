@@ -0,0 +1,323 @@
+"""cfggen_server.py
+
+A long-lived render server for sonic-cfggen.
+
+sonic-cfggen is invoked many times during system boot up and container start,
+and every invocation pays for the interpreter start up and for importing
+jinja2, yaml, netaddr and natsort. The render server loads sonic-cfggen once
+and runs its main() for every request it receives on a unix socket, keeping
+the jinja2 environments, the parsed minigraph files and (optionally) CONFIG_DB
+snapshots warm in memory between requests. The parsed minigraph files are kept
+by the parse cache of the minigraph module, which replays the port alias maps
+on a hit and drops an entry once the mtime or size of the minigraph changes.
+
+sonic-cfggen-client is the matching thin client. It accepts exactly the same
+command line as sonic-cfggen, forwards it to the server and falls back to
+running sonic-cfggen directly when the server is not available.
+
+Wire protocol: every message is a 4 byte big-endian length followed by a
+UTF-8 encoded JSON document.
+    request:  {"argv": [...], "cwd": "/path", "env": {"NAMESPACE_ID": "0"}}
+    response: {"stdout": "...", "stderr": "...", "returncode": 0}
+"""
+
+from __future__ import print_function
+
+import copy
+import json
+import os
+import socket
+import struct
+import sys
+import time
+import traceback
+
+if sys.version_info.major == 3:
+    import socketserver
+    from io import StringIO
+else:
+    import SocketServer as socketserver
+    from StringIO import StringIO
+
+DEFAULT_SOCKET_PATH = '/var/run/sonic-cfggen.sock'
+SOCKET_PATH_ENV = 'SONIC_CFGGEN_SOCKET'
+CFGGEN_SCRIPT = 'sonic-cfggen'
+
+# Environment variables which change the sonic-cfggen output and therefore
+# have to be forwarded from the client to the server
+FORWARDED_ENV = ['NAMESPACE_ID']
+
+_HEADER = struct.Struct('!I')
+
+
+###############################################################################
+#
+# Wire protocol
+#
+###############################################################################
+
+def send_message(sock, message):
+    payload = json.dumps(message).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_message(sock):
+    """ Receive one message. Return None if the peer closed the connection """
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    payload = _recv_exact(sock, _HEADER.unpack(header)[0])
+    if payload is None:
+        return None
+    return json.loads(payload.decode('utf-8'))
+
+
+def get_socket_path():
+    return os.environ.get(SOCKET_PATH_ENV, DEFAULT_SOCKET_PATH)
+
+
+###############################################################################
+#
+# Client
+#
+###############################################################################
+
+def render(argv, socket_path=None, timeout=None):
+    """
+    Run sonic-cfggen with argv on the render server.
+    Return the server response, raise socket.error if the server is not reachable
+    """
+    request = {
+        'argv': list(argv),
+        'cwd': os.getcwd(),
+        'env': dict((name, os.environ[name]) for name in FORWARDED_ENV if name in os.environ),
+    }
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(socket_path or get_socket_path())
+        send_message(sock, request)
+        response = recv_message(sock)
+    finally:
+        sock.close()
+    if response is None:
+        raise socket.error('sonic-cfggen render server closed the connection')
+    return response
+
+
+def client_main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    try:
+        response = render(argv)
+    except socket.error:
+        # The render server is not running (yet), do the work ourselves
+        os.execvp(CFGGEN_SCRIPT, [CFGGEN_SCRIPT] + list(argv))
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    sys.stdout.flush()
+    sys.stderr.flush()
+    return response['returncode']
+
+
+###############################################################################
+#
+# Server
+#
+###############################################################################
+
+def load_cfggen(path):
+    """ Load sonic-cfggen script as a python module """
+    if sys.version_info.major == 3:
+        import importlib.machinery
+        import importlib.util
+        loader = importlib.machinery.SourceFileLoader('sonic_cfggen', path)
+        spec = importlib.util.spec_from_loader(loader.name, loader)
+        module = importlib.util.module_from_spec(spec)
+        loader.exec_module(module)
+        return module
+    else:
+        import imp
+        return imp.load_source('sonic_cfggen', path)
+
+
+def _exit_code(code):
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+class CfggenServer(object):
+    """ Run sonic-cfggen requests in a warm interpreter """
+
+    def __init__(self, cfggen_path, db_snapshot_ttl=0):
+        self.cfggen = load_cfggen(cfggen_path)
+        self.db_snapshot_ttl = db_snapshot_ttl
+        self.counters = {
+            'requests': 0,
+            'jinja2_env_hits': 0,
+            'jinja2_env_misses': 0,
+            'db_snapshot_hits': 0,
+            'db_snapshot_misses': 0,
+        }
+        self._jinja2_envs = {}
+        self._db_snapshots = {}
+        self._install_caches()
+
+    def _install_caches(self):
+        # Imported here, the client doesn't need the minigraph module
+        import minigraph
+        minigraph.enable_memory_parse_cache()
+        cfggen = self.cfggen
+        cfggen._get_jinja2_env = self._cached_jinja2_env(cfggen._get_jinja2_env)
+        if self.db_snapshot_ttl > 0:
+            cfggen.ConfigDBPipeConnector = self._snapshot_connector(cfggen.ConfigDBPipeConnector)
+
+    def _cached_jinja2_env(self, get_jinja2_env):
+        def wrapper(paths):
+            key = tuple(paths)
+            env = self._jinja2_envs.get(key)
+            if env is None:
+                self.counters['jinja2_env_misses'] += 1
+                env = self._jinja2_envs[key] = get_jinja2_env(paths)
+            else:
+                self.counters['jinja2_env_hits'] += 1
+            return env
+        return wrapper
+
+    def _snapshot_connector(self, connector_cls):
+        server = self
+
+        class SnapshotConfigDBConnector(connector_cls):
+            def __init__(self, *args, **kwargs):
+                super(SnapshotConfigDBConnector, self).__init__(*args, **kwargs)
+                self._snapshot_key = json.dumps(kwargs, sort_keys=True)
+
+            def get_config(self):
+                return server._get_db_snapshot(self._snapshot_key,
+                                               super(SnapshotConfigDBConnector, self).get_config)
+
+            def mod_config(self, data):
+                server._db_snapshots.clear()
+                return super(SnapshotConfigDBConnector, self).mod_config(data)
+
+        return SnapshotConfigDBConnector
+
+    def _get_db_snapshot(self, key, get_config):
+        now = time.time()
+        snapshot = self._db_snapshots.get(key)
+        if snapshot is None or now - snapshot[0] > self.db_snapshot_ttl:
+            self.counters['db_snapshot_misses'] += 1
+            snapshot = self._db_snapshots[key] = (now, get_config())
+        else:
+            self.counters['db_snapshot_hits'] += 1
+        return copy.deepcopy(snapshot[1])
+
+    def handle_request(self, request):
+        """ Run sonic-cfggen main() for one request and capture its output """
+        self.counters['requests'] += 1
+        stdout, stderr = StringIO(), StringIO()
+        saved_cwd = os.getcwd()
+        saved_env = dict((name, os.environ.get(name)) for name in FORWARDED_ENV)
+        saved_streams = sys.stdout, sys.stderr
+        returncode = 0
+        try:
+            os.chdir(request.get('cwd', '/'))
+            for name in FORWARDED_ENV:
+                os.environ.pop(name, None)
+            os.environ.update(request.get('env', {}))
+            sys.stdout, sys.stderr = stdout, stderr
+            try:
+                self.cfggen.main(request['argv'])
+            except SystemExit as e:
+                returncode = _exit_code(e.code)
+            except Exception:
+                traceback.print_exc()
+                returncode = 1
+        finally:
+            sys.stdout, sys.stderr = saved_streams
+            for name, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            os.chdir(saved_cwd)
+        return {
+            'stdout': stdout.getvalue(),
+            'stderr': stderr.getvalue(),
+            'returncode': returncode,
+        }
+
+
+class CfggenRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        request = recv_message(self.request)
+        if request is None:
+            return
+        send_message(self.request, self.server.cfggen_server.handle_request(request))
+
+
+class CfggenUnixServer(socketserver.UnixStreamServer):
+    """
+    Requests are served one at a time: sonic-cfggen changes the process
+    working directory and environment while it runs
+    """
+    def __init__(self, socket_path, cfggen_server):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        socketserver.UnixStreamServer.__init__(self, socket_path, CfggenRequestHandler)
+        self.cfggen_server = cfggen_server
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def server_main():
+    import argparse
+    import signal
+    try:
+        from shutil import which
+    except ImportError:
+        from distutils.spawn import find_executable as which
+
+    parser = argparse.ArgumentParser(description="Serve sonic-cfggen requests from a warm interpreter.")
+    parser.add_argument("-s", "--socket", help="unix socket to listen on", default=get_socket_path())
+    parser.add_argument("-c", "--cfggen", help="path to the sonic-cfggen script",
+                        default=which(CFGGEN_SCRIPT))
+    parser.add_argument("--db-snapshot-ttl", help="seconds to reuse a CONFIG_DB snapshot, 0 to always read CONFIG_DB",
+                        type=float, default=0)
+    args = parser.parse_args()
+
+    if not args.cfggen:
+        print('Failed to find %s' % CFGGEN_SCRIPT, file=sys.stderr)
+        sys.exit(1)
+
+    server = CfggenUnixServer(args.socket, CfggenServer(args.cfggen, args.db_snapshot_ttl))
+
+    def signal_handler(signum, frame):
+        server.server_close()
+        sys.exit(0)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,112 @@
+"""config_db_delta.py
+
+Incremental CONFIG_DB writes for sonic-cfggen --write-to-db.
+
+ConfigDBConnector.mod_config() merges the given fields into the existing
+entries, so writing only the keys and fields whose value differs from the
+current CONFIG_DB content leaves CONFIG_DB in exactly the same state as
+writing the whole generated data set, while the subscribers of the keyspace
+notifications only hear about what actually changed.
+"""
+
+try:
+    from swsscommon.swsscommon import ConfigDBConnector
+except ImportError as e:
+    raise ImportError("%s - required module not found" % str(e))
+
+# Number of keys written in one mod_config() call, i.e. in one redis pipeline
+WRITE_BATCH_SIZE = 512
+
+STATS_FIELDS = [
+    'keys_added',
+    'keys_modified',
+    'keys_deleted',
+    'keys_unchanged',
+    'tables_deleted',
+    'fields_written',
+    'fields_unchanged',
+]
+
+
+def _to_db_value(value):
+    """ Convert a generated field value to the form ConfigDBConnector.get_config() reads it back """
+    if type(value) is list:
+        return ','.join(value).split(',')
+    return str(value)
+
+
+def _find_entry(table, key):
+    """ Find key in a table, whether it is kept as a tuple or as a '|' separated string """
+    serialized_key = ConfigDBConnector.serialize_key(key)
+    if serialized_key in table:
+        return table[serialized_key]
+    return table.get(ConfigDBConnector.deserialize_key(serialized_key))
+
+
+def get_delta(current, generated):
+    """
+    Compare the generated config data with the current CONFIG_DB content.
+    Return the data to pass to mod_config() and the statistics of the writes
+    """
+    delta = {}
+    stats = dict.fromkeys(STATS_FIELDS, 0)
+    for table_name, table in generated.items():
+        current_table = current.get(table_name)
+        if table is None:
+            if current_table:
+                delta[table_name] = None
+                stats['tables_deleted'] += 1
+            continue
+        current_table = current_table or {}
+        for key, entry in table.items():
+            current_entry = _find_entry(current_table, key)
+            if entry is None:
+                if current_entry is not None:
+                    delta.setdefault(table_name, {})[key] = None
+                    stats['keys_deleted'] += 1
+                continue
+            if current_entry is None:
+                delta.setdefault(table_name, {})[key] = entry
+                stats['keys_added'] += 1
+                stats['fields_written'] += len(entry)
+                continue
+            changed = dict((field, value) for field, value in entry.items()
+                           if current_entry.get(field) != _to_db_value(value))
+            stats['fields_unchanged'] += len(entry) - len(changed)
+            if changed:
+                delta.setdefault(table_name, {})[key] = changed
+                stats['keys_modified'] += 1
+                stats['fields_written'] += len(changed)
+            else:
+                stats['keys_unchanged'] += 1
+    return delta, stats
+
+
+def apply_delta(configdb, delta, batch_size=WRITE_BATCH_SIZE):
+    """ Write the delta into CONFIG_DB, batch_size keys per mod_config() call """
+    batch = {}
+    batch_keys = 0
+    for table_name, table in delta.items():
+        if table is None:
+            configdb.mod_config({table_name: None})
+            continue
+        for key, entry in table.items():
+            batch.setdefault(table_name, {})[key] = entry
+            batch_keys += 1
+            if batch_keys >= batch_size:
+                configdb.mod_config(batch)
+                batch = {}
+                batch_keys = 0
+    if batch:
+        configdb.mod_config(batch)
+
+
+def write_incremental(configdb, generated, dry_run=False):
+    """
+    Write only the changed part of the generated config data into CONFIG_DB.
+    Return the delta and the statistics of the writes
+    """
+    delta, stats = get_delta(configdb.get_config(), generated)
+    if not dry_run:
+        apply_delta(configdb, delta)
+    return delta, stats
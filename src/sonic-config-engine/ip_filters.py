@@ -0,0 +1,172 @@
+"""ip_filters.py
+
+IP address jinja2 filters shared by sonic-cfggen and bgpcfgd, and the options
+and filters of their jinja2 environments.
+
+Large templates (ACLs, BGP neighbors, VLAN interfaces) apply these filters
+to the same address strings over and over. Parsing a string into a
+netaddr.IPNetwork is by far the most expensive part of every filter, so the
+parse results are kept in a bounded LRU cache. Telling IPv4 from IPv6 only
+needs the stdlib ipaddress parser, netaddr is used when it does not accept
+the string.
+"""
+
+from collections import OrderedDict
+from functools import partial
+
+import netaddr
+
+try:
+    import ipaddress
+except ImportError:
+    ipaddress = None
+
+CACHE_SIZE = 8192
+
+# Filters extracting an attribute of a prefix
+PREFIX_ATTR_FILTERS = ['ip', 'network', 'prefixlen', 'netmask', 'broadcast']
+
+# Options and filters of the environments the templates are rendered with.
+# The template bundle is compiled with the same ones
+CFGGEN_ENV_OPTIONS = {'trim_blocks': True}
+CFGGEN_FILTERS = ['sort_by_port_index', 'ipv4', 'ipv6', 'unique_name', 'pfx_filter', 'ip_network',
+                  'ip', 'network', 'prefixlen', 'netmask', 'broadcast']
+BGPCFGD_ENV_OPTIONS = {'trim_blocks': False}
+BGPCFGD_FILTERS = ['ipv4', 'ipv6', 'pfx_filter', 'ip', 'network', 'prefixlen', 'netmask']
+
+
+class LRUCache(object):
+    """ A dict with at most maxsize entries, the least recently used entries are dropped """
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._data[key] = value
+        return value
+
+    def set(self, key, value):
+        self._data.pop(key, None)
+        self._data[key] = value
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+_INVALID = object()
+_networks = LRUCache()
+_versions = LRUCache()
+
+
+def parse_network(value):
+    """
+    Return the netaddr.IPNetwork of value, or None if value is not a valid
+    ip address or prefix. The returned object is shared, do not modify it
+    """
+    if isinstance(value, netaddr.IPNetwork):
+        return value
+    value = str(value)
+    network = _networks.get(value)
+    if network is None:
+        try:
+            network = netaddr.IPNetwork(value)
+        except Exception:
+            network = _INVALID
+        _networks.set(value, network)
+    return None if network is _INVALID else network
+
+
+def ip_version(value):
+    """ Return 4 or 6 for an ip address or prefix, None if value is not valid """
+    if not value:
+        return None
+    if isinstance(value, netaddr.IPNetwork):
+        return value.version
+    value = str(value)
+    version = _versions.get(value)
+    if version is None:
+        version = 0
+        if ipaddress is not None and '%' not in value:
+            try:
+                version = ipaddress.ip_interface(value if isinstance(value, type(u'')) else value.decode()).version
+            except ValueError:
+                pass
+        if not version:
+            network = parse_network(value)
+            version = network.version if network is not None else 0
+        _versions.set(value, version)
+    return version or None
+
+
+def is_ipv4(value):
+    """ Return True if the value is an ipv4 address """
+    return ip_version(value) == 4
+
+
+def is_ipv6(value):
+    """ Return True if the value is an ipv6 address """
+    return ip_version(value) == 6
+
+
+def prefix_attr(attr, value):
+    """
+    Extract attribute from IPNetwork object
+    :param attr: attribute to extract
+    :param value: the string representation of ip prefix which will be converted to IPNetwork.
+    :return: the value of the extracted attribute
+    """
+    if not value:
+        return None
+    prefix = parse_network(value)
+    if prefix is None:
+        return None
+    return str(getattr(prefix, attr))
+
+
+def ip_network(value):
+    """ Extract network for network prefix """
+    prefix = parse_network(value)
+    if prefix is None:
+        return "Invalid ip address %s" % value
+    return prefix.network
+
+
+def cache_info():
+    """ Hits, misses and sizes of the parse caches """
+    return dict((name, {'hits': cache.hits, 'misses': cache.misses, 'size': len(cache)})
+                for name, cache in [('networks', _networks), ('versions', _versions)])
+
+
+def clear_cache():
+    _networks.clear()
+    _versions.clear()
+
+
+def set_filters(environment, names, filters=None, prefix_attr_filter=prefix_attr):
+    """
+    Set the filters in names on a jinja2 environment. Implementations are taken
+    from filters, then from this module. The prefix attribute filters are
+    partials of prefix_attr_filter
+    """
+    filters = dict({'ipv4': is_ipv4, 'ipv6': is_ipv6, 'ip_network': ip_network}, **(filters or {}))
+    for name in names:
+        if name in PREFIX_ATTR_FILTERS:
+            environment.filters[name] = partial(prefix_attr_filter, name)
+        else:
+            environment.filters[name] = filters[name]
@@ -0,0 +1,165 @@
+"""j2_bundle.py
+
+Precompiled jinja2 template bundles.
+
+Rendering a template from source means lexing, parsing and generating python
+code for it, and then compiling that python code. A bundle holds the result
+of all these steps (the marshalled python code object, in the same form as
+jinja2.ModuleLoader modules with deferred initialization) for every template
+found in a set of directories, and is built once at image build time with
+sonic-cfggen-compile-templates.
+
+Bundle entries are keyed by the template source and by everything the
+generated code depends on: the environment options, the jinja2 version and
+the python version. A template which was modified after the bundle was built,
+or which is rendered with another environment, is not found in the bundle and
+is compiled from source as usual.
+"""
+
+from __future__ import print_function
+
+import hashlib
+import marshal
+import os
+import sys
+
+import jinja2
+
+import ip_filters
+
+BUNDLE_DIR = '/usr/share/sonic/templates/j2_bundle'
+BUNDLE_DIR_ENV = 'SONIC_J2_BUNDLE_DIR'
+TEMPLATE_SUFFIX = '.j2'
+
+# Options and custom filters of the environments the templates are rendered
+# with. jinja2 checks the filters when it generates the code, so they are
+# part of the key and have to match the runtime environments
+BUNDLE_ENVIRONMENTS = [
+    # sonic-cfggen
+    (ip_filters.CFGGEN_ENV_OPTIONS, ip_filters.CFGGEN_FILTERS),
+    # bgpcfgd TemplateFabric
+    (ip_filters.BGPCFGD_ENV_OPTIONS, ip_filters.BGPCFGD_FILTERS),
+]
+
+
+def _environment_key(environment):
+    """ Everything besides the source which changes the code jinja2 generates for a template """
+    return repr((
+        jinja2.__version__,
+        sys.version_info[:2],
+        environment.block_start_string, environment.block_end_string,
+        environment.variable_start_string, environment.variable_end_string,
+        environment.comment_start_string, environment.comment_end_string,
+        environment.line_statement_prefix, environment.line_comment_prefix,
+        environment.trim_blocks, environment.lstrip_blocks,
+        environment.newline_sequence, environment.keep_trailing_newline,
+        environment.optimized, environment.autoescape,
+        sorted(environment.extensions),
+        sorted(environment.filters), sorted(environment.tests),
+    ))
+
+
+def get_entry_name(environment, source):
+    key = _environment_key(environment) + '\0' + source
+    return 'tmpl_' + hashlib.sha1(key.encode('utf-8')).hexdigest() + '.code'
+
+
+def get_bundle_dir():
+    return os.environ.get(BUNDLE_DIR_ENV, BUNDLE_DIR)
+
+
+class BundleLoader(jinja2.BaseLoader):
+    """
+    Load templates from the bundle, fall back to compiling the template
+    from source when the bundle has no entry for it
+    """
+
+    def __init__(self, source_loader, bundle_dir=None):
+        self.source_loader = source_loader
+        if bundle_dir is None:
+            bundle_dir = get_bundle_dir()
+        self.bundle_dir = bundle_dir if bundle_dir and os.path.isdir(bundle_dir) else None
+        self.hits = 0
+        self.misses = 0
+
+    def get_source(self, environment, template):
+        return self.source_loader.get_source(environment, template)
+
+    def list_templates(self):
+        return self.source_loader.list_templates()
+
+    def load(self, environment, name, globals=None):
+        if self.bundle_dir is None:
+            return self.source_loader.load(environment, name, globals)
+        source, filename, uptodate = self.get_source(environment, name)
+        entry_path = os.path.join(self.bundle_dir, get_entry_name(environment, source))
+        try:
+            with open(entry_path, 'rb') as f:
+                code = marshal.load(f)
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            self.misses += 1
+            return self.source_loader.load(environment, name, globals)
+        self.hits += 1
+        namespace = {'__file__': filename, '__name__': name}
+        exec(code, namespace)
+        template = environment.template_class.from_module_dict(environment, namespace, globals or {})
+        template.name = name
+        template.filename = filename
+        template._uptodate = uptodate
+        return template
+
+
+def _placeholder_filter(value, *args, **kwargs):
+    raise RuntimeError('template bundle filter placeholder called')
+
+
+def compile_bundle(template_dirs, bundle_dir, environments=BUNDLE_ENVIRONMENTS):
+    """
+    Compile every template under template_dirs for every environment in
+    environments into bundle_dir. Return the number of entries written
+    """
+    if not os.path.isdir(bundle_dir):
+        os.makedirs(bundle_dir)
+    sources = {}
+    for template_dir in template_dirs:
+        for root, dirs, files in os.walk(template_dir):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.endswith(TEMPLATE_SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                with open(path, 'rb') as f:
+                    sources[path] = f.read().decode('utf-8')
+
+    count = 0
+    for options, filters in environments:
+        environment = jinja2.Environment(**options)
+        for name in filters:
+            environment.filters[name] = _placeholder_filter
+        for path, source in sorted(sources.items()):
+            entry_name = get_entry_name(environment, source)
+            entry_path = os.path.join(bundle_dir, entry_name)
+            if os.path.exists(entry_path):
+                continue
+            try:
+                python_source = environment.compile(source, os.path.basename(path), path, raw=True, defer_init=True)
+            except jinja2.TemplateSyntaxError as e:
+                # Not all .j2 files are jinja2 templates for this environment
+                print('Skip {}: {}'.format(path, e), file=sys.stderr)
+                continue
+            code = compile(python_source, path, 'exec')
+            with open(entry_path + '.tmp', 'wb') as f:
+                marshal.dump(code, f)
+            os.rename(entry_path + '.tmp', entry_path)
+            count += 1
+    return count
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Precompile jinja2 templates into a template bundle.")
+    parser.add_argument("-o", "--output", help="bundle directory", default=get_bundle_dir())
+    parser.add_argument("template_dir", nargs='+', help="directories to search for {} templates".format(TEMPLATE_SUFFIX))
+    args = parser.parse_args()
+    count = compile_bundle(args.template_dir, args.output)
+    print('{} templates compiled into {}'.format(count, args.output))
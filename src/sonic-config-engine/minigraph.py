@@ -1,16 +1,21 @@
 from __future__ import print_function
 
+import hashlib
 import ipaddress
 import math
 import os
+import pickle
 import sys
 import json
-from collections import defaultdict
+import tempfile
+from collections import OrderedDict, defaultdict
+from io import BytesIO
 
 from lxml import etree as ET
 from lxml.etree import QName
 
 
+import portconfig
 from portconfig import get_port_config
 from sonic_py_common.multi_asic import get_asic_id_from_name
 from sonic_py_common.interface import backplane_prefix
@@ -47,6 +52,17 @@ BACKEND_ASIC_SUB_ROLE = 'BackEnd'
 # Default Virtual Network Index (VNI) 
 vni_default = 8000
 
+# Minigraph files of this size or larger are parsed in streaming mode
+STREAMING_PARSE_MIN_SIZE = 32 * 1024 * 1024
+
+# Parse results are cached in this directory if it exists, so that repeated
+# sonic-cfggen -m calls during boot do not parse the minigraph file again
+PARSE_CACHE_DIR = '/var/cache/sonic/minigraph'
+PARSE_CACHE_DIR_ENV = 'SONIC_MINIGRAPH_CACHE_DIR'
+PARSE_CACHE_MAX_ENTRIES = 64
+# Bump when the format of the cached entries changes
+PARSE_CACHE_VERSION = 1
+
 ###############################################################################
 #
 # Minigraph parsing functions
@@ -1049,12 +1065,172 @@ def enable_internal_bgp_session(bgp_sessions, filename, asic_name):
             (local_sub_role == BACKEND_ASIC_SUB_ROLE and peer_sub_role == FRONTEND_ASIC_SUB_ROLE)):
             bgp_sessions[peer_ip].update({'admin_status': 'up'})
 
+###############################################################################
+#
+# Parse cache
+#
+# Every entry is a file with two pickles: a header describing the inputs the
+# entry was generated from and the parse result. The header lists the stamps
+# (path, mtime, size, sha1) of the parsed files and of this module, an entry
+# is stale as soon as any of them changes content. Stale entries are removed,
+# and the oldest entries are evicted once there are more than
+# PARSE_CACHE_MAX_ENTRIES of them.
+#
+# Long-lived processes such as the sonic-cfggen render server also keep the
+# entries in memory, see enable_memory_parse_cache(). An entry in memory is
+# current while the mtime and size of the parsed files are unchanged.
+#
+###############################################################################
+
+_CODE_FILES = [os.path.abspath(__file__), os.path.abspath(portconfig.__file__)]
+
+# Cache key -> (file stamps without digest, entry data). None when disabled
+_memory_parse_cache = None
+
+def enable_memory_parse_cache():
+    """ Keep the parse cache entries in memory, in addition to the cache directory """
+    global _memory_parse_cache
+    if _memory_parse_cache is None:
+        _memory_parse_cache = OrderedDict()
+
+def _file_digest(filename):
+    sha1 = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+def _data_digest(data):
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+def _file_stamp(filename):
+    st = os.stat(filename)
+    return (os.path.abspath(filename), st.st_mtime, st.st_size, _file_digest(filename))
+
+def _is_stamp_current(stamp):
+    (filename, mtime, size, digest) = stamp
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return False
+    if st.st_size != size:
+        return False
+    # The file was touched, it is still current if its content is unchanged
+    return st.st_mtime == mtime or _file_digest(filename) == digest
+
+def _quick_file_stamps(filenames):
+    stamps = []
+    for filename in filenames:
+        st = os.stat(filename)
+        stamps.append((filename, st.st_mtime, st.st_size))
+    return stamps
+
+def _get_parse_cache_key(*key):
+    """ Get the cache key for the parse function and its arguments in key """
+    key = [os.path.abspath(k) if isinstance(k, str) and os.path.exists(k) else k for k in key]
+    key.append(sys.version_info.major)
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+def _get_parse_cache_entry_path(cache_key):
+    """ Get the cache entry file name, or None if there is no cache directory """
+    cache_dir = os.environ.get(PARSE_CACHE_DIR_ENV, PARSE_CACHE_DIR)
+    if not cache_dir or not os.path.isdir(cache_dir):
+        return None
+    return os.path.join(cache_dir, cache_key + '.cache')
+
+def _save_memory_parse_cache_entry(cache_key, filenames, data):
+    if _memory_parse_cache is None:
+        return
+    try:
+        stamps = _quick_file_stamps([os.path.abspath(f) for f in filenames] + _CODE_FILES)
+    except OSError:
+        return
+    _memory_parse_cache.pop(cache_key, None)
+    _memory_parse_cache[cache_key] = (stamps, data)
+    while len(_memory_parse_cache) > PARSE_CACHE_MAX_ENTRIES:
+        _memory_parse_cache.popitem(last=False)
+
+def _load_parse_cache_entry(cache_key, filenames):
+    """ Return the header and a stream positioned at the cached result,
+    or None if there is no current entry """
+    if _memory_parse_cache is not None and cache_key in _memory_parse_cache:
+        (stamps, data) = _memory_parse_cache.pop(cache_key)
+        try:
+            current = _quick_file_stamps([stamp[0] for stamp in stamps]) == stamps
+        except OSError:
+            current = False
+        if current:
+            _memory_parse_cache[cache_key] = (stamps, data)
+            stream = BytesIO(data)
+            return (pickle.load(stream), stream)
+
+    entry_path = _get_parse_cache_entry_path(cache_key)
+    if entry_path is None or not os.path.isfile(entry_path):
+        return None
+    try:
+        with open(entry_path, 'rb') as f:
+            data = f.read()
+        stream = BytesIO(data)
+        header = pickle.load(stream)
+        if (header['version'] == PARSE_CACHE_VERSION and
+                [stamp[0] for stamp in header['stamps']] == [os.path.abspath(f) for f in filenames] + _CODE_FILES and
+                all(_is_stamp_current(stamp) for stamp in header['stamps'])):
+            try:
+                # Keep recently used entries from being evicted
+                os.utime(entry_path, None)
+            except OSError:
+                pass
+            _save_memory_parse_cache_entry(cache_key, filenames, data)
+            return (header, stream)
+    except Exception:
+        pass
+    try:
+        os.remove(entry_path)
+    except OSError:
+        pass
+    return None
+
+def _save_parse_cache_entry(cache_key, filenames, header, result):
+    entry_path = _get_parse_cache_entry_path(cache_key)
+    if entry_path is None and _memory_parse_cache is None:
+        return
+    header = dict(header, version=PARSE_CACHE_VERSION,
+                  stamps=[_file_stamp(f) for f in filenames + _CODE_FILES])
+    stream = BytesIO()
+    pickle.dump(header, stream, pickle.HIGHEST_PROTOCOL)
+    pickle.dump(result, stream, pickle.HIGHEST_PROTOCOL)
+    data = stream.getvalue()
+    _save_memory_parse_cache_entry(cache_key, filenames, data)
+    if entry_path is None:
+        return
+    cache_dir = os.path.dirname(entry_path)
+    try:
+        (fd, tmp_path) = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    except (OSError, IOError):
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.rename(tmp_path, entry_path)
+    except Exception:
+        os.remove(tmp_path)
+        return
+
+    entries = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith('.cache')]
+    if len(entries) > PARSE_CACHE_MAX_ENTRIES:
+        entries.sort(key=lambda e: os.stat(e).st_mtime)
+        for entry in entries[:len(entries) - PARSE_CACHE_MAX_ENTRIES]:
+            try:
+                os.remove(entry)
+            except OSError:
+                pass
+
 ###############################################################################
 #
 # Main functions
 #
 ###############################################################################
-def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hwsku_config_file=None):
+def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hwsku_config_file=None, streaming=None):
     """ Parse minigraph xml file.
 
     Keyword arguments:
@@ -1063,9 +1239,44 @@ def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hw
     port_config_file -- port config file name
     asic_name -- asic name; to parse multi-asic device minigraph to 
     generate asic specific configuration.
+    streaming -- parse the file section by section with iterparse instead
+    of loading the whole element tree. Defaults to True for files larger
+    than STREAMING_PARSE_MIN_SIZE. The results are the same in both modes.
+
+    The result is served from the parse cache when neither the minigraph
+    file nor the port config it was generated with have changed.
      """
+    cache_key = _get_parse_cache_key('parse_xml', filename, platform, port_config_file, asic_name, hwsku_config_file)
+    entry = _load_parse_cache_entry(cache_key, [filename])
+    if entry is not None:
+        header, stream = entry
+        asic_id = get_asic_id_from_name(asic_name) if asic_name is not None else None
+        port_config = get_port_config(hwsku=header['hwsku'], platform=platform, port_config_file=port_config_file, asic=asic_id, hwsku_config_file=hwsku_config_file)
+        if header['port_config'] == _data_digest(port_config):
+            (_, alias_map, alias_asic_map) = port_config
+            port_alias_map.update(alias_map)
+            port_alias_asic_map.update(alias_asic_map)
+            return pickle.load(stream)
+
+    if streaming is None:
+        streaming = os.path.getsize(filename) >= STREAMING_PARSE_MIN_SIZE
+    (results, hwsku, port_config_digest) = _parse_xml(filename, platform, port_config_file, asic_name, hwsku_config_file, streaming)
+    _save_parse_cache_entry(cache_key, [filename], {'hwsku': hwsku, 'port_config': port_config_digest}, results)
+    return results
 
-    root = ET.parse(filename).getroot()
+def _parse_xml(filename, platform, port_config_file, asic_name, hwsku_config_file, streaming):
+    """ Parse minigraph xml file, return the results together with the hwsku
+    and the digest of the port config they were generated with """
+
+    # The section handlers need the hostname and hwsku, which come last in
+    # the minigraph file. In streaming mode the file is read twice: a first
+    # pass picks them up, a second pass dispatches the sections.
+    if streaming:
+        prescan_sections = iter_minigraph_sections(filename)
+        sections = iter_minigraph_sections(filename)
+    else:
+        root = load_minigraph(filename)
+        prescan_sections = sections = root
 
     u_neighbors = None
     u_devices = None
@@ -1120,22 +1331,26 @@ def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hw
     hwsku_qn = QName(ns, "HwSku")
     hostname_qn = QName(ns, "Hostname")
     docker_routing_config_mode_qn = QName(ns, "DockerRoutingConfigMode")
-    for child in root:
+    metadata_qn = QName(ns, "MetadataDeclaration")
+    for child in prescan_sections:
         if child.tag == str(hwsku_qn):
             hwsku = child.text
         if child.tag == str(hostname_qn):
             hostname = child.text
         if child.tag == str(docker_routing_config_mode_qn):
             docker_routing_config_mode = child.text
-
-    (ports, alias_map, alias_asic_map) = get_port_config(hwsku=hwsku, platform=platform, port_config_file=port_config_file, asic=asic_id, hwsku_config_file=hwsku_config_file)
+        # Get the local device node from DeviceMetadata
+        if child.tag == str(metadata_qn):
+            local_devices.extend(parse_asic_meta_get_devices([child]))
+
+    port_config = get_port_config(hwsku=hwsku, platform=platform, port_config_file=port_config_file, asic=asic_id, hwsku_config_file=hwsku_config_file)
+    # Digest before parsing, the port config is modified in place
+    port_config_digest = _data_digest(port_config)
+    (ports, alias_map, alias_asic_map) = port_config
     port_alias_map.update(alias_map)
     port_alias_asic_map.update(alias_asic_map)
 
-    # Get the local device node from DeviceMetadata
-    local_devices = parse_asic_meta_get_devices(root)
-
-    for child in root:
+    for child in sections:
         if asic_name is None:
             if child.tag == str(QName(ns, "DpgDec")):
                 (intfs, lo_intfs, mvrf, mgmt_intf, vlans, vlan_members, pcs, pc_members, acls, vni, tunnel_intfs, dpg_ecmp_content) = parse_dpg(child, hostname)
@@ -1503,7 +1718,7 @@ def parse_xml(filename, platform=None, port_config_file=None, asic_name=None, hw
         }
     }
 
-    return results
+    return (results, hwsku, port_config_digest)
 
 def get_tunnel_entries(tunnel_intfs, lo_intfs, hostname):
     lo_addr = ''
@@ -1570,11 +1785,56 @@ def parse_device_desc_xml(filename):
 def parse_asic_sub_role(filename, asic_name):
     if not os.path.isfile(filename):
         return None
-    root = ET.parse(filename).getroot()
+    cache_key = _get_parse_cache_key('parse_asic_sub_role', filename, asic_name)
+    entry = _load_parse_cache_entry(cache_key, [filename])
+    if entry is not None:
+        return pickle.load(entry[1])
+
+    sub_role = None
+    root = load_minigraph(filename)
     for child in root:
         if child.tag == str(QName(ns, "MetadataDeclaration")):
             sub_role = parse_asic_meta(child, asic_name)
-            return sub_role
+            break
+    _save_parse_cache_entry(cache_key, [filename], {}, sub_role)
+    return sub_role
+
+# Top level elements of the minigraph file handled by parse_xml
+MINIGRAPH_SECTIONS = ["CpgDec", "DpgDec", "PngDec", "UngDec", "MetadataDeclaration",
+                      "LinkMetadataDeclaration", "DeviceInfos", "HwSku", "Hostname",
+                      "DockerRoutingConfigMode"]
+
+_loaded_minigraph = {}
+
+def load_minigraph(filename):
+    """ Get the root element of the minigraph file. The last loaded tree is
+    kept, so parsing the same file for several asics or parsing its asic
+    sub role does not read the file again.
+    """
+    st = os.stat(filename)
+    key = (os.path.abspath(filename), st.st_mtime, st.st_size)
+    if key not in _loaded_minigraph:
+        _loaded_minigraph.clear()
+        _loaded_minigraph[key] = ET.parse(filename).getroot()
+    return _loaded_minigraph[key]
+
+def iter_minigraph_sections(filename):
+    """ Yield the top level elements of the minigraph file one by one, as
+    soon as each of them has been parsed. The previous element is freed
+    when the next one is requested, so only one section is held in memory.
+    """
+    tags = [str(QName(ns, section)) for section in MINIGRAPH_SECTIONS]
+    for _, elem in ET.iterparse(filename, events=('end',), tag=tags):
+        parent = elem.getparent()
+        # Some section names are reused for nested elements, e.g. Hostname
+        if parent is None or parent.getparent() is not None:
+            continue
+        yield elem
+        # Clearing the children one by one is much faster in lxml than
+        # clearing a large section in one go
+        for child in elem:
+            child.clear()
+        elem.clear()
 
 def parse_asic_meta_get_devices(root):
     local_devices = []
@@ -1,11 +1,23 @@
+import hashlib
 import jinja2
+import os
+import struct
+import tempfile
+import time
 
 from base64 import b64encode, b64decode
 
+FILE_CACHE_DIR = '/var/cache/sonic/jinja2'
+FILE_CACHE_DIR_ENV = 'SONIC_CFGGEN_BYTECODE_CACHE_DIR'
+FILE_CACHE_MAX_SIZE = 32 * 1024 * 1024
+
 class RedisBytecodeCache(jinja2.BytecodeCache):
     """ A bytecode cache for jinja2 template that stores bytecode in Redis """
 
     REDIS_HASH = 'JINJA2_CACHE'
+    # Time it took to compile the templates, kept apart from the bytecode
+    # which other readers of REDIS_HASH expect alone
+    REDIS_COMPILE_TIME_HASH = 'JINJA2_CACHE_COMPILE_TIME'
 
     def __init__(self, client):
         self._client = client
@@ -14,16 +26,179 @@ class RedisBytecodeCache(jinja2.BytecodeCache):
         except Exception:
             self._client = None
 
-    def load_bytecode(self, bucket):
+    def load_entry(self, bucket):
+        """ Load the bytecode into bucket, return the time it took to compile it or None on a miss """
         if self._client is None:
-            return
+            return None
         code = self._client.get(self._client.LOGLEVEL_DB, self.REDIS_HASH, bucket.key)
-        if code is not None:
-            bucket.bytecode_from_string(b64decode(code.encode()))
+        if code is None:
+            return None
+        bucket.bytecode_from_string(b64decode(code.encode()))
+        if bucket.code is None:
+            return None
+        compile_time = self._client.get(self._client.LOGLEVEL_DB, self.REDIS_COMPILE_TIME_HASH, bucket.key)
+        try:
+            return float(compile_time)
+        except (TypeError, ValueError):
+            return 0.0
 
-    def dump_bytecode(self, bucket):
+    def dump_entry(self, bucket, compile_time=0.0):
         if self._client is None:
             return
         self._client.set(self._client.LOGLEVEL_DB, self.REDIS_HASH,
                          bucket.key, b64encode(bucket.bytecode_to_string()).decode())
+        self._client.set(self._client.LOGLEVEL_DB, self.REDIS_COMPILE_TIME_HASH,
+                         bucket.key, repr(compile_time))
+
+    def load_bytecode(self, bucket):
+        self.load_entry(bucket)
+
+    def dump_bytecode(self, bucket):
+        self.dump_entry(bucket)
+
+class FileBytecodeCache(jinja2.BytecodeCache):
+    """
+    A bytecode cache for jinja2 template that stores bytecode in files,
+    usable before Redis is up and in the build chroot. Every entry is a
+    fixed size header with the sha1 of the bytecode followed by the bytecode.
+    The least recently used entries are removed when the total size is above
+    max_size. Caching is disabled if the cache directory does not exist
+    """
 
+    MAGIC = b'SBC1'
+    HEADER = struct.Struct('!4sdI20s')
+    SUFFIX = '.bcc'
+
+    def __init__(self, directory=None, max_size=FILE_CACHE_MAX_SIZE):
+        if directory is None:
+            directory = os.environ.get(FILE_CACHE_DIR_ENV, FILE_CACHE_DIR)
+        self._directory = directory if directory and os.path.isdir(directory) else None
+        self._max_size = max_size
+
+    def _entry_path(self, bucket):
+        return os.path.join(self._directory, bucket.key + self.SUFFIX)
+
+    def load_entry(self, bucket):
+        """ Load the bytecode into bucket, return the time it took to compile it or None on a miss """
+        if self._directory is None:
+            return None
+        entry_path = self._entry_path(bucket)
+        try:
+            with open(entry_path, 'rb') as f:
+                data = f.read()
+        except (OSError, IOError):
+            return None
+        if len(data) >= self.HEADER.size:
+            magic, compile_time, size, digest = self.HEADER.unpack_from(data)
+            code = data[self.HEADER.size:]
+            if magic == self.MAGIC and size == len(code) and hashlib.sha1(code).digest() == digest:
+                bucket.bytecode_from_string(code)
+                if bucket.code is not None:
+                    try:
+                        # Keep recently used entries from being evicted
+                        os.utime(entry_path, None)
+                    except OSError:
+                        pass
+                    return compile_time
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass
+        return None
+
+    def dump_entry(self, bucket, compile_time=0.0):
+        if self._directory is None:
+            return
+        code = bucket.bytecode_to_string()
+        try:
+            (fd, tmp_path) = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+        except (OSError, IOError):
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self.HEADER.pack(self.MAGIC, compile_time, len(code), hashlib.sha1(code).digest()))
+                f.write(code)
+            os.rename(tmp_path, self._entry_path(bucket))
+        except Exception:
+            os.remove(tmp_path)
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total_size = 0
+        for name in os.listdir(self._directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self._directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total_size += st.st_size
+        entries.sort()
+        for _, size, name in entries:
+            if total_size <= self._max_size:
+                break
+            try:
+                os.remove(os.path.join(self._directory, name))
+            except OSError:
+                pass
+            total_size -= size
+
+    def load_bytecode(self, bucket):
+        self.load_entry(bucket)
+
+    def dump_bytecode(self, bucket):
+        self.dump_entry(bucket)
+
+    def clear(self):
+        if self._directory is None:
+            return
+        for name in os.listdir(self._directory):
+            if name.endswith(self.SUFFIX):
+                try:
+                    os.remove(os.path.join(self._directory, name))
+                except OSError:
+                    pass
+
+class TieredBytecodeCache(jinja2.BytecodeCache):
+    """
+    A bytecode cache for jinja2 template that looks up the file cache first
+    and Redis second. Bytecode found in Redis is copied to the file cache
+    """
+
+    def __init__(self, file_cache, redis_cache):
+        self._file_cache = file_cache
+        self._redis_cache = redis_cache
+        self._compile_start = {}
+        self.stats = {
+            'file_hits': 0,
+            'redis_hits': 0,
+            'misses': 0,
+            'compile_time': 0.0,
+            'compile_time_saved': 0.0,
+        }
+
+    def load_bytecode(self, bucket):
+        compile_time = self._file_cache.load_entry(bucket)
+        if compile_time is not None:
+            self.stats['file_hits'] += 1
+            self.stats['compile_time_saved'] += compile_time
+            return
+        compile_time = self._redis_cache.load_entry(bucket)
+        if compile_time is not None:
+            self.stats['redis_hits'] += 1
+            self.stats['compile_time_saved'] += compile_time
+            self._file_cache.dump_entry(bucket, compile_time)
+            return
+        self.stats['misses'] += 1
+        # jinja2 compiles the template between the miss and dump_bytecode()
+        self._compile_start[bucket.key] = time.time()
+
+    def dump_bytecode(self, bucket):
+        start = self._compile_start.pop(bucket.key, None)
+        compile_time = time.time() - start if start is not None else 0.0
+        self.stats['compile_time'] += compile_time
+        self._file_cache.dump_entry(bucket, compile_time)
+        self._redis_cache.dump_entry(bucket, compile_time)
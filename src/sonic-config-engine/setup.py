@@ -43,7 +43,11 @@ setup(
     author_email = 'taoyl@microsoft.com',
     url = 'https://github.com/Azure/sonic-buildimage',
     py_modules = [
+        'cfggen_server',
+        'config_db_delta',
         'config_samples',
+        'ip_filters',
+        'j2_bundle',
         'lazy_re',
         'minigraph',
         'openconfig_acl',
@@ -52,6 +56,9 @@ setup(
     ],
     scripts = [
         'sonic-cfggen',
+        'sonic-cfggen-client',
+        'sonic-cfggen-compile-templates',
+        'sonic-cfggen-server',
     ],
     install_requires = dependencies,
     data_files = [
@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+
+import jinja2
+
+from unittest import TestCase
+
+from redis_bcc import FileBytecodeCache, RedisBytecodeCache, TieredBytecodeCache
+
+
+class FakeRedisClient(object):
+    LOGLEVEL_DB = 3
+
+    def __init__(self, available=True):
+        self.available = available
+        self.data = {}
+
+    def connect(self, db, retry_on=True):
+        if not self.available:
+            raise RuntimeError('redis is not available')
+
+    def get(self, db, hash_name, key):
+        return self.data.get((hash_name, key))
+
+    def set(self, db, hash_name, key, value):
+        self.data[(hash_name, key)] = value
+
+
+TEMPLATES = {
+    'ports.j2': '{% for port in ports %}{{ port }} {{ loop.index }}\n{% endfor %}',
+    'hostname.j2': 'hostname {{ hostname }}',
+}
+
+
+class TestBytecodeCache(TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.redis = FakeRedisClient()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def render(self, bcc, name='ports.j2'):
+        env = jinja2.Environment(loader=jinja2.DictLoader(TEMPLATES), bytecode_cache=bcc)
+        return env.get_template(name).render(ports=['Ethernet0', 'Ethernet4'], hostname='switch')
+
+    def tiered_cache(self, directory=None):
+        return TieredBytecodeCache(FileBytecodeCache(directory or self.cache_dir),
+                                   RedisBytecodeCache(self.redis))
+
+    def entries(self):
+        return sorted(name for name in os.listdir(self.cache_dir) if name.endswith(FileBytecodeCache.SUFFIX))
+
+    def test_file_cache_hit(self):
+        expected = self.render(None)
+        bcc = self.tiered_cache()
+        self.assertEqual(self.render(bcc), expected)
+        self.assertEqual(bcc.stats['misses'], 1)
+        self.assertEqual(len(self.entries()), 1)
+
+        bcc = self.tiered_cache()
+        self.assertEqual(self.render(bcc), expected)
+        self.assertEqual(bcc.stats['file_hits'], 1)
+        self.assertEqual(bcc.stats['misses'], 0)
+        self.assertGreater(bcc.stats['compile_time_saved'], 0)
+
+    def test_redis_unavailable(self):
+        self.redis.available = False
+        self.render(self.tiered_cache())
+        bcc = self.tiered_cache()
+        self.render(bcc)
+        self.assertEqual(bcc.stats['file_hits'], 1)
+
+    def test_redis_hit_fills_file_cache(self):
+        self.render(TieredBytecodeCache(FileBytecodeCache(os.path.join(self.cache_dir, 'missing')),
+                                        RedisBytecodeCache(self.redis)))
+        self.assertEqual(len(self.redis.data), 2)
+        self.assertEqual(self.entries(), [])
+
+        compile_time = float(self.redis.data[(RedisBytecodeCache.REDIS_COMPILE_TIME_HASH,
+                                              list(self.redis.data)[0][1])])
+        self.assertGreater(compile_time, 0)
+
+        bcc = self.tiered_cache()
+        self.render(bcc)
+        self.assertEqual(bcc.stats['redis_hits'], 1)
+        self.assertEqual(bcc.stats['compile_time_saved'], compile_time)
+        self.assertEqual(len(self.entries()), 1)
+
+        # the compile time is kept in the file cache entry copied from Redis
+        bcc = self.tiered_cache()
+        self.render(bcc)
+        self.assertEqual(bcc.stats['file_hits'], 1)
+        self.assertEqual(bcc.stats['compile_time_saved'], compile_time)
+
+    def test_corrupted_entry(self):
+        expected = self.render(self.tiered_cache())
+        entry_path = os.path.join(self.cache_dir, self.entries()[0])
+        with open(entry_path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(b'\x00' if last != b'\x00' else b'\x01')
+        self.redis.data.clear()
+
+        bcc = self.tiered_cache()
+        self.assertEqual(self.render(bcc), expected)
+        self.assertEqual(bcc.stats['file_hits'], 0)
+        self.assertEqual(bcc.stats['misses'], 1)
+
+    def test_size_bound(self):
+        self.render(self.tiered_cache(), 'ports.j2')
+        entry_size = os.path.getsize(os.path.join(self.cache_dir, self.entries()[0]))
+        os.utime(os.path.join(self.cache_dir, self.entries()[0]), (0, 0))
+        bcc = TieredBytecodeCache(FileBytecodeCache(self.cache_dir, max_size=entry_size),
+                                  RedisBytecodeCache(self.redis))
+        self.render(bcc, 'hostname.j2')
+        self.assertEqual(len(self.entries()), 1)
+        self.assertEqual(bcc.stats['misses'], 1)
+
+        bcc = self.tiered_cache()
+        self.render(bcc, 'hostname.j2')
+        self.assertEqual(bcc.stats['file_hits'], 1)
+
+    def test_cache_dir_missing(self):
+        bcc = FileBytecodeCache(os.path.join(self.cache_dir, 'missing'))
+        self.render(bcc)
+        self.render(bcc)
+        self.assertEqual(self.entries(), [])
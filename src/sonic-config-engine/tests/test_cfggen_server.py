@@ -0,0 +1,113 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+import tests.common_utils as utils
+
+from unittest import TestCase
+
+import cfggen_server
+import minigraph
+
+
+class TestCfggenServer(TestCase):
+
+    def setUp(self):
+        self.test_dir = os.path.dirname(os.path.realpath(__file__))
+        self.script_path = os.path.join(self.test_dir, '..', 'sonic-cfggen')
+        self.script_file = utils.PYTHON_INTERPRETTER + ' ' + self.script_path
+        self.client_file = utils.PYTHON_INTERPRETTER + ' ' + os.path.join(self.test_dir, '..', 'sonic-cfggen-client')
+        self.sample_graph = os.path.join(self.test_dir, 'simple-sample-graph.xml')
+        self.port_config = os.path.join(self.test_dir, 't0-sample-port-config.ini')
+        self.ports_template = os.path.join(self.test_dir, '..', '..', '..', 'dockers', 'docker-orchagent', 'ports.json.j2')
+        self.socket_path = os.path.join(tempfile.mkdtemp(), 'sonic-cfggen.sock')
+        self.parse_cache_dir = tempfile.mkdtemp()
+        os.environ[minigraph.PARSE_CACHE_DIR_ENV] = self.parse_cache_dir
+        self.render_server = cfggen_server.CfggenServer(self.script_path)
+        self.server = cfggen_server.CfggenUnixServer(self.socket_path, self.render_server)
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.server_thread.join()
+        os.rmdir(os.path.dirname(self.socket_path))
+        del os.environ[minigraph.PARSE_CACHE_DIR_ENV]
+        shutil.rmtree(self.parse_cache_dir)
+        minigraph._memory_parse_cache = None
+
+    def run_script(self, argument):
+        output = subprocess.check_output(self.script_file + ' ' + argument, shell=True)
+        if utils.PY3x:
+            output = output.decode()
+        return output
+
+    def run_client(self, argument):
+        env = dict(os.environ)
+        env[cfggen_server.SOCKET_PATH_ENV] = self.socket_path
+        p = subprocess.Popen(self.client_file + ' ' + argument, shell=True, env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        output, _ = p.communicate()
+        if utils.PY3x:
+            output = output.decode()
+        return p.returncode, output
+
+    def test_render_template(self):
+        argument = '-m "{}" -p "{}" -t "{}"'.format(self.sample_graph, self.port_config, self.ports_template)
+        expected = self.run_script(argument)
+        for _ in range(3):
+            returncode, output = self.run_client(argument)
+            self.assertEqual(returncode, 0)
+            self.assertEqual(output, expected)
+        self.assertEqual(self.render_server.counters['requests'], 3)
+        # the minigraph is parsed once, then served from the parse cache
+        self.assertEqual(len(os.listdir(self.parse_cache_dir)), 1)
+        self.assertEqual(self.render_server.counters['jinja2_env_misses'], 1)
+        self.assertEqual(self.render_server.counters['jinja2_env_hits'], 2)
+
+    def test_parsed_minigraph_in_memory(self):
+        sample_graph = os.path.join(self.parse_cache_dir, 'minigraph.xml')
+        shutil.copy(self.sample_graph, sample_graph)
+        argument = '-m "{}" -p "{}" -t "{}"'.format(sample_graph, self.port_config, self.ports_template)
+        expected = self.run_script(argument)
+        self.assertEqual(self.run_client(argument), (0, expected))
+        cache_entries = [name for name in os.listdir(self.parse_cache_dir) if name.endswith('.cache')]
+        self.assertEqual(len(cache_entries), 1)
+        # the parsed minigraph is reused from memory, the cache directory isn't read
+        os.remove(os.path.join(self.parse_cache_dir, cache_entries[0]))
+        self.assertEqual(self.run_client(argument), (0, expected))
+        self.assertFalse([name for name in os.listdir(self.parse_cache_dir) if name.endswith('.cache')])
+        # the minigraph is parsed again once its mtime changes
+        os.utime(sample_graph, (0, 0))
+        self.assertEqual(self.run_client(argument), (0, expected))
+        self.assertEqual(len([name for name in os.listdir(self.parse_cache_dir) if name.endswith('.cache')]), 1)
+
+    def test_var(self):
+        argument = '-m "{}" -v "DEVICE_METADATA[\'localhost\'][\'hwsku\']"'.format(self.sample_graph)
+        returncode, output = self.run_client(argument)
+        self.assertEqual(returncode, 0)
+        self.assertEqual(output, self.run_script(argument))
+
+    def test_relative_path(self):
+        cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        try:
+            response = cfggen_server.render(['-m', 'simple-sample-graph.xml', '-v', "DEVICE_METADATA['localhost']['hostname']"],
+                                            socket_path=self.socket_path)
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(response['returncode'], 0)
+        self.assertEqual(response['stdout'].strip(), 'switch-t0')
+
+    def test_invalid_argument(self):
+        response = cfggen_server.render(['--no-such-option'], socket_path=self.socket_path)
+        self.assertEqual(response['returncode'], 2)
+        self.assertIn('unrecognized arguments', response['stderr'])
+        self.assertEqual(response['stdout'], '')
+
+    def test_server_not_running(self):
+        socket_path = self.socket_path + '.missing'
+        self.assertRaises(EnvironmentError, cfggen_server.render, ['-v', 'x'], socket_path=socket_path)
@@ -0,0 +1,118 @@
+import copy
+
+from unittest import TestCase
+
+import config_db_delta
+
+
+class FakeConfigDB(object):
+    """ ConfigDBConnector get_config/mod_config semantics on a dict """
+
+    def __init__(self, data):
+        self.data = copy.deepcopy(data)
+        self.mod_config_calls = []
+
+    def get_config(self):
+        return copy.deepcopy(self.data)
+
+    def mod_config(self, data):
+        self.mod_config_calls.append(copy.deepcopy(data))
+        for table_name, table in data.items():
+            if table is None:
+                self.data.pop(table_name, None)
+                continue
+            for key, entry in table.items():
+                if entry is None:
+                    self.data.get(table_name, {}).pop(key, None)
+                    continue
+                current = self.data.setdefault(table_name, {}).setdefault(key, {})
+                for field, value in entry.items():
+                    current[field] = ','.join(value).split(',') if type(value) is list else str(value)
+
+
+CURRENT = {
+    'DEVICE_METADATA': {
+        'localhost': {'hostname': 'switch-t0', 'hwsku': 'Force10-S6000', 'bgp_asn': '65100'},
+    },
+    'PORT': {
+        'Ethernet0': {'alias': 'fortyGigE0/0', 'lanes': '29,30,31,32', 'mtu': '9100'},
+        'Ethernet4': {'alias': 'fortyGigE0/4', 'lanes': '25,26,27,28', 'mtu': '9100'},
+    },
+    'VLAN_MEMBER': {
+        ('Vlan1000', 'Ethernet4'): {'tagging_mode': 'untagged'},
+    },
+    'NTP_SERVER': {
+        '10.0.0.1': {},
+    },
+    'ACL_TABLE': {
+        'DATAACL': {'policy_desc': 'DATAACL', 'ports': ['Ethernet0', 'Ethernet4'], 'type': 'L3'},
+    },
+}
+
+
+class TestConfigDBDelta(TestCase):
+
+    def test_no_change(self):
+        delta, stats = config_db_delta.get_delta(CURRENT, copy.deepcopy(CURRENT))
+        self.assertEqual(delta, {})
+        self.assertEqual(stats['keys_unchanged'], 6)
+        self.assertEqual(stats['fields_unchanged'], 13)
+        self.assertEqual(stats['fields_written'], 0)
+
+    def test_changed_fields_only(self):
+        generated = copy.deepcopy(CURRENT)
+        generated['PORT']['Ethernet0']['mtu'] = 1500
+        generated['ACL_TABLE']['DATAACL']['ports'] = ['Ethernet0']
+        generated['PORT']['Ethernet8'] = {'alias': 'fortyGigE0/8', 'lanes': '37,38,39,40'}
+        generated['VLAN_MEMBER'] = {'Vlan1000|Ethernet4': {'tagging_mode': 'untagged'}}
+        generated['NTP_SERVER']['10.0.0.1'] = None
+        delta, stats = config_db_delta.get_delta(CURRENT, generated)
+        self.assertEqual(delta, {
+            'PORT': {
+                'Ethernet0': {'mtu': 1500},
+                'Ethernet8': {'alias': 'fortyGigE0/8', 'lanes': '37,38,39,40'},
+            },
+            'ACL_TABLE': {'DATAACL': {'ports': ['Ethernet0']}},
+            'NTP_SERVER': {'10.0.0.1': None},
+        })
+        self.assertEqual(stats['keys_added'], 1)
+        self.assertEqual(stats['keys_modified'], 2)
+        self.assertEqual(stats['keys_deleted'], 1)
+        self.assertEqual(stats['keys_unchanged'], 3)
+        self.assertEqual(stats['fields_written'], 4)
+
+    def test_table_deleted(self):
+        delta, stats = config_db_delta.get_delta(CURRENT, {'NTP_SERVER': None, 'SYSLOG_SERVER': None})
+        self.assertEqual(delta, {'NTP_SERVER': None})
+        self.assertEqual(stats['tables_deleted'], 1)
+
+    def test_write_incremental_same_result(self):
+        generated = copy.deepcopy(CURRENT)
+        generated['PORT']['Ethernet0']['mtu'] = '1500'
+        generated['PORT']['Ethernet8'] = {'alias': 'fortyGigE0/8', 'lanes': '37,38,39,40'}
+        generated['LOOPBACK_INTERFACE'] = {'Loopback0': {}}
+
+        full = FakeConfigDB(CURRENT)
+        full.mod_config(generated)
+        configdb = FakeConfigDB(CURRENT)
+        delta, _ = config_db_delta.write_incremental(configdb, generated)
+        self.assertEqual(configdb.data, full.data)
+        self.assertEqual(configdb.mod_config_calls, [delta])
+
+    def test_dry_run(self):
+        generated = copy.deepcopy(CURRENT)
+        generated['PORT']['Ethernet0']['mtu'] = '1500'
+        configdb = FakeConfigDB(CURRENT)
+        delta, stats = config_db_delta.write_incremental(configdb, generated, dry_run=True)
+        self.assertEqual(delta, {'PORT': {'Ethernet0': {'mtu': '1500'}}})
+        self.assertEqual(stats['keys_modified'], 1)
+        self.assertEqual(configdb.mod_config_calls, [])
+        self.assertEqual(configdb.data, CURRENT)
+
+    def test_write_batches(self):
+        generated = {'PORT': dict(('Ethernet%d' % (i * 4), {'mtu': '9100'}) for i in range(10))}
+        configdb = FakeConfigDB({})
+        delta, _ = config_db_delta.get_delta({}, generated)
+        config_db_delta.apply_delta(configdb, delta, batch_size=4)
+        self.assertEqual([len(call['PORT']) for call in configdb.mod_config_calls], [4, 4, 2])
+        self.assertEqual(configdb.data, generated)
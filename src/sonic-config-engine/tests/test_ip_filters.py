@@ -0,0 +1,66 @@
+import netaddr
+
+from unittest import TestCase
+
+import ip_filters
+
+
+VALUES = [
+    '10.0.0.1', '10.0.0.1/24', '10.0.0.0/8', '192.168.0.1/255.255.255.0', '10.1', '10.1.0.32/32', '10.0.0.1/31',
+    'fc00::1', 'fc00::1/64', 'fe80::1%eth0', '::ffff:10.0.0.1', 'fc00:1::32/128',
+    'Ethernet0', '10.0.0.256', 'fc00:::1', '', None, 0, 'None',
+]
+
+
+def netaddr_network(value):
+    try:
+        return netaddr.IPNetwork(str(value))
+    except Exception:
+        return None
+
+
+class TestIpFilters(TestCase):
+
+    def setUp(self):
+        ip_filters.clear_cache()
+
+    def test_ip_version(self):
+        for _ in range(2):
+            for value in VALUES:
+                network = netaddr_network(value) if value else None
+                self.assertEqual(ip_filters.is_ipv4(value), network is not None and network.version == 4, value)
+                self.assertEqual(ip_filters.is_ipv6(value), network is not None and network.version == 6, value)
+        self.assertTrue(ip_filters.is_ipv4(netaddr.IPNetwork('10.0.0.1/24')))
+        self.assertTrue(ip_filters.is_ipv6(netaddr.IPNetwork('fc00::1/64')))
+
+    def test_prefix_attr(self):
+        for _ in range(2):
+            for value in VALUES:
+                network = netaddr_network(value) if value else None
+                for attr in ['ip', 'network', 'prefixlen', 'netmask', 'broadcast']:
+                    expected = str(getattr(network, attr)) if network is not None else None
+                    self.assertEqual(ip_filters.prefix_attr(attr, value), expected, (attr, value))
+
+    def test_ip_network(self):
+        self.assertEqual(str(ip_filters.ip_network('10.1.2.3/16')), '10.1.0.0')
+        self.assertEqual(str(ip_filters.ip_network('fc00:1::32/64')), 'fc00:1::')
+        self.assertEqual(ip_filters.ip_network('Ethernet0'), 'Invalid ip address Ethernet0')
+
+    def test_cache_hits(self):
+        ip_filters.prefix_attr('ip', '10.0.0.1/24')
+        ip_filters.prefix_attr('prefixlen', '10.0.0.1/24')
+        ip_filters.ip_network('10.0.0.1/24')
+        info = ip_filters.cache_info()['networks']
+        self.assertEqual(info['misses'], 1)
+        self.assertEqual(info['hits'], 2)
+
+    def test_lru_cache(self):
+        cache = ip_filters.LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
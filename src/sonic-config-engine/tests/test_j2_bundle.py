@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+
+import jinja2
+
+from unittest import TestCase
+
+import cfggen_server
+import ip_filters
+import j2_bundle
+
+
+class TestTemplateBundle(TestCase):
+
+    def setUp(self):
+        self.test_dir = os.path.dirname(os.path.realpath(__file__))
+        self.work_dir = tempfile.mkdtemp()
+        self.template_dir = os.path.join(self.work_dir, 'templates')
+        self.bundle_dir = os.path.join(self.work_dir, 'bundle')
+        shutil.copytree(os.path.join(self.test_dir, '..', '..', '..', 'dockers', 'docker-fpm-frr', 'frr'),
+                        self.template_dir)
+        self.cfggen = cfggen_server.load_cfggen(os.path.join(self.test_dir, '..', 'sonic-cfggen'))
+        self.data = {
+            'DEVICE_METADATA': {'localhost': {'hostname': 'switch-t0', 'bgp_asn': '65100'}},
+            'LOOPBACK_INTERFACE': {('Loopback0', '10.1.0.32/32'): {}, ('Loopback0', 'fc00:1::32/128'): {}},
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def render(self, bundle_dir):
+        os.environ[j2_bundle.BUNDLE_DIR_ENV] = bundle_dir
+        try:
+            env = self.cfggen._get_jinja2_env([self.template_dir, os.path.join(self.template_dir, 'zebra')])
+        finally:
+            del os.environ[j2_bundle.BUNDLE_DIR_ENV]
+        return env.get_template('zebra.conf.j2').render(self.data), env.loader
+
+    def test_compile_and_render(self):
+        count = j2_bundle.compile_bundle([self.template_dir], self.bundle_dir)
+        self.assertGreater(count, 0)
+        expected, loader = self.render('')
+        self.assertIsNone(loader.bundle_dir)
+        output, loader = self.render(self.bundle_dir)
+        self.assertEqual(output, expected)
+        self.assertGreater(loader.hits, 0)
+        self.assertEqual(loader.misses, 0)
+
+    def test_modified_template(self):
+        j2_bundle.compile_bundle([self.template_dir], self.bundle_dir)
+        with open(os.path.join(self.template_dir, 'zebra', 'zebra.conf.j2'), 'a') as f:
+            f.write('! modified after the bundle was built\n')
+        output, loader = self.render(self.bundle_dir)
+        self.assertIn('! modified after the bundle was built', output)
+        self.assertEqual(loader.misses, 1)
+        self.assertGreater(loader.hits, 0)
+
+    def test_environment_mismatch(self):
+        j2_bundle.compile_bundle([self.template_dir], self.bundle_dir)
+        env = jinja2.Environment(loader=j2_bundle.BundleLoader(jinja2.FileSystemLoader(self.template_dir),
+                                                                self.bundle_dir),
+                                 lstrip_blocks=True)
+        env.get_template('common/daemons.common.conf.j2')
+        self.assertEqual(env.loader.hits, 0)
+        self.assertEqual(env.loader.misses, 1)
+
+    def test_cfggen_environment(self):
+        # The bundle has to be compiled with the same filters sonic-cfggen uses
+        env = self.cfggen._get_jinja2_env(['/'])
+        custom_filters = set(env.filters) - set(jinja2.Environment().filters)
+        self.assertEqual(custom_filters, set(j2_bundle.BUNDLE_ENVIRONMENTS[0][1]))
+
+    def test_bundle_template_uptodate(self):
+        # A template loaded from the bundle is reloaded when its source changes
+        j2_bundle.compile_bundle([self.template_dir], self.bundle_dir)
+        env = jinja2.Environment(loader=j2_bundle.BundleLoader(jinja2.FileSystemLoader(self.template_dir),
+                                                                self.bundle_dir),
+                                 **ip_filters.BGPCFGD_ENV_OPTIONS)
+        ip_filters.set_filters(env, ip_filters.BGPCFGD_FILTERS, {'pfx_filter': lambda value: value})
+        template = env.get_template('common/daemons.common.conf.j2')
+        self.assertEqual(env.loader.hits, 1)
+        self.assertTrue(template.is_up_to_date)
+        path = os.path.join(self.template_dir, 'common', 'daemons.common.conf.j2')
+        with open(path, 'a') as f:
+            f.write('! modified after the template was loaded\n')
+        os.utime(path, (0, 0))
+        self.assertFalse(template.is_up_to_date)
@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+
+import minigraph
+
+from unittest import TestCase
+
+
+class TestMinigraphParseCache(TestCase):
+
+    def setUp(self):
+        self.test_dir = os.path.dirname(os.path.realpath(__file__))
+        self.work_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.work_dir, 'cache')
+        os.mkdir(self.cache_dir)
+        self.sample_graph = os.path.join(self.work_dir, 'minigraph.xml')
+        self.port_config = os.path.join(self.work_dir, 'port_config.ini')
+        shutil.copy(os.path.join(self.test_dir, 'simple-sample-graph-case.xml'), self.sample_graph)
+        shutil.copy(os.path.join(self.test_dir, 't0-sample-port-config.ini'), self.port_config)
+        os.environ[minigraph.PARSE_CACHE_DIR_ENV] = self.cache_dir
+        self.parse_count = 0
+        self.orig_parse_xml = minigraph._parse_xml
+        minigraph._parse_xml = self.counting_parse_xml
+
+    def tearDown(self):
+        minigraph._parse_xml = self.orig_parse_xml
+        del os.environ[minigraph.PARSE_CACHE_DIR_ENV]
+        shutil.rmtree(self.work_dir)
+
+    def counting_parse_xml(self, *args):
+        self.parse_count += 1
+        return self.orig_parse_xml(*args)
+
+    def parse(self):
+        return minigraph.parse_xml(self.sample_graph, port_config_file=self.port_config)
+
+    def cache_entries(self):
+        return [name for name in os.listdir(self.cache_dir) if name.endswith('.cache')]
+
+    def test_cache_hit(self):
+        result = self.parse()
+        self.assertEqual(self.parse_count, 1)
+        self.assertEqual(len(self.cache_entries()), 1)
+        self.assertEqual(self.parse(), result)
+        self.assertEqual(self.parse_count, 1)
+
+    def test_cache_disabled(self):
+        shutil.rmtree(self.cache_dir)
+        result = self.parse()
+        self.assertEqual(self.parse(), result)
+        self.assertEqual(self.parse_count, 2)
+
+    def test_minigraph_changed(self):
+        result = self.parse()
+        with open(self.sample_graph) as f:
+            content = f.read()
+        with open(self.sample_graph, 'w') as f:
+            f.write(content.replace('<Hostname>switch-t0</Hostname>', '<Hostname>switch-t1</Hostname>'))
+        new_result = self.parse()
+        self.assertEqual(self.parse_count, 2)
+        self.assertEqual(new_result['DEVICE_METADATA']['localhost']['hostname'], 'switch-t1')
+        self.assertNotEqual(new_result, result)
+        self.assertEqual(len(self.cache_entries()), 1)
+
+    def test_minigraph_touched(self):
+        result = self.parse()
+        os.utime(self.sample_graph, (0, 0))
+        self.assertEqual(self.parse(), result)
+        self.assertEqual(self.parse_count, 1)
+
+    def test_port_config_changed(self):
+        result = self.parse()
+        with open(self.port_config) as f:
+            lines = f.readlines()
+        with open(self.port_config, 'w') as f:
+            f.writelines(lines[:-1])
+        new_result = self.parse()
+        self.assertEqual(self.parse_count, 2)
+        self.assertEqual(len(new_result['PORT']), len(result['PORT']) - 1)
+        self.assertEqual(len(self.cache_entries()), 1)
+
+    def test_corrupted_entry(self):
+        result = self.parse()
+        with open(os.path.join(self.cache_dir, self.cache_entries()[0]), 'wb') as f:
+            f.write(b'garbage')
+        self.assertEqual(self.parse(), result)
+        self.assertEqual(self.parse_count, 2)
+
+    def test_eviction(self):
+        orig_max_entries = minigraph.PARSE_CACHE_MAX_ENTRIES
+        minigraph.PARSE_CACHE_MAX_ENTRIES = 2
+        try:
+            for asic_name in ['asic0', 'asic1', 'asic2']:
+                minigraph.parse_asic_sub_role(self.sample_graph, asic_name)
+            self.assertEqual(len(self.cache_entries()), 2)
+        finally:
+            minigraph.PARSE_CACHE_MAX_ENTRIES = orig_max_entries
+
+    def test_memory_cache(self):
+        minigraph.enable_memory_parse_cache()
+        try:
+            result = self.parse()
+            alias_map = dict(minigraph.port_alias_map)
+            shutil.rmtree(self.cache_dir)
+            minigraph.port_alias_map.clear()
+            self.assertEqual(self.parse(), result)
+            self.assertEqual(self.parse_count, 1)
+            # the port alias maps are replayed
+            self.assertEqual(minigraph.port_alias_map, alias_map)
+            # the entry is dropped once the mtime of the minigraph changes
+            os.utime(self.sample_graph, (0, 0))
+            self.assertEqual(self.parse(), result)
+            self.assertEqual(self.parse_count, 2)
+        finally:
+            minigraph._memory_parse_cache = None
@@ -0,0 +1,56 @@
+import os
+
+import minigraph
+
+from unittest import TestCase
+
+
+class TestMinigraphStreaming(TestCase):
+
+    def setUp(self):
+        self.test_dir = os.path.dirname(os.path.realpath(__file__))
+        # Keep the parse cache out of the comparison
+        os.environ[minigraph.PARSE_CACHE_DIR_ENV] = ''
+        t0_port_config = 't0-sample-port-config.ini'
+        self.cases = [
+            ('fg-ecmp-sample-minigraph.xml', 'mellanox-sample-port-config.ini', None),
+            ('pc-test-graph.xml', t0_port_config, None),
+            ('sample-arista-7050-t0-minigraph.xml', t0_port_config, None),
+            ('sample-dell-6100-t0-minigraph.xml', t0_port_config, None),
+            ('sample_graph.xml', t0_port_config, None),
+            ('simple-sample-graph-case.xml', t0_port_config, None),
+            ('simple-sample-graph-metadata.xml', t0_port_config, None),
+            ('simple-sample-graph.xml', t0_port_config, None),
+            ('t0-sample-bgp-speaker.xml', t0_port_config, None),
+            ('t0-sample-graph-mvrf.xml', t0_port_config, None),
+            ('t0-sample-graph.xml', t0_port_config, None),
+            ('t1-sample-graph-mlnx.xml', t0_port_config, None),
+            ('t2-chassis-fe-graph-pc.xml', 't2-chassis-fe-port-config.ini', None),
+            ('t2-chassis-fe-graph-vni.xml', 't2-chassis-fe-port-config.ini', None),
+            ('t2-chassis-fe-graph.xml', 't2-chassis-fe-port-config.ini', None),
+        ]
+        for asic_id in range(4):
+            self.cases.append((os.path.join('multi_npu_data', 'sample-minigraph.xml'),
+                               os.path.join('multi_npu_data', 'sample_port_config-{}.ini'.format(asic_id)),
+                               'asic{}'.format(asic_id)))
+
+    def tearDown(self):
+        del os.environ[minigraph.PARSE_CACHE_DIR_ENV]
+
+    def parse(self, graph, port_config, asic_name, streaming):
+        return minigraph.parse_xml(os.path.join(self.test_dir, graph),
+                                   port_config_file=os.path.join(self.test_dir, port_config),
+                                   asic_name=asic_name, streaming=streaming)
+
+    def test_same_results(self):
+        for (graph, port_config, asic_name) in self.cases:
+            # repr() also compares the order of the entries
+            expected = repr(self.parse(graph, port_config, asic_name, False))
+            self.assertEqual(repr(self.parse(graph, port_config, asic_name, True)), expected,
+                             'Streaming parse of {} asic {} differs'.format(graph, asic_name))
+
+    def test_iter_sections(self):
+        graph = os.path.join(self.test_dir, 'simple-sample-graph-case.xml')
+        sections = [minigraph.QName(section.tag).localname for section in minigraph.iter_minigraph_sections(graph)]
+        self.assertEqual(sections, ['CpgDec', 'DpgDec', 'PngDec', 'LinkMetadataDeclaration',
+                                    'MetadataDeclaration', 'DeviceInfos', 'Hostname', 'HwSku'])
@@ -8,7 +8,7 @@ import yaml
 
 import tests.common_utils as utils
 
-from unittest import TestCase
+from unittest import TestCase, mock
 
 
 SKU = 'multi-npu-01'
@@ -375,3 +375,25 @@ class TestMultiNpuCfgGen(TestCase):
     
     def test_bgpd_frr_backendasic(self):
         self.assertTrue(*self.run_frr_asic_case('bgpd/bgpd.conf.j2', 'bgpd_frr_backend_asic.conf', "asic3", self.port_config[3]))
+
+    def test_namespaces_batch(self):
+        template = os.path.join(self.test_dir, '..', '..', '..', 'dockers', 'docker-orchagent', 'ports.json.j2')
+        argument = "-m {} -t {} --print-data".format(self.sample_graph, template)
+        expected = ''
+        for asic in range(NUM_ASIC):
+            expected += self.run_script_for_asic(argument, asic, self.port_config[asic])
+        port_config = os.path.join(self.test_data_dir, "sample_port_config-{asic_id}.ini")
+        namespaces = ','.join('asic{}'.format(asic) for asic in range(NUM_ASIC))
+        for jobs in [1, 2]:
+            output = self.run_script("{} -p {} --namespaces {} --jobs {}".format(argument, port_config, namespaces, jobs))
+            self.assertEqual(output, expected)
+
+    def test_namespaces_ignore_namespace_id(self):
+        argument = "-m {} --namespaces asic0,asic1 -v \"DEVICE_METADATA['localhost'].get('namespace_id')\"".format(self.sample_graph)
+        with mock.patch.dict(os.environ, {'NAMESPACE_ID': '5'}):
+            output = self.run_script(argument)
+        self.assertEqual(output.split(), ['None', 'None'])
+
+    def test_namespaces_with_namespace(self):
+        argument = "-m {} -n asic0 --namespaces asic0,asic1 -v DEVICE_METADATA 2>&1 || true".format(self.sample_graph)
+        self.assertIn('not allowed with argument -n/--namespace', self.run_script(argument))
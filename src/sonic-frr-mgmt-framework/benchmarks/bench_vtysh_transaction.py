@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Compare running the vtysh commands of an initial config load of 1000 BGP
+neighbors and 500 route-map entries through BgpdClientMgr one by one and in
+one transaction. The FRR daemon is replaced with a thread answering each vty
+command after a fixed processing delay.
+
+Usage: python3 benchmarks/bench_vtysh_transaction.py [-n NEIGHBORS] [-m ROUTE_MAP_ENTRIES] [-d DELAY_US]
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+
+FRRCFGD_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, FRRCFGD_DIR)
+
+from frrcfgd.frrcfgd import BgpdClientMgr
+
+
+class FakeVtyDaemon(threading.Thread):
+    def __init__(self, sock, delay):
+        super(FakeVtyDaemon, self).__init__()
+        self.daemon = True
+        self.sock = sock
+        self.delay = delay
+        self.commands = 0
+
+    def run(self):
+        buf = b''
+        while True:
+            data = self.sock.recv(65536)
+            if not data:
+                break
+            buf += data
+            while b'\0' in buf:
+                _, buf = buf.split(b'\0', 1)
+                self.commands += 1
+                if self.delay:
+                    time.sleep(self.delay)
+                self.sock.sendall(b'\0\0\0\0')
+
+
+def vtysh(*cmds):
+    return 'vtysh ' + ' '.join("-c '%s'" % cmd for cmd in cmds)
+
+
+def make_commands(neighbors, route_map_entries):
+    """ Commands in the order frrcfgd issues them for BGP_NEIGHBOR, BGP_NEIGHBOR_AF and ROUTE_MAP tables """
+    commands = []
+    bgp = ['configure terminal', 'router bgp 65100 vrf default']
+    for i in range(neighbors):
+        nbr = '10.%d.%d.%d' % (i // 65536, i // 256 % 256, i % 256)
+        commands.append(('BGP_NEIGHBOR', vtysh(*(bgp + ['neighbor %s remote-as %d' % (nbr, 65200 + i % 100)]))))
+        commands.append(('BGP_NEIGHBOR', vtysh(*(bgp + ['neighbor %s description peer%d' % (nbr, i)]))))
+        commands.append(('BGP_NEIGHBOR', vtysh(*(bgp + ['neighbor %s timers 3 10' % nbr]))))
+        af = bgp + ['address-family ipv4 unicast']
+        commands.append(('BGP_NEIGHBOR_AF', vtysh(*(af + ['neighbor %s activate' % nbr]))))
+        commands.append(('BGP_NEIGHBOR_AF', vtysh(*(af + ['neighbor %s route-map RM_IN in' % nbr]))))
+        commands.append(('BGP_NEIGHBOR_AF', vtysh(*(af + ['neighbor %s route-map RM_OUT out' % nbr]))))
+    for i in range(route_map_entries):
+        rmap = ['configure terminal', 'route-map RM_%d permit %d' % (i // 10, (i % 10 + 1) * 10)]
+        commands.append(('ROUTE_MAP', vtysh(*(rmap + ['match ip address prefix-list PL_%d' % i]))))
+        commands.append(('ROUTE_MAP', vtysh(*(rmap + ['set local-preference %d' % (100 + i % 50)]))))
+    return commands
+
+
+def run(commands, transaction, delay):
+    socks = {}
+    fakes = []
+    for daemon in BgpdClientMgr.ALL_DAEMONS:
+        client_sock, daemon_sock = socket.socketpair()
+        socks[daemon] = client_sock
+        fake = FakeVtyDaemon(daemon_sock, delay)
+        fake.start()
+        fakes.append(fake)
+    client = BgpdClientMgr(socks)
+    start = time.time()
+    if transaction:
+        client.begin_transaction()
+    for table, command in commands:
+        if not client.run_vtysh_command(table, command, None):
+            print('Command failed: %s' % command, file=sys.stderr)
+            sys.exit(1)
+    if transaction:
+        client.end_transaction()
+    elapsed = time.time() - start
+    for sock in socks.values():
+        sock.close()
+    return elapsed, sum(fake.commands for fake in fakes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--neighbors', type=int, default=1000)
+    parser.add_argument('-m', '--route-map-entries', type=int, default=500)
+    parser.add_argument('-d', '--delay-us', type=int, default=20, help='daemon processing time per vty command')
+    args = parser.parse_args()
+
+    commands = make_commands(args.neighbors, args.route_map_entries)
+    print('{} neighbors, {} route-map entries, {} vtysh commands'.format(args.neighbors, args.route_map_entries, len(commands)))
+    print('{:<12} {:>10} {:>14}'.format('mode', 'time (s)', 'vty commands'))
+    results = {}
+    for mode in ['per-command', 'transaction']:
+        elapsed, vty_commands = run(commands, mode == 'transaction', args.delay_us / 1000000.0)
+        results[mode] = elapsed
+        print('{:<12} {:>10.3f} {:>14}'.format(mode, elapsed, vty_commands))
+    print('speedup x{:.2f}'.format(results['per-command'] / results['transaction']))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 
+import contextlib
 import copy
+import collections
 import subprocess
 import time
 import syslog
@@ -62,6 +64,20 @@ def g_run_command(table, command, use_bgpd_client, daemons, ignore_fail = False)
             return False
     return True
 
+@contextlib.contextmanager
+def g_transaction(idle_timeout = 0):
+    """Run vtysh commands issued inside the block in one config session per daemon.
+       The session is kept for idle_timeout seconds after the block, so commands of
+       the next transaction started in that window reuse it."""
+    if bgpd_client is None:
+        yield
+        return
+    bgpd_client.begin_transaction()
+    try:
+        yield
+    finally:
+        bgpd_client.end_transaction(idle_timeout)
+
 def extract_cmd_daemons(cmd_str):
     # daemon list could be given within brackets at head of input lines
     dm_mark = re.match(r'\[(?P<daemons>.+)\]', cmd_str)
@@ -133,6 +149,8 @@ class BgpdClientMgr(threading.Thread):
                         (r'clear ip sla($|\s+\S+)', ['iptrackd']),
                         (r'clear ip igmp($|\s+\S+)', ['pimd']),
                         (r'.*', ['bgpd'])]
+    # commands which move the vty into a deeper node, the leading ones of a command form its context
+    MODE_ENTER_CMD = re.compile(r'(configure |router |address-family |route-map |interface |vrf |vni |bfd$|peer |profile |ip sla |segment-routing|key chain |line )')
     @staticmethod
     def __create_proxy_socket():
         try:
@@ -212,14 +230,25 @@ class BgpdClientMgr(threading.Thread):
                 syslog.syslog(syslog.LOG_ERR, reply)
                 return False
         return True
-    def __init__(self):
+    def __init__(self, client_socks = None):
         super(BgpdClientMgr, self).__init__(name = 'VTYSH sub-process manager')
-        if not self.__create_frr_client():
-            syslog.syslog(syslog.LOG_ERR, 'failed to create socket to FRR daemon')
-            raise RuntimeError('connect to FRR daemon failed')
+        if client_socks is not None:
+            # connected daemon sockets are given, the proxy is not used
+            self.client_socks = client_socks
+            self.proxy_sock = None
+        else:
+            if not self.__create_frr_client():
+                syslog.syslog(syslog.LOG_ERR, 'failed to create socket to FRR daemon')
+                raise RuntimeError('connect to FRR daemon failed')
+            self.proxy_sock = self.__create_proxy_socket()
         self.proxy_running = True
         self.lock = threading.Lock()
-        self.proxy_sock = self.__create_proxy_socket()
+        # transaction state: nesting depth, daemon -> command lines entered in its config session
+        # (None if the node of the session is unknown) and timer closing idle sessions
+        self.trans_depth = 0
+        self.contexts = {}
+        self.idle_timer = None
+        self.counters = {'commands': 0, 'lines_sent': 0, 'lines_skipped': 0, 'retries': 0}
         self.cmd_to_daemon = []
         for pat, daemons in self.VTYSH_CMD_DAEMON:
             try:
@@ -272,6 +301,94 @@ class BgpdClientMgr(threading.Thread):
                 ret_val = True
             resp += reply
         return (ret_val, resp)
+    def __send_line(self, daemon, sock, line):
+        try:
+            self.__send_data(sock, line + '\0')
+        except socket.error as msg:
+            syslog.syslog(syslog.LOG_ERR, 'failed to send command to frr daemon %s: %s' % (daemon, msg))
+            return (False, None)
+        self.counters['lines_sent'] += 1
+        ret_code, reply = self.__get_reply(sock)
+        if ret_code is None:
+            syslog.syslog(syslog.LOG_ERR, 'failed to get reply from frr daemon %s' % daemon)
+        return (ret_code == 0, reply)
+    def __enter_context(self, table, daemon, sock, lines):
+        for line in lines:
+            succ, reply = self.__send_line(daemon, sock, line)
+            if not succ and line != 'end':
+                syslog.syslog(syslog.LOG_DEBUG, '[%s] command "%s" for table %s failed: %s' % (daemon, line, table, reply))
+                return False
+        return True
+    def __run_leaf_lines(self, table, daemon, sock, leaves):
+        failed = []
+        for line in leaves:
+            succ, reply = self.__send_line(daemon, sock, line)
+            if not succ:
+                syslog.syslog(syslog.LOG_DEBUG, '[%s] command "%s" for table %s failed: %s' % (daemon, line, table, reply))
+                failed.append(line)
+        return failed
+    def __is_node_change(self, line):
+        if line.startswith('exit'):
+            return True
+        if line.startswith('no '):
+            line = line[len('no '):]
+        return self.MODE_ENTER_CMD.match(line) is not None
+    def __run_in_session(self, table, daemon, context, leaves):
+        sock = self.client_socks.get(daemon, None)
+        if sock is None:
+            syslog.syslog(syslog.LOG_ERR, 'daemon %s is not connected' % daemon)
+            return None
+        cur_context = self.contexts.get(daemon, [])
+        if cur_context is not None and context[:len(cur_context)] == cur_context:
+            # the session is already in the context of the command or its parent node
+            self.counters['lines_skipped'] += len(cur_context)
+            succ = self.__enter_context(table, daemon, sock, context[len(cur_context):])
+            failed = self.__run_leaf_lines(table, daemon, sock, leaves) if succ else leaves
+            if (not succ or len(failed) > 0) and len(cur_context) > 0:
+                # the node of the session could differ from the expected one, enter the context
+                # from the top and run again only the lines that failed
+                self.counters['retries'] += 1
+                succ = self.__enter_context(table, daemon, sock, ['end'] + context)
+                if succ:
+                    failed = self.__run_leaf_lines(table, daemon, sock, failed)
+        else:
+            succ = self.__enter_context(table, daemon, sock, ['end'] + context)
+            failed = self.__run_leaf_lines(table, daemon, sock, leaves) if succ else None
+        if not succ:
+            self.contexts[daemon] = None
+            return None
+        self.contexts[daemon] = None if any(self.__is_node_change(line) for line in leaves) else context
+        return failed
+    def __end_session(self):
+        if self.idle_timer is not None:
+            self.idle_timer.cancel()
+            self.idle_timer = None
+        for daemon, context in self.contexts.items():
+            sock = self.client_socks.get(daemon, None)
+            if sock is not None and context != []:
+                self.__send_line(daemon, sock, 'end')
+        self.contexts.clear()
+    def __end_idle_session(self):
+        with self.lock:
+            if self.trans_depth == 0:
+                self.__end_session()
+    def begin_transaction(self):
+        with self.lock:
+            if self.idle_timer is not None:
+                self.idle_timer.cancel()
+                self.idle_timer = None
+            self.trans_depth += 1
+    def end_transaction(self, idle_timeout = 0):
+        with self.lock:
+            self.trans_depth -= 1
+            if self.trans_depth > 0:
+                return
+            if idle_timeout > 0 and len(self.contexts) > 0:
+                self.idle_timer = threading.Timer(idle_timeout, self.__end_idle_session)
+                self.idle_timer.daemon = True
+                self.idle_timer.start()
+            else:
+                self.__end_session()
     def run_vtysh_command(self, table, command, daemons):
         if not command.startswith(self.VTYSH_MARK):
             syslog.syslog(syslog.LOG_ERR, 'command %s is not for vtysh config' % command)
@@ -288,8 +405,32 @@ class BgpdClientMgr(threading.Thread):
             return False
         ret_val = True
         with self.lock:
+            self.counters['commands'] += 1
+            if self.trans_depth > 0 and len(cmd_list) > 1:
+                cmd_list = [cmd.strip() for cmd in cmd_list[:-1]]
+                ctx_len = 0
+                while ctx_len < len(cmd_list) and self.MODE_ENTER_CMD.match(cmd_list[ctx_len]) is not None:
+                    ctx_len += 1
+                context, leaves = cmd_list[:ctx_len], cmd_list[ctx_len:]
+                # the command is successful if all its lines are run successfully by at least one daemon
+                ret_val = False
+                failed_lines = set()
+                for daemon in daemons:
+                    # None if the daemon is not connected or the context of the command could not be entered
+                    failed = self.__run_in_session(table, daemon, context, leaves)
+                    if failed is None:
+                        continue
+                    if len(failed) == 0:
+                        ret_val = True
+                    failed_lines.update(failed)
+                if not ret_val:
+                    syslog.syslog(syslog.LOG_ERR, 'command "%s" for table %s failed in daemons %s, failed lines: %s' %
+                                  ('; '.join(cmd_list), table, daemons, [line for line in leaves if line in failed_lines]))
+                return ret_val
+            self.__end_session()
             for cmd in cmd_list:
                 succ, _ = self.__proc_command(cmd.strip(), daemons)
+                self.counters['lines_sent'] += len(daemons)
                 if not succ:
                     ret_val = False
         return ret_val
@@ -306,6 +447,9 @@ class BgpdClientMgr(threading.Thread):
         return in_buf.getvalue()
     def shutdown(self):
         syslog.syslog(syslog.LOG_DEBUG, 'terminate bgpd client manager')
+        with self.lock:
+            self.__end_session()
+        syslog.syslog(syslog.LOG_INFO, 'bgpd client counters: %s' % ', '.join('%s=%d' % item for item in sorted(self.counters.items())))
         if self.is_alive():
             self.proxy_running = False
             sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
@@ -337,6 +481,7 @@ class BgpdClientMgr(threading.Thread):
                             daemons = self.__get_cmd_daemons(in_lines)
                         if daemons is not None and len(daemons) > 0:
                             with self.lock:
+                                self.__end_session()
                                 for line in in_lines:
                                     _, reply = self.__proc_command(line.strip(), daemons)
                                     if reply is not None:
@@ -1442,9 +1587,24 @@ def hdl_static_route(daemon, cmd_str, op, st_idx, args, data):
     return cmd_list
 
 class ExtConfigDBConnector(ConfigDBConnector):
+    # config DB changes arriving within this time (in seconds) share the FRR config sessions
+    TRANSACTION_WINDOW = 0.1
+    # keyspace notifications arriving within this time (in seconds) after the first one are
+    # coalesced per key, the changed keys are read with one pipelined call. A key changed again
+    # after other keys starts a new batch, so the handlers see the changes in their order
+    COALESCE_WINDOW = 0.05
+    LISTEN_TIMEOUT = 1.0
     def __init__(self, ns_attrs = None):
         super(ExtConfigDBConnector, self).__init__()
         self.nosort_attrs = ns_attrs if ns_attrs is not None else {}
+        # redis key -> (table, row) of keys changed since the last dispatch, in order of the first change
+        self.dirty_keys = collections.OrderedDict()
+        # previous batches of changed keys, closed when one of their keys was changed again after other keys
+        self.dirty_batches = []
+        self.dirty_cond = threading.Condition()
+        self.dispatch_running = False
+        self.dispatch_thread = None
+        self.counters = {'notifications': 0, 'fetches': 0, 'keys_fetched': 0}
     def raw_to_typed(self, raw_data, table = ''):
         if len(raw_data) == 0:
             raw_data = None
@@ -1460,21 +1620,84 @@ class ExtConfigDBConnector(ConfigDBConnector):
             key = msg_item['channel'].split(':', 1)[1]
             try:
                 (table, row) = key.split(self.TABLE_NAME_SEPARATOR, 1)
-                if table in self.handlers:
-                    client = self.get_redis_client(self.db_name)
-                    data = self.raw_to_typed(client.hgetall(key), table)
-                    super(ExtConfigDBConnector, self)._ConfigDBConnector__fire(table, row, data)
             except ValueError:
-                pass    #Ignore non table-formated redis entries
-            except Exception as e:
-                syslog.syslog(syslog.LOG_ERR, '[bgp cfgd] Failed handling config DB update with exception:' + str(e))
-                logging.exception(e)
+                return    #Ignore non table-formated redis entries
+            if table in self.handlers:
+                with self.dirty_cond:
+                    self.counters['notifications'] += 1
+                    if key in self.dirty_keys and next(reversed(self.dirty_keys)) != key:
+                        self.dirty_batches.append(self.dirty_keys)
+                        self.dirty_keys = collections.OrderedDict()
+                    self.dirty_keys[key] = (table, row)
+                    self.dirty_cond.notify()
+    def dispatch_dirty_keys(self):
+        """Dispatch the batches of changed keys in order.
+        """
+        with self.dirty_cond:
+            batches = self.dirty_batches + [self.dirty_keys]
+            self.dirty_keys = collections.OrderedDict()
+            self.dirty_batches = []
+        for dirty_keys in batches:
+            self.dispatch_batch(dirty_keys)
+    def dispatch_batch(self, dirty_keys):
+        """Read all keys of a batch with one pipelined call and run the handlers once per key with its final value.
+        """
+        if len(dirty_keys) == 0:
+            return
+        try:
+            pipe = self.get_redis_client(self.db_name).pipeline(transaction = False)
+            for key in dirty_keys:
+                pipe.hgetall(key)
+            raw_data_list = pipe.execute()
+        except Exception as e:
+            syslog.syslog(syslog.LOG_ERR, '[bgp cfgd] Failed reading {} changed config DB keys: {}'.format(len(dirty_keys), str(e)))
+            logging.exception(e)
+            return
+        self.counters['fetches'] += 1
+        self.counters['keys_fetched'] += len(dirty_keys)
+        syslog.syslog(syslog.LOG_DEBUG, 'dispatch {} changed keys, counters: {}'.format(len(dirty_keys), self.counters))
+        with g_transaction(self.TRANSACTION_WINDOW):
+            for ((table, row), raw_data) in zip(dirty_keys.values(), raw_data_list):
+                try:
+                    data = self.raw_to_typed(raw_data, table)
+                    self._ConfigDBConnector__fire(table, row, data)
+                except Exception as e:
+                    syslog.syslog(syslog.LOG_ERR, '[bgp cfgd] Failed handling config DB update with exception:' + str(e))
+                    logging.exception(e)
+    def __dispatch_loop(self):
+        while True:
+            with self.dirty_cond:
+                while self.dispatch_running and len(self.dirty_keys) == 0:
+                    self.dirty_cond.wait()
+                if not self.dispatch_running:
+                    break
+            # collect the rest of the burst
+            time.sleep(self.COALESCE_WINDOW)
+            self.dispatch_dirty_keys()
     def listen(self):
         """Start listen Redis keyspace events and will trigger corresponding handlers when content of a table changes.
         """
         self.pubsub = self.get_redis_client(self.db_name).pubsub()
         self.pubsub.psubscribe(**{"__keyspace@{}__:*".format(self.get_dbid(self.db_name)): self.sub_msg_handler})
-        self.sub_thread = self.pubsub.run_in_thread(sleep_time = 0.01)
+        self.dispatch_running = True
+        self.dispatch_thread = threading.Thread(target = self.__dispatch_loop, name = 'config DB dispatcher')
+        self.dispatch_thread.daemon = True
+        self.dispatch_thread.start()
+        self.sub_thread = self.pubsub.run_in_thread(sleep_time = self.LISTEN_TIMEOUT)
+    def stop_dispatch(self):
+        with self.dirty_cond:
+            self.dispatch_running = False
+            self.dirty_cond.notify()
+        if self.dispatch_thread is not None:
+            self.dispatch_thread.join()
+            self.dispatch_thread = None
+        # apply the changes notified before the listener was stopped
+        if len(self.dirty_keys) > 0:
+            syslog.syslog(syslog.LOG_INFO, 'dispatch {} changed keys pending at stop'.format(
+                sum(len(batch) for batch in self.dirty_batches) + len(self.dirty_keys)))
+            self.dispatch_dirty_keys()
+        syslog.syslog(syslog.LOG_INFO, 'config DB listener counters: {}'.format(
+            ', '.join('%s=%d' % item for item in sorted(self.counters.items()))))
     @staticmethod
     def get_table_key(table, key):
         return table + '&&' + key
@@ -2233,19 +2456,23 @@ class BGPConfigDaemon:
         for key, entry in self.table_data_cache.items():
             syslog.syslog(syslog.LOG_DEBUG, '  %-20s : %s' % (key, entry))
         if self.config_mode == "unified":
-            for table, _ in self.table_handler_list:
-                table_list = self.config_db.get_table(table)
-                for key, data in table_list.items():
-                    syslog.syslog(syslog.LOG_DEBUG, 'config replay for table {} key {}'.format(table, key))
-                    upd_data = {}
-                    for upd_key, upd_val in data.items():
-                        upd_data[upd_key] = CachedDataWithOp(upd_val, CachedDataWithOp.OP_ADD)
-                    self.bgp_message.put((self.config_db.serialize_key(key), False, table, upd_data))
-                    upd_data_list = []
-                    self.__update_bgp(upd_data_list)
-                    for table1, key1, data1 in upd_data_list:
-                        table_key = ExtConfigDBConnector.get_table_key(table1, key1)
-                        self.__update_cache_data(table_key, data1)
+            with g_transaction():
+                self.__replay_config()
+
+    def __replay_config(self):
+        for table, _ in self.table_handler_list:
+            table_list = self.config_db.get_table(table)
+            for key, data in table_list.items():
+                syslog.syslog(syslog.LOG_DEBUG, 'config replay for table {} key {}'.format(table, key))
+                upd_data = {}
+                for upd_key, upd_val in data.items():
+                    upd_data[upd_key] = CachedDataWithOp(upd_val, CachedDataWithOp.OP_ADD)
+                self.bgp_message.put((self.config_db.serialize_key(key), False, table, upd_data))
+                upd_data_list = []
+                self.__update_bgp(upd_data_list)
+                for table1, key1, data1 in upd_data_list:
+                    table_key = ExtConfigDBConnector.get_table_key(table1, key1)
+                    self.__update_cache_data(table_key, data1)
 
     def subscribe_all(self):
         for table, hdlr in self.table_handler_list:
@@ -3768,6 +3995,7 @@ class BGPConfigDaemon:
         self.config_db.sub_thread.stop()
         if self.config_db.sub_thread.is_alive():
             self.config_db.sub_thread.join()
+        self.config_db.stop_dispatch()
 
 main_loop = True
 
@@ -0,0 +1,132 @@
+import socket
+import threading
+from unittest.mock import MagicMock, NonCallableMagicMock, patch
+
+swsssdk_module_mock = MagicMock(ConfigDBConnector = NonCallableMagicMock)
+
+with patch.dict('sys.modules', swsssdk = swsssdk_module_mock):
+    import frrcfgd.frrcfgd
+    from frrcfgd.frrcfgd import BgpdClientMgr, g_transaction
+
+class FakeVtyDaemon(threading.Thread):
+    """ Reply to NUL terminated vty commands, failing the commands listed in fail_cmds """
+    def __init__(self, sock, fail_cmds = ()):
+        super(FakeVtyDaemon, self).__init__()
+        self.daemon = True
+        self.sock = sock
+        self.fail_cmds = set(fail_cmds)
+        self.commands = []
+    def run(self):
+        buf = b''
+        while True:
+            data = self.sock.recv(4096)
+            if not data:
+                break
+            buf += data
+            while b'\0' in buf:
+                cmd, buf = buf.split(b'\0', 1)
+                cmd = cmd.decode()
+                self.commands.append(cmd)
+                self.sock.sendall(b'\0\0\0' + (b'\1' if cmd in self.fail_cmds else b'\0'))
+
+def make_client(daemons = ('bgpd',), fail_cmds = ()):
+    socks = {}
+    fakes = {}
+    for daemon in daemons:
+        client_sock, daemon_sock = socket.socketpair()
+        socks[daemon] = client_sock
+        fakes[daemon] = FakeVtyDaemon(daemon_sock, fail_cmds)
+        fakes[daemon].start()
+    return BgpdClientMgr(socks), fakes
+
+def vtysh(*cmds):
+    return 'vtysh ' + ' '.join("-c '%s'" % cmd for cmd in cmds)
+
+def test_run_without_transaction():
+    client, fakes = make_client()
+    assert client.run_vtysh_command('BGP_NEIGHBOR', vtysh('configure terminal', 'router bgp 100', 'neighbor 1.1.1.1 remote-as 200'), None)
+    assert client.run_vtysh_command('BGP_NEIGHBOR', vtysh('configure terminal', 'router bgp 100', 'neighbor 2.2.2.2 remote-as 200'), None)
+    assert fakes['bgpd'].commands == ['configure terminal', 'router bgp 100', 'neighbor 1.1.1.1 remote-as 200', 'end',
+                                      'configure terminal', 'router bgp 100', 'neighbor 2.2.2.2 remote-as 200', 'end']
+
+def test_transaction_reuses_context():
+    client, fakes = make_client()
+    client.begin_transaction()
+    assert client.run_vtysh_command('BGP_NEIGHBOR', vtysh('configure terminal', 'router bgp 100', 'neighbor 1.1.1.1 remote-as 200'), None)
+    assert client.run_vtysh_command('BGP_NEIGHBOR', vtysh('configure terminal', 'router bgp 100', 'neighbor 2.2.2.2 remote-as 200'), None)
+    assert client.run_vtysh_command('BGP_NEIGHBOR_AF', vtysh('configure terminal', 'router bgp 100', 'address-family ipv4 unicast',
+                                                             'neighbor 2.2.2.2 activate'), None)
+    assert client.run_vtysh_command('BGP_NEIGHBOR', vtysh('configure terminal', 'router bgp 100 vrf Vrf1', 'neighbor 3.3.3.3 remote-as 200'), None)
+    client.end_transaction()
+    assert fakes['bgpd'].commands == ['configure terminal', 'router bgp 100', 'neighbor 1.1.1.1 remote-as 200',
+                                      'neighbor 2.2.2.2 remote-as 200',
+                                      'address-family ipv4 unicast', 'neighbor 2.2.2.2 activate',
+                                      'end', 'configure terminal', 'router bgp 100 vrf Vrf1', 'neighbor 3.3.3.3 remote-as 200',
+                                      'end']
+    assert client.counters['lines_skipped'] == 4
+
+def test_transaction_mode_enter_command():
+    client, fakes = make_client()
+    client.begin_transaction()
+    assert client.run_vtysh_command('BGP_GLOBALS', vtysh('configure terminal', 'router bgp 100'), None)
+    assert client.run_vtysh_command('BGP_GLOBALS', vtysh('configure terminal', 'router bgp 100', 'bgp router-id 1.1.1.1'), None)
+    assert client.run_vtysh_command('BGP_GLOBALS', vtysh('configure terminal', 'router bgp 100', 'no router bgp 100'), None)
+    assert client.run_vtysh_command('BGP_GLOBALS', vtysh('configure terminal', 'router bgp 100', 'bgp router-id 2.2.2.2'), None)
+    client.end_transaction()
+    assert fakes['bgpd'].commands == ['configure terminal', 'router bgp 100', 'bgp router-id 1.1.1.1', 'no router bgp 100',
+                                      'end', 'configure terminal', 'router bgp 100', 'bgp router-id 2.2.2.2', 'end']
+
+def test_transaction_failure_retry():
+    client, fakes = make_client(fail_cmds = ['address-family ipv6 unicast'])
+    client.begin_transaction()
+    assert client.run_vtysh_command('BGP_NEIGHBOR', vtysh('configure terminal', 'router bgp 100', 'neighbor 1.1.1.1 remote-as 200'), None)
+    assert not client.run_vtysh_command('BGP_NEIGHBOR_AF', vtysh('configure terminal', 'router bgp 100', 'address-family ipv6 unicast',
+                                                                 'neighbor 1.1.1.1 activate'), None)
+    assert client.run_vtysh_command('BGP_NEIGHBOR', vtysh('configure terminal', 'router bgp 100', 'neighbor 2.2.2.2 remote-as 200'), None)
+    client.end_transaction()
+    assert client.counters['retries'] == 1
+    assert fakes['bgpd'].commands == ['configure terminal', 'router bgp 100', 'neighbor 1.1.1.1 remote-as 200',
+                                      'address-family ipv6 unicast',
+                                      'end', 'configure terminal', 'router bgp 100', 'address-family ipv6 unicast',
+                                      'end', 'configure terminal', 'router bgp 100', 'neighbor 2.2.2.2 remote-as 200', 'end']
+
+def test_transaction_failed_leaf():
+    client, fakes = make_client(fail_cmds = ['neighbor 1.1.1.1 shutdown', 'neighbor 2.2.2.2 shutdown'])
+    client.begin_transaction()
+    assert not client.run_vtysh_command('BGP_NEIGHBOR', vtysh('configure terminal', 'router bgp 100', 'neighbor 1.1.1.1 remote-as 200',
+                                                              'neighbor 1.1.1.1 shutdown', 'neighbor 1.1.1.1 description N1'), None)
+    # only the failed line is run again from the top in a reused context
+    assert not client.run_vtysh_command('BGP_NEIGHBOR', vtysh('configure terminal', 'router bgp 100', 'neighbor 2.2.2.2 remote-as 200',
+                                                              'neighbor 2.2.2.2 shutdown', 'neighbor 2.2.2.2 description N2'), None)
+    client.end_transaction()
+    assert client.counters['retries'] == 1
+    assert fakes['bgpd'].commands == ['configure terminal', 'router bgp 100', 'neighbor 1.1.1.1 remote-as 200',
+                                      'neighbor 1.1.1.1 shutdown', 'neighbor 1.1.1.1 description N1',
+                                      'neighbor 2.2.2.2 remote-as 200', 'neighbor 2.2.2.2 shutdown', 'neighbor 2.2.2.2 description N2',
+                                      'end', 'configure terminal', 'router bgp 100', 'neighbor 2.2.2.2 shutdown', 'end']
+
+def test_transaction_multiple_daemons():
+    client, fakes = make_client(('zebra', 'bgpd'))
+    client.begin_transaction()
+    for seq in [10, 20]:
+        assert client.run_vtysh_command('ROUTE_MAP', vtysh('configure terminal', 'route-map RM permit %d' % seq,
+                                                           'set metric %d' % seq), ['zebra', 'bgpd'])
+    client.end_transaction()
+    for fake in fakes.values():
+        assert fake.commands == ['configure terminal', 'route-map RM permit 10', 'set metric 10',
+                                 'end', 'configure terminal', 'route-map RM permit 20', 'set metric 20', 'end']
+
+def test_g_transaction_idle_window():
+    client, fakes = make_client()
+    with patch.object(frrcfgd.frrcfgd, 'bgpd_client', client):
+        with g_transaction(60):
+            assert client.run_vtysh_command('BGP_NEIGHBOR', vtysh('configure terminal', 'router bgp 100', 'neighbor 1.1.1.1 remote-as 200'), None)
+        with g_transaction(60):
+            assert client.run_vtysh_command('BGP_NEIGHBOR', vtysh('configure terminal', 'router bgp 100', 'neighbor 2.2.2.2 remote-as 200'), None)
+        assert client.idle_timer is not None
+        # a command outside of transactions closes the session
+        assert client.run_vtysh_command('BGP_NEIGHBOR', vtysh('configure terminal', 'router bgp 100', 'neighbor 3.3.3.3 remote-as 200'), None)
+    assert client.idle_timer is None
+    assert fakes['bgpd'].commands == ['configure terminal', 'router bgp 100', 'neighbor 1.1.1.1 remote-as 200',
+                                      'neighbor 2.2.2.2 remote-as 200', 'end',
+                                      'configure terminal', 'router bgp 100', 'neighbor 3.3.3.3 remote-as 200', 'end']
@@ -0,0 +1,91 @@
+from unittest.mock import MagicMock, NonCallableMagicMock, patch
+
+swsssdk_module_mock = MagicMock(ConfigDBConnector = NonCallableMagicMock)
+
+with patch.dict('sys.modules', swsssdk = swsssdk_module_mock):
+    from frrcfgd.frrcfgd import ExtConfigDBConnector
+
+def make_connector(db_data):
+    config_db = ExtConfigDBConnector()
+    config_db.TABLE_NAME_SEPARATOR = '|'
+    config_db.handlers = {'BGP_NEIGHBOR': MagicMock(), 'BGP_GLOBALS': MagicMock()}
+    config_db._ConfigDBConnector__fire = MagicMock()
+    pipe = MagicMock()
+    pipe.hgetall.side_effect = lambda key: pipe.keys.append(key)
+    pipe.keys = []
+    pipe.execute.side_effect = lambda: [db_data.get(key, {}) for key in pipe.keys]
+    config_db.get_redis_client = MagicMock(return_value = MagicMock(pipeline = MagicMock(return_value = pipe)))
+    return config_db, pipe
+
+def notify(config_db, key):
+    config_db.sub_msg_handler({'type': 'pmessage', 'channel': '__keyspace@4__:%s' % key})
+
+@patch.object(ExtConfigDBConnector, 'raw_to_typed', lambda self, raw_data, table = '': raw_data or None)
+def test_coalesce_notifications():
+    db_data = {
+        'BGP_GLOBALS|default': {'local_asn': '100'},
+        'BGP_NEIGHBOR|default|10.0.0.1': {'asn': '200', 'name': 'nbr1'},
+    }
+    config_db, pipe = make_connector(db_data)
+    notify(config_db, 'BGP_GLOBALS|default')
+    for _ in range(3):
+        notify(config_db, 'BGP_NEIGHBOR|default|10.0.0.1')
+    notify(config_db, 'BGP_NEIGHBOR|default|10.0.0.2')
+    notify(config_db, 'VLAN|Vlan100')
+    notify(config_db, 'NO_SEPARATOR')
+    config_db.sub_msg_handler({'type': 'psubscribe', 'channel': '__keyspace@4__:*'})
+    config_db.dispatch_dirty_keys()
+    assert pipe.execute.call_count == 1
+    assert [c[0] for c in config_db._ConfigDBConnector__fire.call_args_list] == [
+        ('BGP_GLOBALS', 'default', {'local_asn': '100'}),
+        ('BGP_NEIGHBOR', 'default|10.0.0.1', {'asn': '200', 'name': 'nbr1'}),
+        ('BGP_NEIGHBOR', 'default|10.0.0.2', None),
+    ]
+    assert config_db.counters == {'notifications': 5, 'fetches': 1, 'keys_fetched': 3}
+    # nothing changed, nothing is read
+    config_db.dispatch_dirty_keys()
+    assert pipe.execute.call_count == 1
+
+@patch.object(ExtConfigDBConnector, 'raw_to_typed', lambda self, raw_data, table = '': raw_data or None)
+def test_coalesce_keeps_order():
+    db_data = {
+        'BGP_GLOBALS|Vrf1': {'local_asn': '100'},
+        'BGP_NEIGHBOR|Vrf1|10.0.0.1': {'asn': '200'},
+    }
+    config_db, pipe = make_connector(db_data)
+    notify(config_db, 'BGP_NEIGHBOR|Vrf1|10.0.0.1')
+    notify(config_db, 'BGP_NEIGHBOR|Vrf1|10.0.0.1')
+    notify(config_db, 'BGP_GLOBALS|Vrf1')
+    # changed again after its parent: a new batch
+    notify(config_db, 'BGP_NEIGHBOR|Vrf1|10.0.0.1')
+    config_db.dispatch_dirty_keys()
+    assert [c[0][:2] for c in config_db._ConfigDBConnector__fire.call_args_list] == [
+        ('BGP_NEIGHBOR', 'Vrf1|10.0.0.1'),
+        ('BGP_GLOBALS', 'Vrf1'),
+        ('BGP_NEIGHBOR', 'Vrf1|10.0.0.1'),
+    ]
+    assert config_db.counters == {'notifications': 4, 'fetches': 2, 'keys_fetched': 3}
+
+@patch.object(ExtConfigDBConnector, 'raw_to_typed', lambda self, raw_data, table = '': raw_data or None)
+def test_handler_exception():
+    config_db, pipe = make_connector({'BGP_GLOBALS|default': {'local_asn': '100'}})
+    config_db._ConfigDBConnector__fire.side_effect = [Exception('failure'), None]
+    notify(config_db, 'BGP_NEIGHBOR|default|10.0.0.1')
+    notify(config_db, 'BGP_GLOBALS|default')
+    config_db.dispatch_dirty_keys()
+    assert config_db._ConfigDBConnector__fire.call_count == 2
+
+def test_dispatch_thread():
+    config_db, _ = make_connector({})
+    config_db.listen()
+    assert config_db.dispatch_thread.is_alive()
+    config_db.stop_dispatch()
+    assert config_db.dispatch_thread is None
+
+@patch.object(ExtConfigDBConnector, 'raw_to_typed', lambda self, raw_data, table = '': raw_data or None)
+def test_stop_dispatch_pending_keys():
+    config_db, pipe = make_connector({'BGP_GLOBALS|default': {'local_asn': '100'}})
+    notify(config_db, 'BGP_GLOBALS|default')
+    config_db.stop_dispatch()
+    config_db._ConfigDBConnector__fire.assert_called_once_with('BGP_GLOBALS', 'default', {'local_asn': '100'})
+    assert len(config_db.dirty_keys) == 0
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Compare the time caclmgrd takes to apply control plane ACLs of 10, 1k and 10k
+rules by running iptables commands one by one and with iptables-restore, and
+to skip an update which doesn't change the rules.
+
+By default iptables binaries are replaced by shell scripts which only store
+the restored rules, so the fork/exec cost is measured. With --netns, the real
+binaries are run in a network namespace created for the benchmark.
+
+Usage: python3 benchmarks/bench_caclmgrd_iptables.py [-r RULES [RULES ...]] [--netns NAME]
+"""
+
+import argparse
+import importlib.machinery
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from unittest import mock
+
+HOST_SERVICES_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, HOST_SERVICES_DIR)
+
+loader = importlib.machinery.SourceFileLoader('caclmgrd', os.path.join(HOST_SERVICES_DIR, 'scripts', 'caclmgrd'))
+spec = importlib.util.spec_from_loader(loader.name, loader)
+caclmgrd = importlib.util.module_from_spec(spec)
+loader.exec_module(caclmgrd)
+
+FAKE_IPTABLES = """#!/bin/sh
+exit 0
+"""
+FAKE_IPTABLES_RESTORE = """#!/bin/sh
+cat > "$(dirname "$0")/$(basename "$0" -restore).rules"
+"""
+FAKE_IPTABLES_SAVE = """#!/bin/sh
+cat "$(dirname "$0")/$(basename "$0" -save).rules" 2>/dev/null
+exit 0
+"""
+
+
+def make_fake_binaries(bin_dir):
+    for binary in ["iptables", "ip6tables"]:
+        for name, script in [(binary, FAKE_IPTABLES),
+                             (binary + "-restore", FAKE_IPTABLES_RESTORE),
+                             (binary + "-save", FAKE_IPTABLES_SAVE)]:
+            path = os.path.join(bin_dir, name)
+            with open(path, "w") as f:
+                f.write(script)
+            os.chmod(path, 0o755)
+
+
+def make_config_db(num_rules):
+    rules = {}
+    for i in range(num_rules):
+        rules[("SSH_ONLY", "RULE_{}".format(i))] = {
+            "PRIORITY": str(9999 - i),
+            "SRC_IP": "10.{}.{}.{}/32".format(i // 65536, i // 256 % 256, i % 256),
+            "PACKET_ACTION": "ACCEPT"
+        }
+    return {
+        "ACL_TABLE": {"SSH_ONLY": {"type": "CTRLPLANE", "services": ["SSH"]}},
+        "ACL_RULE": rules
+    }
+
+
+def make_manager(config_db, netns):
+    with mock.patch.object(caclmgrd, 'SonicDBConfig'), \
+         mock.patch.object(caclmgrd, 'ConfigDBConnector') as mock_connector, \
+         mock.patch.object(caclmgrd.device_info, 'get_all_namespaces', return_value={'front_ns': [], 'back_ns': []}), \
+         mock.patch.object(caclmgrd.ControlPlaneAclManager, 'run_commands', return_value="172.17.0.1"):
+        mock_connector.return_value.get_table.side_effect = lambda table: config_db.get(table, {})
+        manager = caclmgrd.ControlPlaneAclManager(caclmgrd.SYSLOG_IDENTIFIER)
+    if netns:
+        manager.iptables_cmd_ns_prefix[caclmgrd.DEFAULT_NAMESPACE] = "ip netns exec {} ".format(netns)
+    # Don't measure syslog
+    manager.log_info = manager.log_warning = lambda msg: None
+    return manager
+
+
+def run(num_rules, netns):
+    manager = make_manager(make_config_db(num_rules), netns)
+    namespace = caclmgrd.DEFAULT_NAMESPACE
+
+    start = time.time()
+    iptables_cmds, source_ip_map = manager.get_acl_rules_and_translate_to_iptables_commands(namespace)
+    manager.run_commands(iptables_cmds)
+    commands = time.time() - start
+
+    start = time.time()
+    manager.update_control_plane_acls(namespace)
+    restore = time.time() - start
+
+    start = time.time()
+    manager.update_control_plane_acls(namespace)
+    noop = time.time() - start
+
+    return len(iptables_cmds), commands, restore, noop
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-r', '--rules', type=int, nargs='+', default=[10, 1000, 10000])
+    parser.add_argument('--netns', help='run real iptables in this new network namespace')
+    args = parser.parse_args()
+
+    bin_dir = None
+    if args.netns:
+        subprocess.check_call(["ip", "netns", "add", args.netns])
+    else:
+        bin_dir = tempfile.mkdtemp()
+        make_fake_binaries(bin_dir)
+        os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+
+    try:
+        print('{:>8} {:>10} {:>14} {:>14} {:>14} {:>9}'.format(
+            'rules', 'commands', 'commands (s)', 'restore (s)', 'no-op (s)', 'speedup'))
+        for num_rules in args.rules:
+            num_cmds, commands, restore, noop = run(num_rules, args.netns)
+            print('{:>8} {:>10} {:>14.3f} {:>14.3f} {:>14.3f} {:>8.1f}x'.format(
+                num_rules, num_cmds, commands, restore, noop, commands / restore))
+    finally:
+        if args.netns:
+            subprocess.call(["ip", "netns", "delete", args.netns])
+        else:
+            shutil.rmtree(bin_dir)
+
+
+if __name__ == '__main__':
+    main()
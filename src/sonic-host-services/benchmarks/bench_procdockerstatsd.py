@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Compare the cost of a procdockerstatsd process statistics update on this host
+when running 'ps' and writing every field with its own STATE_DB request, and
+when reading /proc directly and writing the changed fields with one redis
+pipeline. STATE_DB is replaced by a stand-in counting redis requests.
+
+Usage: python3 benchmarks/bench_procdockerstatsd.py [-c CYCLES]
+"""
+
+import argparse
+import importlib.machinery
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+
+from unittest import mock
+
+HOST_SERVICES_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, HOST_SERVICES_DIR)
+
+PS_CMD = "ps -eo uid,pid,ppid,%mem,%cpu,stime,tty,time,cmd --sort -%cpu | head -1024"
+PS_FIELDS = 8
+
+
+class CountingStateDB(object):
+    """ Counts the redis requests sent to STATE_DB """
+    def __init__(self):
+        self.requests = 0
+        self.pipe = mock.Mock(execute=self.execute)
+
+    def keys(self, db_name, pattern):
+        self.requests += 1
+        return []
+
+    def get_redis_client(self, db_name):
+        return mock.Mock(pipeline=mock.Mock(return_value=self.pipe))
+
+    def execute(self):
+        self.requests += 1
+
+
+def load_procdockerstatsd():
+    with mock.patch.dict('sys.modules', swsssdk=mock.MagicMock()):
+        loader = importlib.machinery.SourceFileLoader('procdockerstatsd',
+                                                      os.path.join(HOST_SERVICES_DIR, 'scripts', 'procdockerstatsd'))
+        spec = importlib.util.spec_from_loader(loader.name, loader)
+        procdockerstatsd = importlib.util.module_from_spec(spec)
+        loader.exec_module(procdockerstatsd)
+    return procdockerstatsd
+
+
+def run_ps(cycles):
+    requests = 0
+    start = time.time()
+    for _ in range(cycles):
+        lines = subprocess.check_output(PS_CMD, shell=True, universal_newlines=True).splitlines()[1:]
+        # one delete by pattern, then one request per field
+        requests += 1 + len(lines) * PS_FIELDS
+    return time.time() - start, requests
+
+
+def run_native(procdockerstatsd, cycles):
+    pd = procdockerstatsd.ProcDockerStats(procdockerstatsd.SYSLOG_IDENTIFIER)
+    pd.state_db = CountingStateDB()
+    fields = 0
+    start = time.time()
+    for _ in range(cycles):
+        pd.update_state_db(pd.collect_process_stats(), ['PROCESS_STATS'])
+    elapsed = time.time() - start
+    for call in pd.state_db.pipe.hmset.call_args_list:
+        fields += len(call[0][1])
+    return elapsed, pd.state_db.requests, fields
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-c', '--cycles', type=int, default=20)
+    args = parser.parse_args()
+
+    procdockerstatsd = load_procdockerstatsd()
+    ps_time, ps_requests = run_ps(args.cycles)
+    native_time, native_requests, native_fields = run_native(procdockerstatsd, args.cycles)
+
+    print('{} update cycles'.format(args.cycles))
+    print('{:<8} {:>14} {:>16} {:>16}'.format('mode', 'ms per cycle', 'redis requests', 'fields written'))
+    print('{:<8} {:>14.1f} {:>16} {:>16}'.format('ps', ps_time * 1000 / args.cycles, ps_requests, ps_requests - args.cycles))
+    print('{:<8} {:>14.1f} {:>16} {:>16}'.format('native', native_time * 1000 / args.cycles, native_requests, native_fields))
+    print('speedup x{:.2f}'.format(ps_time / native_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+import importlib.machinery
+import importlib.util
+import sys
+import os
+import pytest
+
+from unittest import mock
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+scripts_path = os.path.join(modules_path, "scripts")
+sys.path.insert(0, modules_path)
+
+# Load the file under test
+caclmgrd_path = os.path.join(scripts_path, 'caclmgrd')
+loader = importlib.machinery.SourceFileLoader('caclmgrd', caclmgrd_path)
+spec = importlib.util.spec_from_loader(loader.name, loader)
+caclmgrd = importlib.util.module_from_spec(spec)
+loader.exec_module(caclmgrd)
+sys.modules['caclmgrd'] = caclmgrd
+
+
+ACL_TABLE = {
+    "SSH_ONLY": {
+        "type": "CTRLPLANE",
+        "services": ["SSH", "SNMP"]
+    },
+    "DATAACL": {
+        "type": "L3",
+        "ports": ["Ethernet0"]
+    }
+}
+
+ACL_RULE = {
+    ("SSH_ONLY", "RULE_1"): {"PRIORITY": "9999", "SRC_IP": "10.0.0.1/32", "PACKET_ACTION": "ACCEPT"},
+    ("SSH_ONLY", "RULE_2"): {"PRIORITY": "9998", "SRC_IP": "10.0.0.2/32", "PACKET_ACTION": "ACCEPT"},
+    ("DATAACL", "RULE_1"): {"PRIORITY": "9999", "SRC_IP": "10.0.0.3/32", "PACKET_ACTION": "DROP"}
+}
+
+CONFIG_DB = {
+    "ACL_TABLE": ACL_TABLE,
+    "ACL_RULE": ACL_RULE,
+    "LOOPBACK_INTERFACE": {
+        ("Loopback0", "10.1.0.32/32"): {}
+    }
+}
+
+
+class FakeIptables(object):
+    """
+    Stand-in for iptables-restore/iptables-save: keeps the last restored
+    ruleset of each binary and dumps it as iptables-save does
+    """
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.restored = {}
+        self.calls = []
+
+    def popen(self, cmd, **kwargs):
+        self.calls.append(cmd)
+        proc = mock.Mock()
+        binary = cmd.split()[-1].split("-")[0]
+        if cmd.endswith("-restore"):
+            def communicate(ruleset):
+                if not self.fail:
+                    self.restored[binary] = ruleset
+                return ("", "iptables-restore: line 2 failed" if self.fail else "")
+            proc.communicate.side_effect = communicate
+            proc.returncode = 1 if self.fail else 0
+        else:
+            saved = "# Generated by {}-save\n".format(binary) + \
+                    self.restored.get(binary, "").replace("[0:0]", "[10:1000]")
+            proc.communicate.return_value = (saved, None)
+            proc.returncode = 0
+        return proc
+
+
+def make_manager(namespaces=None, config_db=CONFIG_DB):
+    namespaces = namespaces or {'front_ns': [], 'back_ns': []}
+    with mock.patch.object(caclmgrd, 'SonicDBConfig'), \
+         mock.patch.object(caclmgrd, 'ConfigDBConnector') as mock_connector, \
+         mock.patch.object(caclmgrd.device_info, 'get_all_namespaces', return_value=namespaces), \
+         mock.patch.object(caclmgrd.ControlPlaneAclManager, 'run_commands', return_value="172.17.0.1"):
+        mock_connector.return_value.get_table.side_effect = lambda table: config_db.get(table, {})
+        manager = caclmgrd.ControlPlaneAclManager(caclmgrd.SYSLOG_IDENTIFIER)
+    return manager
+
+
+class TestCaclmgrdIptablesRestore(object):
+    def test_translate_iptables_commands_to_rulesets(self):
+        manager = make_manager()
+        iptables_cmds, _ = manager.get_acl_rules_and_translate_to_iptables_commands('')
+        rulesets = manager.translate_iptables_commands_to_rulesets('', iptables_cmds)
+
+        assert sorted(rulesets.keys()) == ["ip6tables", "iptables"]
+        lines = rulesets["iptables"].splitlines()
+        assert lines[:4] == ["*filter", ":INPUT ACCEPT [0:0]", ":FORWARD ACCEPT [0:0]", ":OUTPUT ACCEPT [0:0]"]
+        assert lines[-1] == "COMMIT"
+        assert lines.index("-A INPUT -p tcp -s 10.0.0.1/32 --dport 22 -j ACCEPT") < \
+               lines.index("-A INPUT -p tcp -s 10.0.0.2/32 --dport 22 -j ACCEPT")
+        assert "-A INPUT -d 10.1.0.32/32 -j DROP" in lines
+        assert lines[-2] == "-A INPUT -j DROP"
+        assert not any("10.0.0.3" in line for line in lines)
+        assert rulesets["ip6tables"].splitlines()[-2] == "-A INPUT -j DROP"
+
+    def test_translate_nat_rules_in_namespace(self):
+        manager = make_manager({'front_ns': ['asic0'], 'back_ns': []})
+        iptables_cmds, source_ip_map = manager.get_acl_rules_and_translate_to_iptables_commands('asic0')
+        iptables_cmds += manager.generate_fwd_traffic_from_namespace_to_host_commands('asic0', source_ip_map)
+        rulesets = manager.translate_iptables_commands_to_rulesets('asic0', iptables_cmds)
+
+        lines = rulesets["iptables"].splitlines()
+        assert lines.count("COMMIT") == 2
+        nat_lines = lines[lines.index("*nat") + 1:-1]
+        assert "-A PREROUTING -p tcp -s 10.0.0.1/32 --dport 22  -j DNAT --to-destination 172.17.0.1" in nat_lines
+
+    def test_translate_unsupported_commands(self):
+        manager = make_manager()
+        # table not flushed by the commands
+        assert manager.translate_iptables_commands_to_rulesets('', ["iptables -t mangle -A PREROUTING -j ACCEPT"]) is None
+        assert manager.translate_iptables_commands_to_rulesets('', ["iptables -N MYCHAIN"]) is None
+        assert manager.translate_iptables_commands_to_rulesets('', ["ebtables -F"]) is None
+
+    def test_update_control_plane_acls(self):
+        manager = make_manager()
+        iptables = FakeIptables()
+        with mock.patch.object(caclmgrd.subprocess, 'Popen', side_effect=iptables.popen), \
+             mock.patch.object(manager, 'run_commands') as mock_run_commands:
+            manager.update_control_plane_acls('')
+            assert sorted(iptables.restored.keys()) == ["ip6tables", "iptables"]
+            assert len(iptables.calls) == 6
+            mock_run_commands.assert_not_called()
+
+            # Nothing changed, only iptables-save is run
+            iptables.calls = []
+            manager.update_control_plane_acls('')
+            assert iptables.calls == ["iptables-save", "ip6tables-save"]
+
+            # Rules modified outside of caclmgrd are restored
+            iptables.calls = []
+            iptables.restored["iptables"] = "*filter\nCOMMIT\n"
+            manager.update_control_plane_acls('')
+            assert iptables.calls == ["iptables-save", "iptables-restore", "iptables-save", "ip6tables-save"]
+            mock_run_commands.assert_not_called()
+
+    def test_update_control_plane_acls_fallback(self):
+        manager = make_manager()
+        iptables = FakeIptables(fail=True)
+        with mock.patch.object(caclmgrd.subprocess, 'Popen', side_effect=iptables.popen), \
+             mock.patch.object(manager, 'run_commands') as mock_run_commands:
+            manager.update_control_plane_acls('')
+            fallback_cmds = mock_run_commands.call_args[0][0]
+            assert "iptables -F" in fallback_cmds
+            assert "ip6tables -F" in fallback_cmds
+            assert "iptables -A INPUT -p tcp -s 10.0.0.1/32 --dport 22 -j ACCEPT" in fallback_cmds
+
+
+class TestCaclmgrdAclRuleCache(object):
+    def test_translate_only_changed_rules(self):
+        manager = make_manager()
+        manager.config_db_map[''].raw_to_typed.side_effect = lambda data: data
+        translate = manager.translate_acl_rule_to_iptables_commands
+        with mock.patch.object(manager, 'translate_acl_rule_to_iptables_commands', side_effect=translate) as mock_translate:
+            iptables_cmds, _ = manager.get_acl_rules_and_translate_to_iptables_commands('')
+            assert mock_translate.call_count == 4
+
+            # Nothing changed, the cached rules are used
+            mock_translate.reset_mock()
+            assert manager.get_acl_rules_and_translate_to_iptables_commands('')[0] == iptables_cmds
+            mock_translate.assert_not_called()
+
+            assert manager.update_acl_tables_and_rules('', 'ACL_RULE', 'SSH_ONLY|RULE_2', 'SET',
+                                                       [("PRIORITY", "9998"), ("SRC_IP", "10.0.0.4/32"), ("PACKET_ACTION", "ACCEPT")], '|')
+            iptables_cmds, _ = manager.get_acl_rules_and_translate_to_iptables_commands('')
+            assert mock_translate.call_count == 2
+            assert "iptables -A INPUT -p tcp -s 10.0.0.4/32 --dport 22 -j ACCEPT" in iptables_cmds
+            assert not any("10.0.0.2/32" in cmd for cmd in iptables_cmds)
+
+    def test_update_acl_tables_and_rules(self):
+        manager = make_manager()
+        manager.config_db_map[''].raw_to_typed.side_effect = lambda data: data
+        manager.load_acl_tables_and_rules('')
+        assert list(manager.acl_rules['']['SSH_ONLY'].keys()) == ["RULE_1", "RULE_2"]
+
+        # Rules of tables which are not control plane ACLs are ignored
+        assert not manager.update_acl_tables_and_rules('', 'ACL_RULE', 'DATAACL|RULE_1', 'DEL', [], '|')
+        assert 'DATAACL' not in manager.acl_rules['']
+        assert not manager.update_acl_tables_and_rules('', 'ACL_RULE', 'UNKNOWN|RULE_1', 'SET', [("PRIORITY", "1")], '|')
+
+        assert manager.update_acl_tables_and_rules('', 'ACL_RULE', 'SSH_ONLY|RULE_1', 'DEL', [], '|')
+        assert list(manager.acl_rules['']['SSH_ONLY'].keys()) == ["RULE_2"]
+
+        assert manager.update_acl_tables_and_rules('', 'ACL_TABLE', 'NTP_ONLY', 'SET',
+                                                   [("type", "CTRLPLANE"), ("services", ["NTP"])], '|')
+        assert manager.acl_tables['']['NTP_ONLY'] == {"type": "CTRLPLANE", "services": ["NTP"]}
+        assert manager.update_acl_tables_and_rules('', 'ACL_TABLE', 'NTP_ONLY', 'DEL', [], '|')
+        assert 'NTP_ONLY' not in manager.acl_tables['']
+
+
+class StopLoop(Exception):
+    pass
+
+
+class FakeSubscriberStateTable(object):
+    def __init__(self, db_connector, table_name):
+        self.db_connector = db_connector
+        self.table_name = table_name
+        self.events = []
+
+    def getDbConnector(self):
+        return self.db_connector
+
+    def getTableNameSeparator(self):
+        return "|"
+
+    def pop(self):
+        return self.events.pop(0) if self.events else ("", "", ())
+
+
+class FakeSelect(object):
+    """
+    Stand-in for swsscommon.Select replaying notifications at given times of
+    a fake clock, which is advanced by the select timeouts
+    """
+    OBJECT = 0
+    TIMEOUT = 1
+
+    def __init__(self, notifications):
+        self.now = 0.0
+        self.notifications = sorted(notifications, key=lambda notification: notification[0])
+        self.tables = {}
+        self.timeouts = []
+
+    def addSelectable(self, table):
+        self.tables[(table.db_connector.getNamespace(), table.table_name)] = table
+
+    def select(self, timeout_ms):
+        self.timeouts.append(timeout_ms)
+        if not self.notifications:
+            if timeout_ms == 1000:
+                # Nothing left to replay and no update pending
+                raise StopLoop()
+        elif self.notifications[0][0] <= self.now + timeout_ms / 1000.0:
+            (when, namespace, table_name, event) = self.notifications.pop(0)
+            self.now = max(self.now, when)
+            table = self.tables[(namespace, table_name)]
+            table.events.append(event)
+            return self.OBJECT, table
+        self.now += timeout_ms / 1000.0
+        return self.TIMEOUT, None
+
+
+class TestCaclmgrdEventLoop(object):
+    def run_manager(self, manager, notifications):
+        sel = FakeSelect(notifications)
+        swsscommon = mock.Mock(CFG_ACL_TABLE_TABLE_NAME="ACL_TABLE", CFG_ACL_RULE_TABLE_NAME="ACL_RULE",
+                               SubscriberStateTable=FakeSubscriberStateTable,
+                               CastSelectableToRedisSelectObj=lambda selectable: selectable)
+        swsscommon.Select.return_value = sel
+        swsscommon.Select.OBJECT = FakeSelect.OBJECT
+        swsscommon.DBConnector.side_effect = lambda db_name, db_id, unix_socket, namespace: \
+            mock.Mock(getNamespace=mock.Mock(return_value=namespace))
+        manager.config_db_map[''].raw_to_typed.side_effect = lambda data: data
+        # Loaded by the initial update, which is mocked
+        for namespace in manager.config_db_map:
+            manager.load_acl_tables_and_rules(namespace)
+
+        updates = []
+        with mock.patch.object(caclmgrd, 'swsscommon', swsscommon), \
+             mock.patch.object(caclmgrd, 'time') as mock_time, \
+             mock.patch.object(caclmgrd.os, 'geteuid', return_value=0), \
+             mock.patch.object(caclmgrd.device_info, 'is_multi_npu', return_value=False), \
+             mock.patch.object(manager, 'update_control_plane_acls',
+                               side_effect=lambda namespace: updates.append((namespace, sel.now))):
+            mock_time.monotonic.side_effect = lambda: sel.now
+            with pytest.raises(StopLoop):
+                manager.run()
+            mock_time.sleep.assert_not_called()
+        return updates, sel
+
+    def test_debounce_bursts_across_namespaces(self):
+        manager = make_manager({'front_ns': ['asic0', 'asic1'], 'back_ns': []})
+
+        def rule_event(rule_id):
+            return ("SSH_ONLY|" + rule_id, "SET", [("PRIORITY", "100"), ("SRC_IP", "10.1.1.1/32"), ("PACKET_ACTION", "ACCEPT")])
+
+        notifications = [(1.0 + i * 0.1, 'asic0', 'ACL_RULE', rule_event("RULE_A%d" % i)) for i in range(5)]
+        notifications += [(1.2, 'asic1', 'ACL_RULE', rule_event("RULE_B1")),
+                          (1.3, 'asic1', 'ACL_TABLE', ("NTP_ONLY", "SET", [("type", "CTRLPLANE"), ("services", ["NTP"])])),
+                          # Not a control plane ACL rule, no update
+                          (2.5, '', 'ACL_RULE', ("DATAACL|RULE_2", "SET", [("PRIORITY", "1")])),
+                          (4.0, '', 'ACL_RULE', rule_event("RULE_C1"))]
+        updates, sel = self.run_manager(manager, notifications)
+
+        assert sorted(updates[:3]) == [('', 0.0), ('asic0', 0.0), ('asic1', 0.0)]
+        assert updates[3:] == [('asic1', pytest.approx(1.8, abs=0.002)), ('asic0', pytest.approx(1.9, abs=0.002)),
+                               ('', pytest.approx(4.5, abs=0.002))]
+        assert 'SSH_ONLY' in manager.acl_tables['asic1'] and 'NTP_ONLY' in manager.acl_tables['asic1']
+        assert list(manager.acl_rules['asic0']['SSH_ONLY'].keys())[-5:] == ["RULE_A%d" % i for i in range(5)]
+        # The loop only wakes up for notifications and due updates
+        assert len(sel.timeouts) < 30
+
+    def test_select_timeout(self):
+        manager = make_manager()
+        assert manager.get_select_timeout_ms(10.0, 1000) == 1000
+        manager.schedule_control_plane_acls_update('', 10.0)
+        assert manager.get_select_timeout_ms(10.0, 1000) == 500
+        assert manager.get_select_timeout_ms(10.4, 1000) == 100
+        assert manager.get_select_timeout_ms(11.0, 1000) == 0
+
+        with mock.patch.object(manager, 'update_control_plane_acls') as mock_update:
+            manager.apply_pending_control_plane_acls_updates(10.2)
+            mock_update.assert_not_called()
+            manager.schedule_control_plane_acls_update('', 10.2)
+            manager.apply_pending_control_plane_acls_updates(10.6)
+            mock_update.assert_not_called()
+            manager.apply_pending_control_plane_acls_updates(10.7)
+            mock_update.assert_called_once_with('')
+        assert manager.update_deadline == {}
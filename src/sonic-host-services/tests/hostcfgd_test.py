@@ -0,0 +1,234 @@
+import importlib.machinery
+import importlib.util
+import sys
+import os
+import pytest
+
+from unittest import mock
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+scripts_path = os.path.join(modules_path, "scripts")
+sys.path.insert(0, modules_path)
+
+
+class DBusException(Exception):
+    pass
+
+
+dbus_module_mock = mock.MagicMock()
+dbus_module_mock.exceptions.DBusException = DBusException
+gi_module_mock = mock.MagicMock()
+
+# Load the file under test
+hostcfgd_path = os.path.join(scripts_path, 'hostcfgd')
+loader = importlib.machinery.SourceFileLoader('hostcfgd', hostcfgd_path)
+spec = importlib.util.spec_from_loader(loader.name, loader)
+hostcfgd = importlib.util.module_from_spec(spec)
+with mock.patch.dict('sys.modules', {'dbus': dbus_module_mock,
+                                     'dbus.mainloop': dbus_module_mock.mainloop,
+                                     'dbus.mainloop.glib': dbus_module_mock.mainloop.glib,
+                                     'gi': gi_module_mock,
+                                     'gi.repository': gi_module_mock.repository}):
+    loader.exec_module(hostcfgd)
+sys.modules['hostcfgd'] = hostcfgd
+
+
+class FakeSystemdManager(object):
+    """
+    Stand-in for the systemd manager D-Bus interface. Queued jobs are
+    removed, with a JobRemoved signal, after job_polls signal dispatches
+    """
+    def __init__(self, failed_units=(), dependency_units=(), job_polls=1, error=None):
+        self.calls = []
+        self.unit_states = {}
+        self.jobs = {}
+        self.signal_handlers = {}
+        self.subscribed = False
+        # JobRemoved signals received and not dispatched yet
+        self.signals = []
+        self.failed_units = set(failed_units)
+        self.dependency_units = set(dependency_units)
+        self.job_polls = job_polls
+        self.error = error
+        self.max_running_jobs = 0
+
+    def call(self, method, *args):
+        self.calls.append((method,) + args)
+        if self.error:
+            raise self.error
+
+    def connect_to_signal(self, name, handler):
+        self.signal_handlers[name] = handler
+        return mock.Mock(remove=lambda: self.signal_handlers.pop(name))
+
+    def Subscribe(self):
+        self.subscribed = True
+
+    def Unsubscribe(self):
+        self.subscribed = False
+
+    def UnmaskUnitFiles(self, files, runtime):
+        self.call('UnmaskUnitFiles', list(files))
+        return []
+
+    def EnableUnitFiles(self, files, runtime, force):
+        self.call('EnableUnitFiles', list(files))
+        return (True, [])
+
+    def DisableUnitFiles(self, files, runtime):
+        self.call('DisableUnitFiles', list(files))
+        return []
+
+    def MaskUnitFiles(self, files, runtime, force):
+        self.call('MaskUnitFiles', list(files))
+        return []
+
+    def Reload(self):
+        self.call('Reload')
+
+    def queue_job(self, unit, result, active_state):
+        path = "/org/freedesktop/systemd1/job/{}".format(len(self.calls))
+        self.jobs[path] = [unit, self.job_polls, result, active_state]
+        self.max_running_jobs = max(self.max_running_jobs, len(self.jobs))
+        return path
+
+    def StartUnit(self, name, mode):
+        self.call('StartUnit', name)
+        if name in self.failed_units:
+            return self.queue_job(name, "failed", "failed")
+        if name in self.dependency_units:
+            # A dependency failed, the unit itself is left inactive, not failed
+            return self.queue_job(name, "dependency", "inactive")
+        return self.queue_job(name, "done", "active")
+
+    def StopUnit(self, name, mode):
+        self.call('StopUnit', name)
+        return self.queue_job(name, "done", "inactive")
+
+    def dispatch_signals(self):
+        for path in list(self.jobs.keys()):
+            self.jobs[path][1] -= 1
+            if self.jobs[path][1] < 0:
+                (unit, _, result, active_state) = self.jobs.pop(path)
+                self.unit_states[unit] = active_state
+                if self.subscribed:
+                    self.signals.append((1, path, unit, result))
+        signals, self.signals = self.signals, []
+        handler = self.signal_handlers.get('JobRemoved')
+        if handler is not None:
+            for signal in signals:
+                handler(*signal)
+
+    def methods(self):
+        return [call[0] for call in self.calls]
+
+
+FEATURE_TABLE = {
+    'bgp': {'state': 'enabled', 'has_global_scope': 'False', 'has_per_asic_scope': 'True', 'has_timer': 'False'},
+    'snmp': {'state': 'enabled', 'has_global_scope': 'True', 'has_per_asic_scope': 'False', 'has_timer': 'True'},
+    'teamd': {'state': 'enabled', 'has_global_scope': 'True', 'has_per_asic_scope': 'True', 'has_timer': 'False'}
+}
+
+
+def make_daemon(manager, num_npus=3):
+    with mock.patch.object(hostcfgd, 'ConfigDBConnector'), \
+         mock.patch.object(hostcfgd, 'run_cmd'), \
+         mock.patch.object(hostcfgd.device_info, 'is_multi_npu', return_value=num_npus > 1):
+        daemon = hostcfgd.HostConfigDaemon()
+    daemon.systemd = hostcfgd.Systemd(manager)
+    daemon.systemd.dispatch_signals = manager.dispatch_signals
+    return daemon
+
+
+@mock.patch.object(hostcfgd.time, 'sleep')
+@mock.patch.object(hostcfgd.subprocess, 'check_call')
+class TestHostcfgdFeatureState(object):
+    def update_feature_state(self, daemon, feature_name, state, num_npus=3):
+        daemon.cached_feature_states[feature_name] = FEATURE_TABLE[feature_name]['state']
+        with mock.patch.object(hostcfgd.device_info, 'get_num_npus', return_value=num_npus), \
+             mock.patch.object(hostcfgd.syslog, 'syslog') as mock_syslog:
+            daemon.update_feature_state(feature_name, state, FEATURE_TABLE)
+        return [c[0][1] for c in mock_syslog.call_args_list if c[0][0] == hostcfgd.syslog.LOG_ERR]
+
+    def test_enable_per_asic_feature(self, mock_check_call, mock_sleep):
+        manager = FakeSystemdManager()
+        daemon = make_daemon(manager)
+        assert self.update_feature_state(daemon, 'bgp', 'enabled') == []
+
+        units = ['bgp@0.service', 'bgp@1.service', 'bgp@2.service']
+        assert manager.calls[:3] == [('UnmaskUnitFiles', units), ('EnableUnitFiles', units), ('Reload',)]
+        assert manager.calls[3:] == [('StartUnit', unit) for unit in units]
+        # Units of all ASICs are started concurrently
+        assert manager.max_running_jobs == 3
+        assert all(manager.unit_states[unit] == 'active' for unit in units)
+        mock_check_call.assert_not_called()
+
+    def test_enable_feature_with_timer(self, mock_check_call, mock_sleep):
+        manager = FakeSystemdManager()
+        daemon = make_daemon(manager, num_npus=1)
+        assert self.update_feature_state(daemon, 'snmp', 'enabled', num_npus=1) == []
+        assert manager.calls == [('UnmaskUnitFiles', ['snmp.service', 'snmp.timer']),
+                                 ('EnableUnitFiles', ['snmp.timer']),
+                                 ('Reload',),
+                                 ('StartUnit', 'snmp.timer')]
+
+    def test_disable_feature(self, mock_check_call, mock_sleep):
+        manager = FakeSystemdManager()
+        daemon = make_daemon(manager)
+        assert self.update_feature_state(daemon, 'teamd', 'disabled') == []
+
+        units = ['teamd.service', 'teamd@0.service', 'teamd@1.service', 'teamd@2.service']
+        assert manager.methods() == ['StopUnit'] * 4 + ['DisableUnitFiles', 'MaskUnitFiles', 'Reload']
+        assert [call[1] for call in manager.calls[:4]] == units
+        assert manager.calls[4:6] == [('DisableUnitFiles', units), ('MaskUnitFiles', units)]
+        assert manager.max_running_jobs == 4
+        mock_check_call.assert_not_called()
+
+    def test_start_failure(self, mock_check_call, mock_sleep):
+        manager = FakeSystemdManager(failed_units=['bgp@1.service'])
+        daemon = make_daemon(manager)
+        errors = self.update_feature_state(daemon, 'bgp', 'enabled')
+        assert len(errors) == 1 and 'bgp@1.service' in errors[0]
+
+    def test_start_dependency_failure(self, mock_check_call, mock_sleep):
+        # The unit is not in failed state, but its start job did not succeed
+        manager = FakeSystemdManager(dependency_units=['bgp@2.service'])
+        daemon = make_daemon(manager)
+        errors = self.update_feature_state(daemon, 'bgp', 'enabled')
+        assert manager.unit_states['bgp@2.service'] == 'inactive'
+        assert len(errors) == 1 and 'bgp@2.service' in errors[0]
+
+    def test_disable_feature_with_timer(self, mock_check_call, mock_sleep):
+        manager = FakeSystemdManager()
+        daemon = make_daemon(manager, num_npus=1)
+        assert self.update_feature_state(daemon, 'snmp', 'disabled', num_npus=1) == []
+        # The timer is stopped before the service
+        assert manager.calls[:2] == [('StopUnit', 'snmp.timer'), ('StopUnit', 'snmp.service')]
+        assert manager.max_running_jobs == 1
+        assert manager.calls[2:4] == [('DisableUnitFiles', ['snmp.timer', 'snmp.service']),
+                                      ('MaskUnitFiles', ['snmp.timer', 'snmp.service'])]
+
+    def test_stale_job_removed_signal(self, mock_check_call, mock_sleep):
+        manager = FakeSystemdManager()
+        daemon = make_daemon(manager)
+        assert daemon.systemd.start_units(['bgp@0.service']) == []
+        assert not manager.subscribed and 'JobRemoved' not in manager.signal_handlers
+        # A signal of an unrelated job received before the end of the run, and
+        # not dispatched, with the object path of the next job
+        next_job = "/org/freedesktop/systemd1/job/{}".format(len(manager.calls) + 1)
+        manager.signals.append((1, next_job, 'other.service', 'failed'))
+        assert daemon.systemd.start_units(['bgp@1.service']) == []
+
+    def test_job_timeout(self, mock_check_call, mock_sleep):
+        manager = FakeSystemdManager(job_polls=1000)
+        daemon = make_daemon(manager)
+        with mock.patch.object(hostcfgd, 'SYSTEMD_JOB_TIMEOUT_SECS', 0):
+            assert daemon.systemd.stop_units(['bgp@0.service', 'bgp@1.service']) == ['bgp@0.service', 'bgp@1.service']
+
+    def test_dbus_error(self, mock_check_call, mock_sleep):
+        manager = FakeSystemdManager(error=DBusException("Access denied"))
+        daemon = make_daemon(manager)
+        errors = self.update_feature_state(daemon, 'teamd', 'disabled')
+        assert 'Access denied' in errors[0]
+        assert len(manager.calls) == 1
@@ -2,9 +2,11 @@ import importlib.machinery
 import importlib.util
 import sys
 import os
+import time
 import pytest
 
 import swsssdk
+from unittest import mock
 
 from .mock_connector import MockConnector
 
@@ -23,6 +25,31 @@ procdockerstatsd = importlib.util.module_from_spec(spec)
 loader.exec_module(procdockerstatsd)
 sys.modules['procdockerstatsd'] = procdockerstatsd
 
+
+def write_file(path, content):
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def make_proc_dir(proc_dir, uptime):
+    write_file(os.path.join(proc_dir, "uptime"), "{:.2f} 0.00\n".format(uptime))
+    write_file(os.path.join(proc_dir, "meminfo"), "MemTotal:        1000000 kB\nMemFree:          500000 kB\n")
+    write_file(os.path.join(proc_dir, "self", "ns", "net"), "")
+
+
+def make_process(proc_dir, pid, comm, ppid, utime=0, stime=0, starttime=0, uid=0, tty_nr=0, rss=100, cmdline=""):
+    pid_dir = os.path.join(proc_dir, str(pid))
+    write_file(os.path.join(pid_dir, "stat"), "{} ({}) S {} {} {} {} -1 4194304 0 0 0 0 {} {} 0 0 20 0 1 0 {} 1000 {}\n"
+               .format(pid, comm, ppid, pid, pid, tty_nr, utime, stime, starttime, rss))
+    write_file(os.path.join(pid_dir, "statm"), "1000 {} 10 1 0 100 0\n".format(rss))
+    write_file(os.path.join(pid_dir, "status"), "Name:\t{}\nUid:\t{}\t{}\t{}\t{}\n".format(comm, uid, uid, uid, uid))
+    write_file(os.path.join(pid_dir, "cmdline"), cmdline)
+    if not os.path.exists(os.path.join(pid_dir, "ns", "net")):
+        write_file(os.path.join(pid_dir, "ns", "net"), "")
+
+
 class TestProcDockerStatsDaemon(object):
     def test_convert_to_bytes(self):
         test_data = [
@@ -46,3 +73,193 @@ class TestProcDockerStatsDaemon(object):
         for test_input, expected_output in test_data:
             res = pdstatsd.convert_to_bytes(test_input)
             assert res == expected_output
+
+    def test_format_ps_columns(self):
+        pdstatsd = procdockerstatsd.ProcDockerStats(procdockerstatsd.SYSLOG_IDENTIFIER)
+        with mock.patch.object(procdockerstatsd, 'CLK_TCK', 100):
+            assert pdstatsd.format_cpu_time(150) == "00:00:01"
+            assert pdstatsd.format_cpu_time((2 * 86400 + 3723) * 100) == "2-01:02:03"
+        assert pdstatsd.format_tty(0) == "?"
+        assert pdstatsd.format_tty((136 << 8) | 2) == "pts/2"
+        assert pdstatsd.format_tty((4 << 8) | 1) == "tty1"
+        assert pdstatsd.format_tty((4 << 8) | 64) == "ttyS0"
+        now = time.localtime(time.mktime((2020, 6, 15, 12, 0, 0, 0, 0, -1)))
+        assert pdstatsd.format_start_time(time.mktime((2020, 6, 15, 9, 5, 0, 0, 0, -1)), now) == "09:05"
+        assert pdstatsd.format_start_time(time.mktime((2020, 3, 2, 9, 5, 0, 0, 0, -1)), now) == "Mar02"
+        assert pdstatsd.format_start_time(time.mktime((2019, 6, 15, 9, 5, 0, 0, 0, -1)), now) == "2019"
+
+    def test_collect_process_stats(self, tmpdir):
+        proc_dir = str(tmpdir)
+        make_proc_dir(proc_dir, 100.0)
+        make_process(proc_dir, 1, "systemd", ppid=0, utime=100, stime=50, starttime=1, cmdline="/sbin/init\0splash\0")
+        make_process(proc_dir, 20, "kworker/0:1", ppid=2, starttime=5)
+        make_process(proc_dir, 300, "(bash) x", ppid=1, utime=500, stime=500, starttime=8000, uid=1000,
+                     tty_nr=(136 << 8) | 2, rss=25000, cmdline="bash\0-c\0sleep 1\0")
+
+        pdstatsd = procdockerstatsd.ProcDockerStats(procdockerstatsd.SYSLOG_IDENTIFIER)
+        with mock.patch.object(procdockerstatsd, 'PROC_DIR', proc_dir), \
+             mock.patch.object(procdockerstatsd, 'CLK_TCK', 100), \
+             mock.patch.object(procdockerstatsd, 'PAGE_SIZE', 4096), \
+             mock.patch.object(procdockerstatsd, 'PROCESS_STATS_MAX', 2):
+            data = pdstatsd.collect_process_stats()
+            assert list(data.keys()) == ['PROCESS_STATS|300', 'PROCESS_STATS|1']
+            assert data['PROCESS_STATS|1']['CMD'] == "/sbin/init splash"
+            assert data['PROCESS_STATS|1']['%CPU'] == "1.5"
+            assert data['PROCESS_STATS|1']['TIME'] == "00:00:01"
+            entry = data['PROCESS_STATS|300']
+            assert {field: entry[field] for field in ['UID', 'PPID', '%CPU', '%MEM', 'TT', 'TIME', 'CMD']} == \
+                {'UID': '1000', 'PPID': '1', '%CPU': '50.0', '%MEM': '10.0', 'TT': 'pts/2', 'TIME': '00:00:10', 'CMD': 'bash -c sleep 1'}
+
+            # CPU usage since the previous update
+            make_proc_dir(proc_dir, 110.0)
+            make_process(proc_dir, 300, "(bash) x", ppid=1, utime=700, stime=500, starttime=8000, uid=1000)
+            data = pdstatsd.collect_process_stats()
+            assert data['PROCESS_STATS|300']['%CPU'] == "20.0"
+            assert data['PROCESS_STATS|1']['%CPU'] == "0.0"
+
+            # Kernel threads are reported with their name
+            with mock.patch.object(procdockerstatsd, 'PROCESS_STATS_MAX', 3):
+                data = pdstatsd.collect_process_stats()
+            assert data['PROCESS_STATS|20']['CMD'] == "[kworker/0:1]"
+
+    def test_collect_docker_stats(self, tmpdir):
+        proc_dir = os.path.join(str(tmpdir), "proc")
+        cgroup_dir = os.path.join(str(tmpdir), "cgroup")
+        make_proc_dir(proc_dir, 100.0)
+        make_process(proc_dir, 300, "bgpd", ppid=1, starttime=8000)
+        write_file(os.path.join(proc_dir, "300", "net", "dev"),
+                   "Inter-|   Receive\n face |bytes    packets\n"
+                   "    lo: 1000 10 0 0 0 0 0 0 1000 10 0 0 0 0 0 0\n"
+                   "  eth0: 2000 20 0 0 0 0 0 0 3000 30 0 0 0 0 0 0\n")
+        cid = "0123456789ab" + "c" * 52
+        cgroup_files = {
+            "cpuacct/docker/{}/cpuacct.usage".format(cid): "5000000000\n",
+            "cpuacct/docker/{}/cgroup.procs".format(cid): "300\n",
+            "memory/docker/{}/memory.usage_in_bytes".format(cid): "104857600\n",
+            "memory/docker/{}/memory.limit_in_bytes".format(cid): "9223372036854771712\n",
+            "memory/docker/{}/memory.stat".format(cid): "cache 10485760\ntotal_inactive_file 4857600\n",
+            "blkio/docker/{}/blkio.throttle.io_service_bytes".format(cid): "8:0 Read 4096\n8:0 Write 8192\n8:0 Total 12288\nTotal 12288\n",
+            "pids/docker/{}/pids.current".format(cid): "3\n"
+        }
+        for (path, content) in cgroup_files.items():
+            write_file(os.path.join(cgroup_dir, path), content)
+        containers = [{'Id': cid, 'Names': ['/bgp']}, {'Id': "fedcba987654" + "0" * 52, 'Names': ['/stopped']}]
+
+        pdstatsd = procdockerstatsd.ProcDockerStats(procdockerstatsd.SYSLOG_IDENTIFIER)
+        with mock.patch.object(procdockerstatsd, 'PROC_DIR', proc_dir), \
+             mock.patch.object(procdockerstatsd, 'CGROUP_DIR', cgroup_dir), \
+             mock.patch.object(procdockerstatsd, 'CLK_TCK', 100), \
+             mock.patch.object(pdstatsd, 'docker_api_get', return_value=containers):
+            data = pdstatsd.collect_docker_stats()
+            assert data['DOCKER_STATS|0123456789ab'] == {
+                'NAME': 'bgp',
+                'CPU%': '25.00',
+                'MEM_BYTES': '100000000',
+                'MEM_LIMIT_BYTES': '1024000000',
+                'MEM%': '9.77',
+                'NET_IN_BYTES': '2000',
+                'NET_OUT_BYTES': '3000',
+                'BLOCK_IN_BYTES': '4096',
+                'BLOCK_OUT_BYTES': '8192',
+                'PIDS': '3'
+            }
+            assert data['DOCKER_STATS|fedcba987654']['NAME'] == 'stopped'
+            assert data['DOCKER_STATS|fedcba987654']['MEM_BYTES'] == '0'
+
+            # CPU usage since the previous update
+            make_proc_dir(proc_dir, 110.0)
+            write_file(os.path.join(cgroup_dir, "cpuacct/docker/{}/cpuacct.usage".format(cid)), "6000000000\n")
+            assert pdstatsd.collect_docker_stats()['DOCKER_STATS|0123456789ab']['CPU%'] == '10.00'
+
+            # The process giving the start time exited, the container keeps its sample
+            make_proc_dir(proc_dir, 120.0)
+            make_process(proc_dir, 301, "zebra", ppid=1, starttime=11000)
+            write_file(os.path.join(cgroup_dir, "cpuacct/docker/{}/cgroup.procs".format(cid)), "301\n")
+            write_file(os.path.join(cgroup_dir, "cpuacct/docker/{}/cpuacct.usage".format(cid)), "6500000000\n")
+            assert pdstatsd.collect_docker_stats()['DOCKER_STATS|0123456789ab']['CPU%'] == '5.00'
+
+            # The container was restarted, its CPU usage is since it started
+            make_proc_dir(proc_dir, 130.0)
+            write_file(os.path.join(cgroup_dir, "cpuacct/docker/{}/cpuacct.usage".format(cid)), "4000000000\n")
+            assert pdstatsd.collect_docker_stats()['DOCKER_STATS|0123456789ab']['CPU%'] == '20.00'
+            write_file(os.path.join(cgroup_dir, "cpuacct/docker/{}/cgroup.procs".format(cid)), "300\n")
+
+            # Containers in the host network namespace have no network statistics
+            os.remove(os.path.join(proc_dir, "300", "ns", "net"))
+            os.symlink(os.path.join(proc_dir, "self", "ns", "net"), os.path.join(proc_dir, "300", "ns", "net"))
+            assert pdstatsd.collect_docker_stats()['DOCKER_STATS|0123456789ab']['NET_IN_BYTES'] == '0'
+
+    def test_read_cgroup_v2_stats(self, tmpdir):
+        cgroup_dir = str(tmpdir)
+        cid = "a" * 64
+        scope_dir = os.path.join(cgroup_dir, "system.slice", "docker-{}.scope".format(cid))
+        write_file(os.path.join(cgroup_dir, "cgroup.controllers"), "cpu memory io pids\n")
+        for (name, content) in [("cpu.stat", "usage_usec 2500000\nuser_usec 2000000\n"),
+                                ("memory.current", "2000000\n"),
+                                ("memory.max", "max\n"),
+                                ("memory.stat", "anon 1000000\ninactive_file 500000\n"),
+                                ("io.stat", "8:0 rbytes=100 wbytes=200 rios=1 wios=2\n8:16 rbytes=1 wbytes=2\n"),
+                                ("pids.current", "7\n"),
+                                ("cgroup.procs", "42\n43\n")]:
+            write_file(os.path.join(scope_dir, name), content)
+
+        pdstatsd = procdockerstatsd.ProcDockerStats(procdockerstatsd.SYSLOG_IDENTIFIER)
+        with mock.patch.object(procdockerstatsd, 'CGROUP_DIR', cgroup_dir):
+            cgroup_dirs = pdstatsd.get_container_cgroup_dirs(cid)
+            assert cgroup_dirs == {'unified': scope_dir}
+            assert pdstatsd.read_cgroup_stats(cgroup_dirs) == {
+                'cpu': 2.5, 'mem': 1500000, 'mem_limit': None, 'block_in': 101, 'block_out': 202, 'pids': 7, 'pid': '42'
+            }
+            assert pdstatsd.get_container_cgroup_dirs("b" * 64) is None
+
+    def test_update_state_db(self):
+        pdstatsd = procdockerstatsd.ProcDockerStats(procdockerstatsd.SYSLOG_IDENTIFIER)
+        pdstatsd.state_db = mock.MagicMock()
+        pdstatsd.state_db.keys.side_effect = lambda db, pattern: {
+            'PROCESS_STATS|*': ['PROCESS_STATS|1', 'PROCESS_STATS|999'],
+            'DOCKER_STATS|*': ['DOCKER_STATS|0123456789ab']
+        }[pattern]
+        pipe = pdstatsd.state_db.get_redis_client.return_value.pipeline.return_value
+
+        pdstatsd.update_state_db({'PROCESS_STATS|1': {'%CPU': '1.0', 'CMD': 'init'},
+                                  'PROCESS_STATS|2': {'%CPU': '0.0', 'CMD': 'kthreadd'}}, ['PROCESS_STATS'])
+        # Docker statistics were not read, DOCKER_STATS entries are kept
+        pipe.delete.assert_called_once_with('PROCESS_STATS|999')
+        pipe.hmset.assert_has_calls([mock.call('PROCESS_STATS|1', {'%CPU': '1.0', 'CMD': 'init'}),
+                                     mock.call('PROCESS_STATS|2', {'%CPU': '0.0', 'CMD': 'kthreadd'})], any_order=True)
+        assert pipe.execute.call_count == 1
+
+        pipe.reset_mock()
+        pdstatsd.update_state_db({'PROCESS_STATS|1': {'%CPU': '2.0', 'CMD': 'init'},
+                                  'DOCKER_STATS|fedcba987654': {'NAME': 'swss'}}, ['PROCESS_STATS', 'DOCKER_STATS'])
+        assert sorted(c[0][0] for c in pipe.delete.call_args_list) == ['DOCKER_STATS|0123456789ab', 'PROCESS_STATS|2']
+        pipe.hmset.assert_has_calls([mock.call('PROCESS_STATS|1', {'%CPU': '2.0'}),
+                                     mock.call('DOCKER_STATS|fedcba987654', {'NAME': 'swss'})], any_order=True)
+        assert pipe.hmset.call_count == 2
+        assert pipe.execute.call_count == 1
+        assert pdstatsd.state_db.keys.call_count == 2
+
+    def test_update_dockerstats_fallback(self):
+        pdstatsd = procdockerstatsd.ProcDockerStats(procdockerstatsd.SYSLOG_IDENTIFIER)
+        output = ("CONTAINER ID   NAME   CPU %   MEM USAGE / LIMIT     MEM %   NET I/O   BLOCK I/O   PIDS\n"
+                  "0123456789ab   bgp   1.50%   66.41MiB / 7.751GiB   0.84%   0B / 0B   1MB / 0B   12\n")
+        with mock.patch.object(pdstatsd, 'docker_api_get', side_effect=OSError("No such file or directory")), \
+             mock.patch.object(pdstatsd, 'run_command', return_value=output):
+            data = pdstatsd.update_dockerstats()
+        assert data['DOCKER_STATS|0123456789ab']['CPU%'] == '1.50'
+        assert data['DOCKER_STATS|0123456789ab']['MEM_BYTES'] == '69635932'
+
+        with mock.patch.object(pdstatsd, 'docker_api_get', side_effect=procdockerstatsd.http.client.BadStatusLine("")), \
+             mock.patch.object(pdstatsd, 'run_command', return_value=output):
+            assert 'DOCKER_STATS|0123456789ab' in pdstatsd.update_dockerstats()
+
+    def test_update_stats_without_docker_stats(self):
+        pdstatsd = procdockerstatsd.ProcDockerStats(procdockerstatsd.SYSLOG_IDENTIFIER)
+        with mock.patch.object(pdstatsd, 'collect_process_stats', return_value={}), \
+             mock.patch.object(pdstatsd, 'update_dockerstats', return_value=None), \
+             mock.patch.object(pdstatsd, 'update_state_db') as update_state_db:
+            pdstatsd.update_stats()
+        # DOCKER_STATS were not written, their update time is kept
+        (data, tables) = update_state_db.call_args[0]
+        assert list(data.keys()) == ['PROCESS_STATS|LastUpdateTime']
+        assert tables == ['PROCESS_STATS']
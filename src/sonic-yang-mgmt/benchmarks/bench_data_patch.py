@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Measure the latency to validate a single changed ACL rule in a synthetic
+config with many ports and ACL rules: by loading and validating the complete
+config again, and by loadDataPatch on the config already loaded.
+
+Usage: python benchmarks/bench_data_patch.py [-y YANG_DIR] [-p PORTS] [-r ACL_RULES] [-n ITERATIONS]
+"""
+
+from __future__ import print_function
+
+import argparse
+import copy
+import os
+import sys
+import time
+
+YANG_MGMT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, YANG_MGMT_DIR)
+
+import sonic_yang as sy
+
+
+def make_config(ports, rules):
+    config = {
+        "PORT": dict(),
+        "ACL_TABLE": {
+            "DATAACL": {
+                "type": "L3",
+                "stage": "INGRESS",
+                "ports": ["Ethernet{}".format(i * 4) for i in range(ports)]
+            }
+        },
+        "ACL_RULE": dict()
+    }
+    for i in range(ports):
+        config["PORT"]["Ethernet{}".format(i * 4)] = {
+            "alias": "Eth{}/1".format(i + 1),
+            "lanes": ",".join(str(i * 4 + l) for l in range(4)),
+            "speed": "100000",
+            "admin_status": "up"
+        }
+    for i in range(rules):
+        config["ACL_RULE"]["DATAACL|RULE_{}".format(i)] = make_rule(i)
+    return config
+
+
+def make_rule(i, action="FORWARD"):
+    return {
+        "PACKET_ACTION": action,
+        "PRIORITY": str(999999 - i % 999999),
+        "IP_TYPE": "IPV4",
+        "SRC_IP": "10.{}.{}.{}/32".format(i // 65536 % 256, i // 256 % 256, i % 256)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-y', '--yang-dir', default=os.path.join(YANG_MGMT_DIR,
+                        '../sonic-yang-models/yang-models/'))
+    parser.add_argument('-p', '--ports', type=int, default=1024)
+    parser.add_argument('-r', '--acl-rules', type=int, default=10000)
+    parser.add_argument('-n', '--iterations', type=int, default=5)
+    args = parser.parse_args()
+
+    syc = sy.SonicYang(args.yang_dir)
+    syc.loadYangModel()
+    config = make_config(args.ports, args.acl_rules)
+
+    full = list()
+    patched = list()
+    for i in range(args.iterations):
+        rule = make_rule(i, action="DROP" if i % 2 == 0 else "FORWARD")
+        key = "DATAACL|RULE_{}".format(i)
+
+        # complete config with the changed rule
+        newConfig = copy.deepcopy(config)
+        newConfig["ACL_RULE"][key] = rule
+        start = time.time()
+        syc.loadData(newConfig)
+        syc.validate_data_tree()
+        full.append(time.time() - start)
+
+        start = time.time()
+        syc.loadDataPatch({"ACL_RULE": {key: make_rule(i, action="REDIRECT")}})
+        patched.append(time.time() - start)
+
+    # keep the table readable, loadYangModel prints the loaded modules
+    print()
+    print('{} ports, {} ACL rules, single rule change'.format(args.ports, args.acl_rules))
+    print('{:<12} {:>12}'.format('mode', 'time (ms)'))
+    print('{:<12} {:>12.1f}'.format('full reload', min(full) * 1000))
+    print('{:<12} {:>12.1f}'.format('patch', min(patched) * 1000))
+    print('speedup x{:.1f}'.format(min(full) / min(patched)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Measure the time to instantiate SonicYang and load the SONiC YANG models:
+from the YANG files, from the persisted JSON schema cache and from the
+process wide cache of loaded models.
+
+Usage: python benchmarks/bench_load_yang.py [-y YANG_DIR] [-n ITERATIONS]
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+YANG_MGMT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, YANG_MGMT_DIR)
+
+import sonic_yang as sy
+
+
+def load(yang_dir, cache_dir):
+    start = time.time()
+    syc = sy.SonicYang(yang_dir, cache_dir=cache_dir)
+    syc.loadYangModel()
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-y', '--yang-dir', default=os.path.join(YANG_MGMT_DIR,
+                        '../sonic-yang-models/yang-models/'))
+    parser.add_argument('-n', '--iterations', type=int, default=5)
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp()
+    try:
+        results = dict()
+        for mode in ['cold', 'persisted', 'shared']:
+            elapsed = list()
+            for _ in range(args.iterations):
+                if mode == 'cold':
+                    shutil.rmtree(cache_dir)
+                if mode != 'shared':
+                    sy.clearYangModelCache()
+                elapsed.append(load(args.yang_dir, cache_dir))
+            results[mode] = min(elapsed)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    # keep the table readable, loadYangModel prints the loaded modules
+    print()
+    print('{:<10} {:>12}'.format('mode', 'time (ms)'))
+    for mode in ['cold', 'persisted', 'shared']:
+        print('{:<10} {:>12.1f}'.format(mode, results[mode] * 1000))
+    print('speedup persisted x{:.1f}, shared x{:.1f}'.format(
+        results['cold'] / results['persisted'], results['cold'] / results['shared']))
+
+
+if __name__ == '__main__':
+    main()
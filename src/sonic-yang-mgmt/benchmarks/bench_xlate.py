@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Measure the translation of a synthetic config with many ACL rules and
+interfaces from config DB to yang JSON (xlate) and back (rev xlate). The
+first xlate includes the creation of translation plans of the tables.
+
+Usage: python benchmarks/bench_xlate.py [-y YANG_DIR] [-r ACL_RULES] [-i INTERFACES] [-n ITERATIONS]
+"""
+
+from __future__ import print_function
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+
+YANG_MGMT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, YANG_MGMT_DIR)
+
+import sonic_yang as sy
+
+
+def make_config(rules, interfaces):
+    config = {
+        "PORT": dict(),
+        "INTERFACE": dict(),
+        "ACL_TABLE": {
+            "DATAACL": {
+                "type": "L3",
+                "stage": "INGRESS",
+                "ports": ["Ethernet0"]
+            }
+        },
+        "ACL_RULE": dict()
+    }
+    for i in range(interfaces):
+        port = "Ethernet{}".format(i)
+        config["PORT"][port] = {
+            "alias": "Eth{}".format(i),
+            "lanes": str(i),
+            "speed": "100000",
+            "admin_status": "up"
+        }
+        config["INTERFACE"][port] = dict()
+        config["INTERFACE"]["{}|10.{}.{}.0/31".format(port, i // 256 % 256, i % 256)] = {
+            "scope": "global",
+            "family": "IPv4"
+        }
+    for i in range(rules):
+        rule = {
+            "PACKET_ACTION": "FORWARD",
+            "PRIORITY": str(999999 - i % 999999),
+            "IP_TYPE": "IPV4",
+            "SRC_IP": "10.{}.{}.{}/32".format(i // 65536 % 256, i // 256 % 256, i % 256)
+        }
+        if i % 2 == 0:
+            rule["L4_DST_PORT"] = str(i % 65536)
+        config["ACL_RULE"]["DATAACL|RULE_{}".format(i)] = rule
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-y', '--yang-dir', default=os.path.join(YANG_MGMT_DIR,
+                        '../sonic-yang-models/yang-models/'))
+    parser.add_argument('-r', '--acl-rules', type=int, default=100000)
+    parser.add_argument('-i', '--interfaces', type=int, default=10000)
+    parser.add_argument('-n', '--iterations', type=int, default=3)
+    args = parser.parse_args()
+
+    syc = sy.SonicYang(args.yang_dir)
+    syc.loadYangModel()
+    config = make_config(args.acl_rules, args.interfaces)
+
+    xlate = list()
+    for _ in range(args.iterations):
+        yangJ = dict()
+        start = time.time()
+        syc._xlateConfigDBtoYang(config, yangJ)
+        xlate.append(time.time() - start)
+
+    # rev xlate works on the data tree printed by libyang
+    syc.loadData(copy.deepcopy(config))
+    printed = syc._print_data_mem('JSON')
+    revXlate = list()
+    for _ in range(args.iterations):
+        syc.xlateJson = json.loads(printed)
+        syc.revXlateJson = dict()
+        start = time.time()
+        syc._revXlateConfigDB()
+        revXlate.append(time.time() - start)
+    assert syc.revXlateJson == config
+
+    # keep the table readable, loadYangModel prints the loaded modules
+    print()
+    print('{} ACL rules, {} interfaces'.format(args.acl_rules, args.interfaces))
+    print('{:<14} {:>10}'.format('step', 'time (s)'))
+    print('{:<14} {:>10.3f}'.format('first xlate', xlate[0]))
+    print('{:<14} {:>10.3f}'.format('xlate', min(xlate)))
+    print('{:<14} {:>10.3f}'.format('rev xlate', min(revXlate)))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,8 @@ import syslog
 
 from json import dump
 from glob import glob
-from sonic_yang_ext import SonicYangExtMixin, SonicYangException
+from sonic_yang_ext import SonicYangExtMixin, SonicYangException, \
+    YANG_CACHE_DIR, clearYangModelCache, isYangModelCached
 
 """
 Yang schema and data tree python APIs based on libyang python
@@ -12,8 +13,10 @@ i.e. it is mixin not parent class.
 """
 class SonicYang(SonicYangExtMixin):
 
-    def __init__(self, yang_dir, debug=False):
+    def __init__(self, yang_dir, debug=False, cache_dir=YANG_CACHE_DIR):
         self.yang_dir = yang_dir
+        # directory of persisted JSON schema cache, None to disable it
+        self.cache_dir = cache_dir
         self.ctx = None
         self.module = None
         self.root = None
@@ -26,6 +29,8 @@ class SonicYang(SonicYangExtMixin):
         self.yangFiles = list()
         # map from TABLE in config DB to container and module
         self.confDbYangMap = dict()
+        # map from TABLE in config DB to its translation plan, created on use
+        self.xlatePlans = dict()
         # JSON format of yang model [similar to pyang conversion]
         self.yJson = list()
         # config DB json input, will be cropped as yang models
@@ -37,6 +42,11 @@ class SonicYang(SonicYangExtMixin):
         # below dict store the input config tables which have no YANG models
         self.tablesWithOutYang = dict()
 
+        # loadYangModel() takes the context from the process wide cache,
+        # do not create a context which would be thrown away
+        if isYangModelCached(yang_dir):
+            return
+
         try:
             self.ctx = ly.Context(yang_dir)
         except Exception as e:
@@ -69,6 +79,8 @@ class SonicYang(SonicYangExtMixin):
     """
     def _load_schema_module(self, yang_file):
         try:
+            if self.ctx is None:
+                self.ctx = ly.Context(self.yang_dir)
             return self.ctx.parse_module_path(yang_file, ly.LYS_IN_YANG)
         except Exception as e:
             print("Failed to load yang module file: " + yang_file)
@@ -3,13 +3,62 @@
 
 from __future__ import print_function
 import yang as ly
+import hashlib
+import os
 import re
+import stat
 import syslog
+import tempfile
 
-from json import dump, dumps, loads
+from copy import deepcopy
+from json import dump, dumps, load, loads
 from xmltodict import parse
 from glob import glob
 
+# Version of the persisted JSON schema cache format, change it when the
+# content of the cache changes.
+YANG_CACHE_VERSION = 1
+# Default directory of the persisted JSON schema cache, created by the image
+# build. The cache is used only if the directory is owned by the current user
+# and is not writable by others.
+YANG_CACHE_DIR = "/var/cache/sonic/yang"
+
+# Process wide cache of loaded YANG models, shared by all SonicYang objects.
+# (yang_dir, hash of yang_dir) -> {'ctx': libyang context with all modules,
+# 'yangFiles': module names, 'yJson': JSON format of modules,
+# 'xlatePlans': translation plans of config DB tables}
+_loadedYangModels = dict()
+
+"""
+Clear the process wide cache of loaded YANG models.
+"""
+def clearYangModelCache():
+    _loadedYangModels.clear()
+
+"""
+Check if YANG models of a directory are in the process wide cache.
+"""
+def isYangModelCached(yang_dir):
+    yang_dir = os.path.realpath(yang_dir)
+    return any(key[0] == yang_dir for key in _loadedYangModels)
+
+"""
+Hash of the content of all YANG model files in a directory.
+"""
+def hashYangDir(yangFiles):
+    h = hashlib.sha1()
+    for file in sorted(yangFiles):
+        h.update(os.path.basename(file).encode('utf-8'))
+        with open(file, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+"""
+Convert a config DB string to yang uint value.
+"""
+def _yangUint(val):
+    return int(str(val), 10)
+
 """
 This is the Exception thrown out of all public function of this class.
 """
@@ -27,22 +76,45 @@ class SonicYangExtMixin:
         try:
             # get all files
             self.yangFiles = glob(self.yang_dir +"/*.yang")
-            # load yang modules
-            for file in self.yangFiles:
-                m = self._load_schema_module(file)
-                if m is not None:
-                    self.sysLog(msg="module: {} is loaded successfully".format(m.name()))
-                else:
-                    raise(Exception("Could not load module {}".format(file)))
-
-            # keep only modules name in self.yangFiles
-            self.yangFiles = [f.split('/')[-1] for f in self.yangFiles]
-            self.yangFiles = [f.split('.')[0] for f in self.yangFiles]
+            dirHash = hashYangDir(self.yangFiles)
+            cacheKey = (os.path.realpath(self.yang_dir), dirHash)
+            loaded = _loadedYangModels.get(cacheKey)
+            if loaded is not None:
+                # reuse context and JSON of the models loaded by other object
+                self.ctx = loaded['ctx']
+                self.yangFiles = list(loaded['yangFiles'])
+                self.yJson = list(loaded['yJson'])
+                self.xlatePlans = loaded['xlatePlans']
+                self.sysLog(msg="Yang models of {} are loaded from cache".format(self.yang_dir))
+            else:
+                if self.ctx is None:
+                    self.ctx = ly.Context(self.yang_dir)
+                # load yang modules
+                for file in self.yangFiles:
+                    m = self._load_schema_module(file)
+                    if m is not None:
+                        self.sysLog(msg="module: {} is loaded successfully".format(m.name()))
+                    else:
+                        raise(Exception("Could not load module {}".format(file)))
+
+                # keep only modules name in self.yangFiles
+                self.yangFiles = [f.split('/')[-1] for f in self.yangFiles]
+                self.yangFiles = [f.split('.')[0] for f in self.yangFiles]
+
+                self.xlatePlans = dict()
+                # load json for each yang model, from persisted cache if valid
+                if not self._loadJsonYangModelCache(dirHash):
+                    self._loadJsonYangModel()
+                    self._saveJsonYangModelCache(dirHash)
+                _loadedYangModels[cacheKey] = {
+                    'ctx': self.ctx,
+                    'yangFiles': list(self.yangFiles),
+                    'yJson': list(self.yJson),
+                    'xlatePlans': self.xlatePlans
+                }
             print('Loaded below Yang Models')
             print(self.yangFiles)
 
-            # load json for each yang model
-            self._loadJsonYangModel()
             # create a map from config DB table to yang container
             self._createDBTableToModuleMap()
 
@@ -69,6 +141,81 @@ class SonicYangExtMixin:
 
         return
 
+    """
+    Path of the persisted JSON schema cache for a YANG directory hash
+    """
+    def _jsonYangModelCacheFile(self, dirHash):
+
+        return os.path.join(self.cache_dir, "yang_json_{}.json".format(dirHash))
+
+    """
+    Check that the persisted cache directory can be trusted: it must be owned
+    by the current user and not writable by group or others, so that no other
+    user can plant a cache file.
+    return: True if the directory is trusted, False otherwise
+    """
+    def _isYangModelCacheDirTrusted(self):
+
+        try:
+            st = os.stat(self.cache_dir)
+        except OSError:
+            return False
+        if st.st_uid != os.getuid() or st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            self.sysLog(syslog.LOG_DEBUG, msg="Yang JSON cache {} is not used: "\
+                "not owned by uid {} or writable by others".format(self.cache_dir, os.getuid()))
+            return False
+        return True
+
+    """
+    load JSON schema format of yang models from persisted cache
+    return: True if loaded, False if cache does not exist or is not valid
+    """
+    def _loadJsonYangModelCache(self, dirHash):
+
+        if not self.cache_dir or not os.path.isdir(self.cache_dir) or \
+           not self._isYangModelCacheDirTrusted():
+            return False
+        cacheFile = self._jsonYangModelCacheFile(dirHash)
+        try:
+            with open(cacheFile) as f:
+                cache = load(f)
+            if cache.get('version') != YANG_CACHE_VERSION or \
+               sorted(cache.get('yangFiles', [])) != sorted(self.yangFiles):
+                return False
+            self.yJson = cache['yJson']
+        except (IOError, OSError, ValueError, KeyError) as e:
+            self.sysLog(syslog.LOG_DEBUG, msg="Yang JSON cache {} is not used: {}".\
+                format(cacheFile, e))
+            return False
+
+        self.sysLog(msg="Yang JSON is loaded from cache {}".format(cacheFile))
+        return True
+
+    """
+    save JSON schema format of yang models in persisted cache
+    """
+    def _saveJsonYangModelCache(self, dirHash):
+
+        if not self.cache_dir:
+            return
+        cacheFile = self._jsonYangModelCacheFile(dirHash)
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir, 0o700)
+            if not self._isYangModelCacheDirTrusted():
+                return
+            # write in a temporary file and rename, readers never see partial file
+            fd, tmpFile = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, 'w') as f:
+                dump({'version': YANG_CACHE_VERSION, 'yangFiles': self.yangFiles, \
+                      'yJson': self.yJson}, f)
+            os.rename(tmpFile, cacheFile)
+        except (IOError, OSError) as e:
+            self.sysLog(syslog.LOG_ERR, msg="Failed to save Yang JSON cache {}: {}".\
+                format(cacheFile, e))
+
+        return
+
     """
     Create a map from config DB tables to container in yang model
     This module name and topLevelContainer are fetched considering YANG models are
@@ -148,34 +295,6 @@ class SonicYangExtMixin:
 
         return
 
-    """
-    Extract keys from table entry in Config DB and return in a dict
-
-    Input:
-    tableKey: Config DB Primary Key, Example tableKey = "Vlan111|2a04:5555:45:6709::1/64"
-    keys: key string from YANG list, i.e. 'vlan_name ip-prefix'.
-    regex: A regex to extract keys from tableKeys, good to have it as accurate as possible.
-
-    Return:
-    KeyDict = {"vlan_name": "Vlan111", "ip-prefix": "2a04:5555:45:6709::1/64"}
-    """
-    def _extractKey(self, tableKey, keys, regex):
-
-        keyList = keys.split()
-        # get the value groups
-        value = re.match(regex, tableKey)
-        # create the keyDict
-        i = 1
-        keyDict = dict()
-        for k in keyList:
-            if value.group(i):
-                keyDict[k] = value.group(i)
-            else:
-                raise Exception("Value not found for {} in {}".format(k, tableKey))
-            i = i + 1
-
-        return keyDict
-
     """
     Fill the dict based on leaf as a list or dict @model yang model object
     """
@@ -225,82 +344,150 @@ class SonicYangExtMixin:
         return leafDict
 
     """
-    Convert a string from Config DB value to Yang Value based on type of the
-    key in Yang model.
-    @model : A List of Leafs in Yang model list
+    Create a dict to map each leaf of a yang model to a tuple of (isleafList,
+    converter), converter changes a config DB string to yang type of the leaf.
     """
-    def _findYangTypedValue(self, key, value, leafDict):
+    def _createLeafPlan(self, model):
 
-        # convert config DB string to yang Type
-        def _yangConvert(val):
-            # Convert everything to string
-            val = str(val)
+        leafPlan = dict()
+        for name, leaf in self._createLeafDict(model).items():
             # find type of this key from yang leaf
-            type = leafDict[key]['type']['@name']
-
+            type = leaf['type']['@name']
             if 'uint' in type:
-                vValue = int(val, 10)
+                convert = _yangUint
             # TODO: find type of leafref from schema node
-            elif 'leafref' in type:
-                vValue = val
-            #TODO: find type in sonic-head, as of now, all are enumeration
-            elif 'head:' in type:
-                vValue = val
+            # TODO: find type in sonic-head, as of now, all are enumeration
             else:
-                vValue = val
-            return vValue
+                convert = str
+            leafPlan[name] = (leaf['__isleafList'], convert)
 
-        # if it is a leaf-list do it for each element
-        if leafDict[key]['__isleafList']:
-            vValue = list()
-            for v in value:
-                vValue.append(_yangConvert(v))
-        else:
-            vValue = _yangConvert(value)
-
-        return vValue
+        return leafPlan
 
     """
-    Xlate a list
-    This function will xlate from a dict in config DB to a Yang JSON list
-    using yang model. Output will be go in self.xlateJson
+    Create translation plan of a yang list.
+    keyRe: compiled regex to extract keys from config DB key.
+    revKey: key-regex-yang-to-configdb split in literals and key names.
     """
-    def _xlateList(self, model, yang, config, table):
-
-        #create a dict to map each key under primary key with a dict yang model.
-        #This is done to improve performance of mapping from values of TABLEs in
-        #config DB to leaf in YANG LIST.
-        leafDict = self._createLeafDict(model)
+    def _createListPlan(self, model):
 
         # fetch regex from YANG models.
         keyRegEx = model['ext:key-regex-configdb-to-yang']['@value']
         # seperator `|` has special meaning in regex, so change it appropriately.
         keyRegEx = re.sub(r'\|', r'\\|', keyRegEx)
-        # get keys from YANG model list itself
-        listKeys = model['key']['@value']
+        revKeyRegEx = model['ext:key-regex-yang-to-configdb']['@value']
+
+        return {
+            'name': model['@name'],
+            'keyRe': re.compile(keyRegEx),
+            # get keys from YANG model list itself
+            'keys': model['key']['@value'].split(),
+            # even items are literals, odd items are key names
+            'revKey': re.split(r'<(.*?)>', revKeyRegEx),
+            'leafs': self._createLeafPlan(model)
+        }
+
+    """
+    Create translation plan of a yang container, i.e. compiled key regexes,
+    leaf type converters and layout of lists and containers, so that xlate and
+    rev xlate do not process the yang JSON again for each config.
+    """
+    def _createContainerPlan(self, model):
+
+        plan = {
+            'name': model['@name'],
+            'lists': list(),
+            'revLists': list(),
+            'containers': list(),
+            'leafs': self._createLeafPlan(model)
+        }
+
+        clist = model.get('list')
+        # If single list exists in container, it is xlated only if named as
+        # <CONTAINER>_LIST
+        if isinstance(clist, dict):
+            plan['revLists'] = [self._createListPlan(clist)]
+            if clist['@name'] == model['@name']+"_LIST":
+                plan['lists'] = plan['revLists']
+        # If multi-list exists in container,
+        elif isinstance(clist, list):
+            plan['revLists'] = [self._createListPlan(l) for l in clist]
+            plan['lists'] = plan['revLists']
+
+        ccontainer = model.get('container')
+        # If single container exists in container,
+        if isinstance(ccontainer, dict):
+            plan['containers'] = [self._createContainerPlan(ccontainer)]
+        # If multi-container exists in container,
+        elif isinstance(ccontainer, list):
+            plan['containers'] = [self._createContainerPlan(c) for c in ccontainer]
+
+        return plan
+
+    """
+    Get translation plan of a config DB table, plan is created once per loaded
+    yang models.
+    """
+    def _getXlatePlan(self, table):
+
+        plan = self.xlatePlans.get(table)
+        if plan is None:
+            plan = self._createContainerPlan(self.confDbYangMap[table]['container'])
+            self.xlatePlans[table] = plan
+
+        return plan
+
+    """
+    Convert a string from Config DB value to Yang Value based on type of the
+    key in Yang model.
+    @leafs : leaf plan of Yang model list or container
+    """
+    def _findYangTypedValue(self, key, value, leafs):
+
+        isleafList, convert = leafs[key]
+        # if it is a leaf-list do it for each element
+        if isleafList:
+            return [convert(v) for v in value]
+
+        return convert(value)
+
+    """
+    Xlate a list
+    This function will xlate from a dict in config DB to a Yang JSON list
+    using translation plan of yang list. Output will be go in self.xlateJson
+    """
+    def _xlateList(self, plan, yang, config, table):
+
+        keyRe = plan['keyRe']
+        listKeys = plan['keys']
+        leafs = plan['leafs']
         self.sysLog(msg="xlateList regex:{} keyList:{}".\
-            format(keyRegEx, listKeys))
+            format(keyRe.pattern, listKeys))
 
         primaryKeys = list(config.keys())
         for pkey in primaryKeys:
             try:
-                vKey = None
-                self.sysLog(syslog.LOG_DEBUG, "xlateList Extract pkey:{}".\
-                    format(pkey))
                 # Find and extracts key from each dict in config
-                keyDict = self._extractKey(pkey, listKeys, keyRegEx)
-                # fill rest of the values in keyDict
-                for vKey in config[pkey]:
-                    self.sysLog(syslog.LOG_DEBUG, "xlateList vkey {}".format(vKey))
-                    keyDict[vKey] = self._findYangTypedValue(vKey, \
-                                        config[pkey][vKey], leafDict)
+                value = keyRe.match(pkey)
+                keyValues = value.groups()[:len(listKeys)] if value else ()
+                if len(keyValues) < len(listKeys) or not all(keyValues):
+                    raise Exception("Keys {} not found in {}".format(listKeys, pkey))
+                keyDict = dict(zip(listKeys, keyValues))
+                # fill rest of the values in keyDict, done here instead of
+                # _findYangTypedValue as it is called for each value in config.
+                for vKey, vValue in config[pkey].items():
+                    isleafList, convert = leafs[vKey]
+                    if isleafList:
+                        keyDict[vKey] = [convert(v) for v in vValue]
+                    else:
+                        keyDict[vKey] = convert(vValue)
                 yang.append(keyDict)
                 # delete pkey from config, done to match one key with one list
                 del config[pkey]
 
             except Exception as e:
                 # log debug, because this exception may occur with multilists
-                self.sysLog(syslog.LOG_DEBUG, "xlateList Exception {}".format(e))
+                if self.DEBUG:
+                    self.sysLog(syslog.LOG_DEBUG, "xlateList Exception {}".format(e))
                 # with multilist, we continue matching other keys.
                 continue
 
@@ -310,15 +497,14 @@ class SonicYangExtMixin:
     Process list inside a Container.
     This function will call xlateList based on list(s) present in Container.
     """
-    def _xlateListInContainer(self, model, yang, configC, table):
-        clist = model
-        #print(clist['@name'])
-        yang[clist['@name']] = list()
-        self.sysLog(msg="xlateProcessListOfContainer: {}".format(clist['@name']))
-        self._xlateList(clist, yang[clist['@name']], configC, table)
+    def _xlateListInContainer(self, plan, yang, configC, table):
+        name = plan['name']
+        yang[name] = list()
+        self.sysLog(msg="xlateProcessListOfContainer: {}".format(name))
+        self._xlateList(plan, yang[name], configC, table)
         # clean empty lists
-        if len(yang[clist['@name']]) == 0:
-            del yang[clist['@name']]
+        if len(yang[name]) == 0:
+            del yang[name]
 
         return
 
@@ -327,62 +513,51 @@ class SonicYangExtMixin:
     This function will call xlateContainer based on Container(s) present
     in outer Container.
     """
-    def _xlateContainerInContainer(self, model, yang, configC, table):
-        ccontainer = model
-        #print(ccontainer['@name'])
-        yang[ccontainer['@name']] = dict()
-        if not configC.get(ccontainer['@name']):
+    def _xlateContainerInContainer(self, plan, yang, configC, table):
+        name = plan['name']
+        yang[name] = dict()
+        if not configC.get(name):
             return
-        self.sysLog(msg="xlateProcessListOfContainer: {}".format(ccontainer['@name']))
-        self._xlateContainer(ccontainer, yang[ccontainer['@name']], \
-        configC[ccontainer['@name']], table)
+        self.sysLog(msg="xlateProcessListOfContainer: {}".format(name))
+        self._xlateContainer(plan, yang[name], configC[name], table)
         # clean empty container
-        if len(yang[ccontainer['@name']]) == 0:
-            del yang[ccontainer['@name']]
+        if len(yang[name]) == 0:
+            del yang[name]
         # remove copy after processing
-        del configC[ccontainer['@name']]
+        del configC[name]
 
         return
 
     """
     Xlate a container
     This function will xlate from a dict in config DB to a Yang JSON container
-    using yang model. Output will be stored in self.xlateJson
+    using translation plan of yang container. Output will be stored in
+    self.xlateJson
     """
-    def _xlateContainer(self, model, yang, config, table):
+    def _xlateContainer(self, plan, yang, config, table):
 
         # To Handle multiple Lists, Make a copy of config, because we delete keys
         # from config after each match. This is done to match one pkey with one list.
         configC = config.copy()
 
-        clist = model.get('list')
-        # If single list exists in container,
-        if clist and isinstance(clist, dict) and \
-           clist['@name'] == model['@name']+"_LIST" and bool(configC):
-                self._xlateListInContainer(clist, yang, configC, table)
-        # If multi-list exists in container,
-        elif clist and isinstance(clist, list) and bool(configC):
-            for modelList in clist:
-                self._xlateListInContainer(modelList, yang, configC, table)
+        # Handle list(s) in container
+        if bool(configC):
+            for listPlan in plan['lists']:
+                self._xlateListInContainer(listPlan, yang, configC, table)
 
         # Handle container(s) in container
-        ccontainer = model.get('container')
-        # If single list exists in container,
-        if ccontainer and isinstance(ccontainer, dict) and bool(configC):
-            self._xlateContainerInContainer(ccontainer, yang, configC, table)
-        # If multi-list exists in container,
-        elif ccontainer and isinstance(ccontainer, list) and bool(configC):
-            for modelContainer in ccontainer:
-                self._xlateContainerInContainer(modelContainer, yang, configC, table)
+        if bool(configC):
+            for containerPlan in plan['containers']:
+                self._xlateContainerInContainer(containerPlan, yang, configC, table)
 
         ## Handle other leaves in container,
-        leafDict = self._createLeafDict(model)
+        leafs = plan['leafs']
         vKeys = list(configC.keys())
         for vKey in vKeys:
             #vkey must be a leaf\leaf-list\choice in container
-            if leafDict.get(vKey):
+            if vKey in leafs:
                 self.sysLog(syslog.LOG_DEBUG, "xlateContainer vkey {}".format(vKey))
-                yang[vKey] = self._findYangTypedValue(vKey, configC[vKey], leafDict)
+                yang[vKey] = self._findYangTypedValue(vKey, configC[vKey], leafs)
                 # delete entry from copy of config
                 del configC[vKey]
 
@@ -409,7 +584,7 @@ class SonicYangExtMixin:
             yangJ[key] = dict() if yangJ.get(key) is None else yangJ[key]
             yangJ[key][subkey] = dict()
             self.sysLog(msg="xlateConfigDBtoYang {}:{}".format(key, subkey))
-            self._xlateContainer(cmap['container'], yangJ[key][subkey], \
+            self._xlateContainer(self._getXlatePlan(table), yangJ[key][subkey], \
                                 jIn[table], table)
 
         return
@@ -432,130 +607,109 @@ class SonicYangExtMixin:
 
     """
     create config DB table key from entry in yang JSON
+    revKey: key-regex-yang-to-configdb split in literals and key names
     """
-    def _createKey(self, entry, regex):
+    def _createKey(self, entry, revKey):
 
         keyDict = dict()
-        keyV = regex
-        # get the keys from regex of key extractor
-        keyList = re.findall(r'<(.*?)>', regex)
-        for key in keyList:
+        keyV = list(revKey)
+        # get the keys from odd items of key extractor
+        for i in range(1, len(revKey), 2):
+            key = revKey[i]
             val = entry.get(key)
             if val:
-                #print("pair: {} {}".format(key, val))
-                keyDict[key] = sval = str(val)
-                keyV = re.sub(r'<'+key+'>', sval, keyV)
-                #print("VAL: {} {}".format(regex, keyV))
+                keyDict[key] = keyV[i] = str(val)
             else:
                 raise Exception("key {} not found in entry".format(key))
-        #print("kDict {}".format(keyDict))
-        return keyV, keyDict
+
+        return "".join(keyV), keyDict
 
     """
-    Convert a string from Config DB value to Yang Value based on type of the
-    key in Yang model.
-    @model : A List of Leafs in Yang model list
+    Convert a Yang Value to string for Config DB.
+    @leafs : leaf plan of Yang model list or container
     """
-    def _revFindYangTypedValue(self, key, value, leafDict):
-
-        # convert yang Type to config DB string
-        def _revYangConvert(val):
-            # config DB has only strings, thank god for that :), wait not yet!!!
-            return str(val)
+    def _revFindYangTypedValue(self, key, value, leafs):
 
+        # config DB has only strings, thank god for that :), wait not yet!!!
         # if it is a leaf-list do it for each element
-        if leafDict[key]['__isleafList']:
-            vValue = list()
-            for v in value:
-                vValue.append(_revYangConvert(v))
-        else:
-            vValue = _revYangConvert(value)
+        if leafs[key][0]:
+            return [str(v) for v in value]
 
-        return vValue
+        return str(value)
 
     """
     Rev xlate from <TABLE>_LIST to table in config DB
     """
-    def _revXlateList(self, model, yang, config, table):
+    def _revXlateList(self, plan, yang, config, table):
 
-        # fetch regex from YANG models
-        keyRegEx = model['ext:key-regex-yang-to-configdb']['@value']
-        self.sysLog(msg="revXlateList regex:{}".format(keyRegEx))
+        # list with name <NAME>_LIST should be removed,
+        if "_LIST" not in plan['name']:
+            return
 
-        # create a dict to map each key under primary key with a dict yang model.
-        # This is done to improve performance of mapping from values of TABLEs in
-        # config DB to leaf in YANG LIST.
-        leafDict = self._createLeafDict(model)
+        revKey = plan['revKey']
+        leafs = plan['leafs']
+        self.sysLog(msg="revXlateList regex:{}".format("".join(\
+            revKey[i] if i % 2 == 0 else "<"+revKey[i]+">" for i in range(len(revKey)))))
 
-        # list with name <NAME>_LIST should be removed,
-        if "_LIST" in model['@name']:
-            for entry in yang:
-                # create key of config DB table
-                pkey, pkeydict = self._createKey(entry, keyRegEx)
+        for entry in yang:
+            # create key of config DB table
+            pkey, pkeydict = self._createKey(entry, revKey)
+            if self.DEBUG:
                 self.sysLog(syslog.LOG_DEBUG, "revXlateList pkey:{}".format(pkey))
-                config[pkey]= dict()
-                # fill rest of the entries
-                for key in entry:
-                    if key not in pkeydict:
-                        config[pkey][key] = self._revFindYangTypedValue(key, \
-                            entry[key], leafDict)
+            configE = config[pkey] = dict()
+            # fill rest of the entries, done here instead of
+            # _revFindYangTypedValue as it is called for each value in yang.
+            for key, value in entry.items():
+                if key not in pkeydict:
+                    if leafs[key][0]:
+                        configE[key] = [str(v) for v in value]
+                    else:
+                        configE[key] = str(value)
 
         return
 
     """
     Rev xlate a list inside a yang container
     """
-    def _revXlateListInContainer(self, model, yang, config, table):
-        modelList = model
+    def _revXlateListInContainer(self, plan, yang, config, table):
         # Pass matching list from Yang Json if exist
-        if yang.get(modelList['@name']):
-            self.sysLog(msg="revXlateListInContainer {}".format(modelList['@name']))
-            self._revXlateList(modelList, yang[modelList['@name']], config, table)
+        if yang.get(plan['name']):
+            self.sysLog(msg="revXlateListInContainer {}".format(plan['name']))
+            self._revXlateList(plan, yang[plan['name']], config, table)
         return
 
     """
     Rev xlate a container inside a yang container
     """
-    def _revXlateContainerInContainer(self, model, yang, config, table):
-        modelContainer = model
+    def _revXlateContainerInContainer(self, plan, yang, config, table):
+        name = plan['name']
         # Pass matching list from Yang Json if exist
-        if yang.get(modelContainer['@name']):
-            config[modelContainer['@name']] = dict()
-            self.sysLog(msg="revXlateContainerInContainer {}".format(modelContainer['@name']))
-            self._revXlateContainer(modelContainer, yang[modelContainer['@name']], \
-                config[modelContainer['@name']], table)
+        if yang.get(name):
+            config[name] = dict()
+            self.sysLog(msg="revXlateContainerInContainer {}".format(name))
+            self._revXlateContainer(plan, yang[name], config[name], table)
         return
 
     """
     Rev xlate from yang container to table in config DB
     """
-    def _revXlateContainer(self, model, yang, config, table):
+    def _revXlateContainer(self, plan, yang, config, table):
 
-        # IF container has only one list
-        clist = model.get('list')
-        if isinstance(clist, dict):
-            self._revXlateListInContainer(clist, yang, config, table)
-        # IF container has lists
-        elif isinstance(clist, list):
-            for modelList in clist:
-                self._revXlateListInContainer(modelList, yang, config, table)
+        # Handle list(s) in container
+        for listPlan in plan['revLists']:
+            self._revXlateListInContainer(listPlan, yang, config, table)
 
-        ccontainer = model.get('container')
-        # IF container has only one inner container
-        if isinstance(ccontainer, dict):
-            self._revXlateContainerInContainer(ccontainer, yang, config, table)
-        # IF container has only many inner container
-        elif isinstance(ccontainer, list):
-            for modelContainer in ccontainer:
-                self._revXlateContainerInContainer(modelContainer, yang, config, table)
+        # Handle container(s) in container
+        for containerPlan in plan['containers']:
+            self._revXlateContainerInContainer(containerPlan, yang, config, table)
 
         ## Handle other leaves in container,
-        leafDict = self._createLeafDict(model)
+        leafs = plan['leafs']
         for vKey in yang:
             #vkey must be a leaf\leaf-list\choice in container
-            if leafDict.get(vKey):
+            if vKey in leafs:
                 self.sysLog(syslog.LOG_DEBUG, "revXlateContainer vkey {}".format(vKey))
-                config[vKey] = self._revFindYangTypedValue(vKey, yang[vKey], leafDict)
+                config[vKey] = self._revFindYangTypedValue(vKey, yang[vKey], leafs)
 
         return
 
@@ -574,12 +728,11 @@ class SonicYangExtMixin:
                 #table = container.split(':')[1]
                 table = container
                 #print("revXlate " + table)
-                cmap = self.confDbYangMap[table]
                 cDbJson[table] = dict()
                 #print(key + "--" + subkey)
                 self.sysLog(msg="revXlateYangtoConfigDB {}".format(table))
-                self._revXlateContainer(cmap['container'], yangJ[module_top][container], \
-                    cDbJson[table], table)
+                self._revXlateContainer(self._getXlatePlan(table), \
+                    yangJ[module_top][container], cDbJson[table], table)
 
         return
 
@@ -688,7 +841,8 @@ class SonicYangExtMixin:
           xlateFile = None
           if debug:
               xlateFile = "xlateConfig.json"
-          self.jIn = configdbJson
+          # patches change self.jIn, keep the config of the caller as is
+          self.jIn = deepcopy(configdbJson)
           # reset xlate and tablesWithOutYang
           self.xlateJson = dict()
           self.tablesWithOutYang = dict()
@@ -708,6 +862,141 @@ class SonicYangExtMixin:
 
        return True
 
+    """
+    Find xpaths of the data nodes created in data tree for entries of a table.
+    yangC: Yang JSON of table container, translated from the table entries.
+    """
+    def _findXpathTableEntries(self, table, yangC):
+
+        module, topc, container = self._getModuleTLCcontainer(table)
+        xpathC = "/" + module + ":" + topc + "/" + table
+        leafDict = self._createLeafDict(container)
+        xpaths = list()
+        for name, value in yangC.items():
+            # entries of a list
+            if isinstance(value, list) and not leafDict.get(name):
+                modelList = self._findYangList(container, name)
+                listKeys = modelList['key']['@value'].split()
+                for entry in value:
+                    keys = [str(entry[k]) for k in listKeys]
+                    xpaths.append(self._findXpathList(xpathC, modelList, keys))
+            # inner container or leaf of table container
+            else:
+                xpaths.append(xpathC + "/" + name)
+
+        return xpaths
+
+    """
+    Apply a patch of config DB tables to self.jIn and the data tree.
+    patch: {table: {key: entry or None for deleted key} or None for deleted table}
+    undo: filled with the patch to restore entries modified in self.jIn.
+    """
+    def _applyDataPatch(self, patch, undo):
+
+        added = dict()
+        for table, entries in patch.items():
+            # tables without yang models are stored without validation
+            if table not in self.confDbYangMap:
+                current = self.tablesWithOutYang.setdefault(table, dict())
+            else:
+                current = self.jIn.setdefault(table, dict())
+            if entries is None:
+                entries = dict.fromkeys(current.keys())
+            # skip unchanged keys
+            entries = dict((key, entry) for key, entry in entries.items() \
+                if current.get(key) != entry)
+            undoT = undo.setdefault(table, dict())
+            for key in entries:
+                if key not in undoT:
+                    undoT[key] = current.get(key)
+
+            if table not in self.confDbYangMap:
+                for key, entry in entries.items():
+                    current.pop(key, None)
+                    if entry is not None:
+                        current[key] = deepcopy(entry)
+                if not len(current):
+                    del self.tablesWithOutYang[table]
+                continue
+
+            # delete the data nodes of modified and deleted keys, modified
+            # keys are added again with new entry, same as set in config DB.
+            oldEntries = dict((key, current[key]) for key in entries if key in current)
+            if len(oldEntries):
+                yangC = dict()
+                self._xlateContainer(self._getXlatePlan(table), yangC, \
+                    oldEntries, table)
+                for xpath in self._findXpathTableEntries(table, yangC):
+                    self.sysLog(syslog.LOG_DEBUG, "applyDataPatch delete {}".format(xpath))
+                    if self._deleteNode(xpath=xpath) == False:
+                        raise Exception("Failed to delete {}".format(xpath))
+                for key in oldEntries:
+                    del current[key]
+
+            newEntries = dict((key, entry) for key, entry in entries.items() \
+                if entry is not None)
+            if len(newEntries):
+                added[table] = newEntries
+            elif not len(current):
+                # remove empty table container
+                module, topc, container = self._getModuleTLCcontainer(table)
+                xpath = "/" + module + ":" + topc + "/" + table
+                node = self._find_data_node(xpath)
+                if node is not None:
+                    self._deleteNode(xpath=xpath, node=node)
+            if not len(current):
+                del self.jIn[table]
+
+        if len(added):
+            # translate only added entries and validate them, except for the
+            # leafrefs, must and when referring to nodes outside of the added
+            # entries. The merge duplicates the nodes, the duplicates are not
+            # validated yet, so validating the data tree checks them again
+            # with the rest of the config.
+            yangJ = dict()
+            self._xlateConfigDBtoYang(added, yangJ)
+            node = self.ctx.parse_data_mem(dumps(yangJ), ly.LYD_JSON, \
+                ly.LYD_OPT_CONFIG|ly.LYD_OPT_STRICT|ly.LYD_OPT_NOEXTDEPS)
+            self.root.merge(node, 0)
+            for table, entries in added.items():
+                self.jIn.setdefault(table, dict()).update(deepcopy(entries))
+
+        return
+
+    """
+    loadDataPatch: apply a patch to config loaded by loadData and validate data
+    tree. Only the entries in patch are translated and changed in data tree,
+    libyang then validates only changed nodes and leafrefs to them. (Public)
+    input:    patch: {table: {key: entry or None for deleted key} or None for
+              deleted table}
+              validate: validate data tree after patch
+    returns:  True - success, on failure data tree is restored and
+              SonicYangException is raised.
+    """
+    def loadDataPatch(self, patch, validate=True):
+
+        if self.root is None:
+            raise SonicYangException("Data Patch Failed\nData is not loaded")
+
+        undo = dict()
+        try:
+            self._applyDataPatch(patch, undo)
+            if validate:
+                self._validate_data(self.root, self.ctx)
+
+        except Exception as e:
+            print("Data Patch Failed")
+            try:
+                self._applyDataPatch(undo, dict())
+            except Exception as eUndo:
+                # data tree does not match the config any more
+                self.root = None
+                self.sysLog(syslog.LOG_ERR, msg="Data Patch Undo Failed {}".\
+                    format(str(eUndo)))
+            raise SonicYangException("Data Patch Failed\n{}".format(str(e)))
+
+        return True
+
     """
     Get data from Data tree, data tree will be assigned in self.xlateJson. (Public)
     """
@@ -3,6 +3,7 @@ import os
 import pytest
 import sonic_yang as sy
 import json
+from copy import deepcopy
 import glob
 import logging
 from ijson import items as ijson_itmes
@@ -345,6 +346,30 @@ class Test_SonicYang(object):
 
         return
 
+    def test_xlate_plan(self, sonic_yang_data):
+        # In this test, translation plans are created once for each table
+        # and reused for next translations.
+        test_file = sonic_yang_data['test_file']
+        syc = sonic_yang_data['syc']
+
+        jIn = json.loads(self.readIjsonInput(test_file, 'SAMPLE_CONFIG_DB_JSON'))
+        syc.loadData(jIn)
+        plans = dict(syc.xlatePlans)
+        assert set(jIn.keys()) <= set(plans.keys())
+
+        syc.loadData(json.loads(self.readIjsonInput(test_file, 'SAMPLE_CONFIG_DB_JSON')))
+        for table, plan in plans.items():
+            assert syc.xlatePlans[table] is plan
+
+        aclRule = syc._getXlatePlan('ACL_RULE')['lists'][0]
+        assert aclRule['keys'] == ['ACL_TABLE_NAME', 'RULE_NAME']
+        assert aclRule['keyRe'].match('V4-ACL-TABLE|Rule_20').groups() == \
+            ('V4-ACL-TABLE', 'Rule_20')
+        assert syc._createKey({'ACL_TABLE_NAME': 'V4-ACL-TABLE', 'RULE_NAME': 'Rule_20'}, \
+            aclRule['revKey'])[0] == 'V4-ACL-TABLE|Rule_20'
+
+        return
+
     def test_table_with_no_yang(self, sonic_yang_data):
         # in this test, tables with no YANG models must be stored seperately
         # by this library.
@@ -361,5 +386,115 @@ class Test_SonicYang(object):
 
         return
 
+    def test_load_data_patch(self, sonic_yang_data):
+        # in this test, patches are applied to loaded config and validated
+        # incrementally, config from data tree must match patched config.
+        test_file = sonic_yang_data['test_file']
+        syc = sonic_yang_data['syc']
+
+        jIn = json.loads(self.readIjsonInput(test_file, 'SAMPLE_CONFIG_DB_JSON'))
+        syc.loadData(jIn)
+        syc.validate_data_tree()
+        expected = syc.getData()
+        loaded = deepcopy(jIn)
+
+        patch = {
+            "ACL_RULE": {
+                "V4-ACL-TABLE|DEFAULT_DENY": None,
+                "V4-ACL-TABLE|Rule_New": {
+                    "PACKET_ACTION": "FORWARD",
+                    "PRIORITY": "777770",
+                    "IP_TYPE": "IPv4ANY"
+                }
+            },
+            "PORT": {
+                "Ethernet112": dict(expected["PORT"]["Ethernet112"], admin_status="down")
+            },
+            "UNKNOWN_TABLE": {
+                "Key": {"Field": "Value"}
+            }
+        }
+        assert syc.loadDataPatch(patch) == True
+        del expected["ACL_RULE"]["V4-ACL-TABLE|DEFAULT_DENY"]
+        expected["ACL_RULE"]["V4-ACL-TABLE|Rule_New"] = patch["ACL_RULE"]["V4-ACL-TABLE|Rule_New"]
+        expected["PORT"]["Ethernet112"]["admin_status"] = "down"
+        assert syc.getData() == expected
+        assert syc.tablesWithOutYang["UNKNOWN_TABLE"] == {"Key": {"Field": "Value"}}
+        # the config passed to loadData is not changed by patches
+        assert jIn == loaded
+
+        # invalid patches are not applied: missing leafref, leafref to a
+        # deleted port, wrong value and must not satisfied.
+        crmConfig = dict(expected["CRM"]["Config"], acl_counter_high_threshold="60")
+        invalidPatches = [
+            {"ACL_RULE": {"NO-ACL-TABLE|Rule_1": {"PACKET_ACTION": "DROP"}}},
+            {"PORT": {"Ethernet24": None}},
+            {"PORT": {"Ethernet112": {"lanes": "113,114", "speed": "fast"}}},
+            {"CRM": {"Config": crmConfig}}
+        ]
+        for invalidPatch in invalidPatches:
+            with pytest.raises(sy.SonicYangException):
+                syc.loadDataPatch(invalidPatch)
+            assert syc.getData() == expected
+        assert jIn == loaded
+
+        return
+
+    def test_load_yang_model_cache(self, sonic_yang_data, tmpdir):
+        # in this test, yang models loaded from persisted and process wide
+        # caches must be same as yang models loaded from yang files.
+        yang_dir = sonic_yang_data['yang_dir']
+        test_file = sonic_yang_data['test_file']
+        cache_dir = str(tmpdir)
+
+        sy.clearYangModelCache()
+        cold = sy.SonicYang(yang_dir, cache_dir=cache_dir)
+        cold.loadYangModel()
+        assert len(glob.glob(cache_dir + "/*.json")) == 1
+
+        # persisted cache
+        sy.clearYangModelCache()
+        cached = sy.SonicYang(yang_dir, cache_dir=cache_dir)
+        cached.loadYangModel()
+        assert cached.yJson == cold.yJson
+        assert sorted(cached.confDbYangMap.keys()) == sorted(cold.confDbYangMap.keys())
+
+        # process wide cache, no context is created before loadYangModel()
+        shared = sy.SonicYang(yang_dir, cache_dir=cache_dir)
+        assert shared.ctx is None
+        shared.loadYangModel()
+        assert shared.ctx is cached.ctx
+        assert sorted(shared.yangFiles) == sorted(cold.yangFiles)
+
+        jIn = json.loads(self.readIjsonInput(test_file, 'SAMPLE_CONFIG_DB_JSON'))
+        shared.loadData(jIn)
+        shared.validate_data_tree()
+        shared.getData()
+        assert shared.jIn == shared.revXlateJson
+
+        return
+
+    def test_load_yang_model_cache_untrusted_dir(self, sonic_yang_data, tmpdir):
+        # in this test, a persisted cache directory writable by others is
+        # neither read nor written.
+        yang_dir = sonic_yang_data['yang_dir']
+        cache_dir = str(tmpdir.mkdir("yang"))
+        os.chmod(cache_dir, 0o777)
+
+        sy.clearYangModelCache()
+        syc = sy.SonicYang(yang_dir, cache_dir=cache_dir)
+        syc.loadYangModel()
+        assert len(glob.glob(cache_dir + "/*.json")) == 0
+
+        # a new cache directory is created private
+        cache_dir = os.path.join(str(tmpdir), "new")
+        sy.clearYangModelCache()
+        syc = sy.SonicYang(yang_dir, cache_dir=cache_dir)
+        syc.loadYangModel()
+        assert os.stat(cache_dir).st_mode & 0o777 == 0o700
+        assert len(glob.glob(cache_dir + "/*.json")) == 1
+
+        return
+
     def teardown_class(self):
         pass